@@ -0,0 +1,55 @@
+#! /usr/bin/env python
+"""Compare autocompletion through filter_names with the in-process
+prefix index.
+
+Usage:
+    ./benchmarks/autocomplete.py [--names N] [--variants N] [--repeat N]
+"""
+from __future__ import print_function
+
+import argparse
+import time
+
+import common
+
+
+QUERIES = ['s', 'smi', 'smith j', 'meyer', 'zz']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--names', type=int, default=100000)
+    parser.add_argument('--variants', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    teardown = common.setup()
+    try:
+        from django.test.client import RequestFactory
+        from name import utils
+        from name.autocomplete import PrefixIndex
+
+        common.populate(args.names, args.variants)
+
+        index = PrefixIndex()
+        start = time.time()
+        index.load()
+        print('Loaded the prefix index in {0:.2f} s'
+              .format(time.time() - start))
+
+        rf = RequestFactory()
+        for q in QUERIES:
+            request = rf.get('/', {'q': q})
+            common.report(
+                'filter_names: {0!r}'.format(q),
+                common.timeit(lambda: list(utils.filter_names(request)[:10]),
+                              args.repeat))
+            common.report(
+                'prefix index: {0!r}'.format(q),
+                common.timeit(lambda: index.search(q), args.repeat))
+    finally:
+        teardown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Shared helpers for the benchmark scripts.
+
+The benchmarks run against a throwaway test database created from the
+settings module in DJANGO_SETTINGS_MODULE (tests.settings.dev by
+default), so they can be pointed at MySQL, Postgres or SQLite.
+"""
+from __future__ import print_function
+
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings.dev')
+
+SURNAMES = ['smith', 'johnson', 'meyer', 'meier', 'garcia', 'nguyen',
+            'kowalski', 'obrien', 'muller', 'rossi', 'tanaka', 'phillips']
+GIVEN_NAMES = ['john', 'mary', 'jorg', 'ana', 'li', 'mark', 'lauren',
+               'damon', 'joey', 'fatima', 'olga', 'pierre']
+SYLLABLES = ['ka', 'lo', 'mi', 'ren', 'sa', 'tor', 'vin', 'zu', 'bel', 'dra']
+
+
+def setup():
+    """Configure Django and create the test database.
+
+    Returns a callable that destroys the test database.
+    """
+    import django
+    if hasattr(django, 'setup'):
+        django.setup()
+
+    from django.db import connection
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    return lambda: connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def random_name(rand):
+    """Build a random, plausible looking personal name."""
+    surname = rand.choice(SURNAMES) + ''.join(
+        rand.choice(SYLLABLES) for _ in range(rand.randint(0, 2)))
+    return u'{0}, {1}'.format(surname.title(), rand.choice(GIVEN_NAMES).title())
+
+
+def populate(count, variants_per_name=0, seed=0, chunk_size=5000, start=0):
+    """Insert count Names and variants_per_name Variants per Name, with
+    name_ids numbered from start + 1.
+
+    Rows are inserted with bulk_create, which bypasses the model save
+    methods, so any maintained search structures need to be rebuilt
+    afterwards.
+    """
+    from pynaco.naco import normalizeSimplified
+    from name.models import Name, Variant
+
+    rand = random.Random(seed)
+    for first in range(start, start + count, chunk_size):
+        names = []
+        for i in range(first, min(first + chunk_size, start + count)):
+            value = random_name(rand)
+            names.append(Name(
+                name=value,
+                normalized_name=normalizeSimplified(value),
+                name_type=rand.randint(0, 4),
+                name_id=u'nm{0:07d}'.format(i + 1)))
+        Name.objects.bulk_create(names)
+
+    if not variants_per_name:
+        return
+
+    ids = (Name.objects.filter(name_id__gt=u'nm{0:07d}'.format(start))
+                       .order_by('id').values_list('id', flat=True))
+    variants = []
+    for id in ids.iterator():
+        for _ in range(variants_per_name):
+            value = random_name(rand)
+            variants.append(Variant(
+                belong_to_name_id=id,
+                variant=value,
+                normalized_variant=normalizeSimplified(value),
+                variant_type=Variant.OTHER))
+        if len(variants) >= chunk_size:
+            Variant.objects.bulk_create(variants)
+            variants = []
+    Variant.objects.bulk_create(variants)
+
+
+def timeit(func, repeat=5):
+    """Call func repeat times and return the best and mean wall time
+    in milliseconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        timings.append((time.time() - start) * 1000)
+    return min(timings), sum(timings) / len(timings)
+
+
+def report(label, timings):
+    best, mean = timings
+    print('{0:<40} best {1:>10.2f} ms   mean {2:>10.2f} ms'
+          .format(label, best, mean))
@@ -0,0 +1,61 @@
+#! /usr/bin/env python
+"""Compare the icontains search of filter_names, which matches the
+variants with a semi-join, with the previous JOIN and DISTINCT query.
+
+Both a page of results and the count made by the paginator are timed.
+
+Usage:
+    ./benchmarks/filter_names.py [--names N] [--variants N] [--repeat N]
+"""
+from __future__ import print_function
+
+import argparse
+
+import common
+
+
+QUERIES = ['smith', 'smith john', 'meyer mary', 'kowalskika', 'zz']
+
+
+def join_distinct(names, q):
+    """The icontains search as it was before the semi-join."""
+    from django.db.models import Q
+    from name.utils import normalize_query
+
+    query_filter = Q()
+    for term in normalize_query(q):
+        query_filter &= Q(name__icontains=term)
+    query_filter |= Q(variant__variant__icontains=q)
+    return names.filter(query_filter).distinct()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--names', type=int, default=1000000)
+    parser.add_argument('--variants', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    teardown = common.setup()
+    try:
+        from name.models import Name
+        from name.utils import search_icontains
+
+        common.populate(args.names, args.variants)
+
+        searches = [('join distinct', join_distinct),
+                    ('semi-join', search_icontains)]
+        for q in QUERIES:
+            for label, search in searches:
+                names = search(Name.objects.visible(), q).order_by('name')
+                common.report('{0}: {1!r} page'.format(label, q),
+                              common.timeit(lambda: list(names[:15]),
+                                            args.repeat))
+                common.report('{0}: {1!r} count'.format(label, q),
+                              common.timeit(names.count, args.repeat))
+    finally:
+        teardown()
+
+
+if __name__ == '__main__':
+    main()
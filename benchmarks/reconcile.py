@@ -0,0 +1,60 @@
+#! /usr/bin/env python
+"""Measure the throughput of batch reconciliation, compared with one
+filter_names search per label as made through search.json.
+
+Usage:
+    ./benchmarks/reconcile.py [--names N] [--variants N] [--batch N]
+"""
+from __future__ import print_function
+
+import argparse
+import random
+import time
+
+import common
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--names', type=int, default=100000)
+    parser.add_argument('--variants', type=int, default=1)
+    parser.add_argument('--batch', type=int, default=10000)
+    parser.add_argument('--searches', type=int, default=20)
+    args = parser.parse_args()
+
+    teardown = common.setup()
+    try:
+        from django.test.client import RequestFactory
+        from name import app_settings, reconcile, utils
+
+        common.populate(args.names, args.variants)
+
+        # The labels are generated like the Names, so most of them match.
+        rand = random.Random(1)
+        queries = dict(('q{0}'.format(i), common.random_name(rand))
+                       for i in range(args.batch))
+
+        for workers in (1, 4):
+            app_settings.NAME_RECONCILE_WORKERS = workers
+            start = time.time()
+            results = reconcile.reconcile(queries)
+            elapsed = time.time() - start
+            matched = sum(1 for r in results.values() if r['result'])
+            print('reconcile, {0} worker(s): {1} labels, {2} matched, '
+                  '{3:.0f} labels/s'.format(workers, len(queries), matched,
+                                            len(queries) / elapsed))
+
+        rf = RequestFactory()
+        labels = list(queries.values())[:args.searches]
+        start = time.time()
+        for label in labels:
+            list(utils.filter_names(rf.get('/', {'q': label}))[:10])
+        elapsed = time.time() - start
+        print('filter_names, one search per label: {0:.0f} labels/s'
+              .format(len(labels) / elapsed))
+    finally:
+        teardown()
+
+
+if __name__ == '__main__':
+    main()
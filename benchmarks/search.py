@@ -0,0 +1,55 @@
+#! /usr/bin/env python
+"""Compare the search backends used by name.utils.filter_names.
+
+Usage:
+    ./benchmarks/search.py [--names N] [--variants N] [--repeat N]
+"""
+from __future__ import print_function
+
+import argparse
+
+import common
+
+
+QUERIES = ['smith', 'smith john', 'meyer mary', 'kowalskika', 'zz']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--names', type=int, default=100000)
+    parser.add_argument('--variants', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    teardown = common.setup()
+    try:
+        from django.test.client import RequestFactory
+        from name import app_settings, utils
+        from name.models import SEARCH_INDEXES
+
+        common.populate(args.names, args.variants)
+
+        rf = RequestFactory()
+        for backend in sorted(utils.SEARCH_BACKENDS):
+            app_settings.NAME_SEARCH_BACKEND = backend
+            if utils.get_search_backend() != backend:
+                print('Skipping {0}, it is not supported by this database.'
+                      .format(backend))
+                continue
+
+            for index in SEARCH_INDEXES:
+                if index.is_maintained():
+                    for _ in index.rebuild():
+                        pass
+            for q in QUERIES:
+                request = rf.get('/', {'q': q})
+                timings = common.timeit(
+                    lambda: list(utils.filter_names(request)[:15]),
+                    args.repeat)
+                common.report('{0}: {1!r}'.format(backend, q), timings)
+    finally:
+        teardown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#! /usr/bin/env python
+"""Compare the REST framework serializers with name.api.fast, for the
+search results of search.json and the Locations of locations.json.
+
+Usage:
+    ./benchmarks/serializers.py [--names N] [--locations N] [--repeat N]
+"""
+from __future__ import print_function
+
+import argparse
+import random
+
+import common
+
+
+def populate_locations(count, seed=0):
+    """Add a Location, a Variant and a Note to count random Names."""
+    from name.models import Location, Name, Note, Variant
+
+    rand = random.Random(seed)
+    ids = list(Name.objects.order_by('id').values_list('id', flat=True))
+    ids = rand.sample(ids, min(count, len(ids)))
+    Location.objects.bulk_create(
+        Location(belong_to_name_id=id,
+                 latitude=str(rand.uniform(-90, 90))[:12],
+                 longitude=str(rand.uniform(-180, 180))[:12])
+        for id in ids)
+    Variant.objects.bulk_create(
+        Variant(belong_to_name_id=id, variant=common.random_name(rand),
+                variant_type=Variant.OTHER)
+        for id in ids)
+    Note.objects.bulk_create(
+        Note(belong_to_name_id=id, note='A note.', note_type=Note.SOURCE)
+        for id in ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--names', type=int, default=20000)
+    parser.add_argument('--locations', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    teardown = common.setup()
+    try:
+        from django.test.client import RequestFactory
+        from django.test.utils import setup_test_environment
+        from name.api import fast, serializers
+        from name.api.views import JSONResponse
+        from name.models import Location, Name
+
+        common.populate(args.names)
+        populate_locations(args.locations)
+
+        # Allows the host of the RequestFactory in the absolute URLs.
+        setup_test_environment()
+        request = RequestFactory().get('/name/search.json')
+        url = fast.detail_url(request)
+        names = Name.objects.visible()
+        locations = Location.objects.filter(status=Location.CURRENT)
+
+        def serializer(cls, queryset):
+            return lambda: JSONResponse(cls(
+                queryset, many=True, context={'request': request}).data)
+
+        cases = [
+            ('search results, serializer',
+             serializer(serializers.NameSearchSerializer, names)),
+            ('search results, fast',
+             lambda: JSONResponse(fast.search_results(
+                 names.values(*fast.SEARCH_FIELDS), url))),
+            ('locations, serializer',
+             serializer(serializers.LocationSerializer, locations)),
+            ('locations, fast',
+             lambda: JSONResponse(fast.locations(locations, url))),
+        ]
+        for label, func in cases:
+            common.report(label, common.timeit(func, args.repeat))
+    finally:
+        teardown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#! /usr/bin/env python
+"""Compare the counts of visible Names by Name Type of the landing page
+and stats.json, as counted by filtering every Name in Python before,
+with the GROUP BY query of active_type_counts, and with its cache, as
+the number of Names grows.
+
+Usage:
+    ./benchmarks/type_counts.py [--sizes N,N,...] [--repeat N]
+"""
+from __future__ import print_function
+
+import argparse
+
+import common
+
+
+def python_counts():
+    """The counts as they were before the GROUP BY query."""
+    from name.models import Name
+
+    names = Name.objects.visible()
+    return {
+        'total': names.count(),
+        'personal': len(filter(lambda n: n.is_personal(), names)),
+        'organization': len(filter(lambda n: n.is_organization(), names)),
+        'event': len(filter(lambda n: n.is_event(), names)),
+        'software': len(filter(lambda n: n.is_software(), names)),
+        'building': len(filter(lambda n: n.is_building(), names))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='1000,10000,100000')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    teardown = common.setup()
+    try:
+        from django.core.cache import cache
+        from name import app_settings
+        from name.models import Name
+
+        count = 0
+        for size in [int(size) for size in args.sizes.split(',')]:
+            # bulk_create does not invalidate the cache.
+            app_settings.NAME_STATS_CACHE = None
+            common.populate(size - count, seed=size, start=count)
+            count = size
+            assert python_counts() == Name.objects.active_type_counts()
+
+            common.report('{0} names: python'.format(size),
+                          common.timeit(python_counts, args.repeat))
+            common.report('{0} names: group by'.format(size),
+                          common.timeit(Name.objects.active_type_counts,
+                                        args.repeat))
+
+            app_settings.NAME_STATS_CACHE = 'default'
+            cache.clear()
+            Name.objects.active_type_counts()
+            common.report('{0} names: cached'.format(size),
+                          common.timeit(Name.objects.active_type_counts,
+                                        args.repeat))
+    finally:
+        teardown()
+
+
+if __name__ == '__main__':
+    main()
@@ -61,6 +61,7 @@ class MergedWithInline(admin.TabularInline):
         return False
 
     model = Name
+    fk_name = 'merged_with'
     verbose_name_plural = 'names that are merged with this record'
     verbose_name = 'names merged with this record'
     readonly_fields = ('name',)
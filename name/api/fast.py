@@ -0,0 +1,184 @@
+"""Fast serialization of Names for the JSON endpoints.
+
+The serializers in serializers.py build field objects for every Name
+they serialize, and reverse the URL of its detail page, which dominates
+the time spent on large responses. The functions here build the same
+data straight from values() rows, and build the URLs of the detail
+pages from a URL reversed once per request.
+
+Their output must stay the same as that of NameSearchSerializer,
+NameSerializer and LocationSerializer, which the tests check.
+"""
+import decimal
+from collections import OrderedDict
+
+from rest_framework.reverse import reverse
+
+from ..models import Identifier, Location, Name, Note, Variant
+
+# The Name fields read for the search results and for the details of
+# Names.
+SEARCH_FIELDS = ('id', 'name', 'name_type', 'begin', 'disambiguation',
+                 'name_id')
+NAME_FIELDS = ('id', 'name', 'name_type', 'begin', 'end', 'name_id')
+
+# Stands for the name_id in the reversed URL of a detail page.
+PLACEHOLDER = 'NAME-ID'
+
+
+def type_labels(choices):
+    """Maps the values of choices to their lowercased labels."""
+    return dict((value, label.lower()) for value, label in choices)
+
+
+NAME_TYPES = type_labels(Name.NAME_TYPE_CHOICES)
+NOTE_TYPES = type_labels(Note.NOTE_TYPE_CHOICES)
+VARIANT_TYPES = type_labels(Variant.VARIANT_TYPE_CHOICES)
+
+
+def decimal_formatter(field):
+    """Returns a function formatting the values of a DecimalField the
+    way the DecimalField of the serializers does.
+    """
+    quantum = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.Context(prec=field.max_digits)
+
+    def format(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(unicode(value).strip())
+        return u'{0:f}'.format(value.quantize(quantum, context=context))
+    return format
+
+
+format_latitude = decimal_formatter(Location._meta.get_field('latitude'))
+format_longitude = decimal_formatter(Location._meta.get_field('longitude'))
+
+
+def url_builder(url):
+    """Returns a function mapping a name_id to url, the URL of a detail
+    page reversed with the PLACEHOLDER, with the name_id in its place.
+
+    The URL is reversed once, so name_ids must not need quoting, which
+    is the case for the name_ids assigned by the Name model.
+    """
+    prefix, suffix = url.split(PLACEHOLDER)
+    return lambda name_id: prefix + name_id + suffix
+
+
+def detail_url(request):
+    """Returns a function mapping a name_id to the absolute URL of the
+    detail page of the Name, as the HyperlinkedIdentityField of the
+    serializers does for the request.
+    """
+    return url_builder(reverse('name:detail', kwargs={'name_id': PLACEHOLDER},
+                               request=request))
+
+
+def base_detail_url(base_url):
+    """Same as detail_url, for the site at base_url, such as
+    https://example.org, without the format of a request.
+    """
+    return url_builder(base_url.rstrip('/') +
+                       reverse('name:detail', kwargs={'name_id': PLACEHOLDER}))
+
+
+def search_results(rows, url):
+    """Serializes Names as the NameSearchSerializer does.
+
+    rows are dicts with the SEARCH_FIELDS of each Name, such as the
+    rows of a values() queryset, and url the function returned by
+    detail_url.
+    """
+    results = []
+    for row in rows:
+        if row['disambiguation']:
+            label = u'{0} ({1})'.format(row['name'], row['disambiguation'])
+        else:
+            label = row['name']
+        results.append(OrderedDict([
+            ('id', row['id']),
+            ('name', row['name']),
+            ('label', label),
+            ('type', NAME_TYPES[row['name_type']]),
+            ('begin_date', row['begin']),
+            ('disambiguation', row['disambiguation']),
+            ('URL', url(row['name_id'])),
+        ]))
+    return results
+
+
+def group_by_name(rows, keys, types=None):
+    """Groups values_list rows of a model related to Name, whose first
+    value is the id of the Name, into lists of OrderedDicts mapping keys
+    to the other values. The last value is replaced by its label in
+    types, if given.
+
+    Returns a dict mapping the ids of the Names to their lists.
+    """
+    groups = {}
+    for row in rows:
+        values = list(row[1:])
+        if types is not None:
+            values[-1] = types[values[-1]]
+        groups.setdefault(row[0], []).append(
+            OrderedDict(zip(keys, values)))
+    return groups
+
+
+def names(rows, url):
+    """Serializes Names, with their Identifiers, Notes and Variants, as
+    the NameSerializer does.
+
+    rows are dicts with the NAME_FIELDS of each Name, and url the
+    function returned by detail_url. The related objects of all the
+    Names are read with a query per model.
+    """
+    rows = list(rows)
+    ids = [row['id'] for row in rows]
+
+    links = group_by_name(
+        Identifier.objects.filter(belong_to_name__in=ids)
+                          .values_list('belong_to_name', 'type__label',
+                                       'value'),
+        ('label', 'href'))
+    notes = group_by_name(
+        Note.objects.filter(belong_to_name__in=ids)
+                    .values_list('belong_to_name', 'note', 'note_type'),
+        ('note', 'type'), NOTE_TYPES)
+    variants = group_by_name(
+        Variant.objects.filter(belong_to_name__in=ids)
+                       .values_list('belong_to_name', 'variant',
+                                    'variant_type'),
+        ('variant', 'type'), VARIANT_TYPES)
+
+    return [OrderedDict([
+        ('authoritative_name', row['name']),
+        ('name_type', NAME_TYPES[row['name_type']]),
+        ('begin_date', row['begin']),
+        ('end_date', row['end']),
+        ('identifier', url(row['name_id'])),
+        ('links', links.get(row['id'], [])),
+        ('notes', notes.get(row['id'], [])),
+        ('variants', variants.get(row['id'], [])),
+    ]) for row in rows]
+
+
+def locations(locations, url):
+    """Serializes the Locations of the locations queryset, with their
+    Names, as the LocationSerializer does.
+    """
+    rows = list(locations.values_list('id', 'belong_to_name', 'latitude',
+                                      'longitude', 'status'))
+    name_ids = set(row[1] for row in rows)
+    name_rows = list(Name.objects.filter(id__in=name_ids)
+                                 .values(*NAME_FIELDS))
+    details = dict(zip([row['id'] for row in name_rows],
+                       names(name_rows, url)))
+
+    return [OrderedDict([
+        ('id', id),
+        ('belong_to_name', details[name_id]),
+        ('latitude', format_latitude(latitude)),
+        ('longitude', format_longitude(longitude)),
+        ('status', status),
+    ]) for id, name_id, latitude, longitude, status in rows]
@@ -1,11 +1,17 @@
+import json
+
 from django import http
-from django.shortcuts import get_object_or_404
+from django.core.urlresolvers import reverse
+from django.shortcuts import get_object_or_404, redirect
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 
 from rest_framework.renderers import JSONRenderer
-from . import serializers, stats as statistics
-from ..decorators import jsonp
+from . import fast, serializers, stats as statistics
+from .. import app_settings, autocomplete, reconcile
+from ..decorators import cache_name_page, jsonp, name_condition
 from ..models import Name, Location
-from ..utils import filter_names
+from ..utils import cached_search, filter_names, resolve_type
 
 
 class JSONResponse(http.HttpResponse):
@@ -17,9 +23,18 @@ class JSONResponse(http.HttpResponse):
         super(JSONResponse, self).__init__(content, **kwargs)
 
 
+@name_condition
+@cache_name_page
 def name_json(request, name_id):
     """Returns result of name query in json format."""
-    name = get_object_or_404(Name, name_id=name_id)
+    name = get_object_or_404(
+        Name.objects.with_related().select_related('canonical_target'),
+        name_id=name_id)
+
+    if name.merged_with_id:
+        return redirect('name:detail-json',
+                        name.get_canonical_target().name_id)
+
     data = serializers.NameSerializer(name, context={'request': request})
 
     return JSONResponse(data.data)
@@ -39,30 +54,90 @@ def search_json(request):
     This also provides the endpoint used for autocompletion
     during search.
     """
-    names = filter_names(request)
-
     # If the request is AJAX, then it is most likely for autocompletion,
     # so we will only return first 10 names.
-    if request.is_ajax():
-        names = names[:10]
-
-    data = serializers.NameSearchSerializer(
-        names, many=True, context={'request': request})
-
-    response = JSONResponse(data.data)
+    if request.is_ajax() and app_settings.NAME_AUTOCOMPLETE_ENABLED:
+        rows = autocomplete.index.search_rows(
+            request.GET.get('q'),
+            resolve_type(request.GET.get('q_type')),
+            limit=10)
+    elif request.is_ajax():
+        rows = cached_search(request, filter_names(request)[:10],
+                             fast.SEARCH_FIELDS, 'ajax')
+    else:
+        rows = cached_search(request, filter_names(request),
+                             fast.SEARCH_FIELDS)
+
+    response = JSONResponse(
+        fast.search_results(rows, fast.detail_url(request)))
     response['Access-Control-Allow-Origin'] = '*'
     response['Access-Control-Allow-Headers'] = 'X-Requested-With'
 
     return response
 
 
+@csrf_exempt
+@jsonp
+def reconcile_json(request):
+    """OpenRefine compatible reconciliation service.
+
+    A batch of queries is passed, as a JSON object, in the `queries`
+    parameter, and a single query in the `query` parameter. Without
+    either, the service metadata is returned.
+    """
+    params = request.POST if request.method == 'POST' else request.GET
+
+    if 'queries' in params:
+        try:
+            queries = json.loads(params['queries'])
+        except ValueError:
+            return http.HttpResponseBadRequest('queries is not valid JSON.')
+        if not isinstance(queries, dict):
+            return http.HttpResponseBadRequest('queries must be an object.')
+        return JSONResponse(reconcile.reconcile(queries))
+
+    if 'query' in params:
+        try:
+            query = json.loads(params['query'])
+        except ValueError:
+            query = params['query']
+        return JSONResponse(reconcile.reconcile({'q': query})['q'])
+
+    view_url = request.build_absolute_uri(
+        reverse('name:detail', args=['NAME_ID']))
+    return JSONResponse({
+        'name': '{0} Reconciliation'.format(app_settings.NAME_APP_TITLE),
+        'identifierSpace': request.build_absolute_uri(reverse('name:landing')),
+        'schemaSpace': request.build_absolute_uri(reverse('name:landing')),
+        'defaultTypes': reconcile.get_types(),
+        'view': {'url': view_url.replace('NAME_ID', '{{id}}')},
+    })
+
+
+@csrf_exempt
+@require_POST
+def labels_json(request):
+    """Resolves a batch of labels to name_ids.
+
+    The request body is a JSON array of labels. The response maps each
+    label to its status, and to the name_id it resolves to or to the
+    message the label view would return for it.
+    """
+    try:
+        labels = json.loads(request.body)
+    except ValueError:
+        return http.HttpResponseBadRequest('The body is not valid JSON.')
+    if (not isinstance(labels, list) or
+            not all(isinstance(label, basestring) for label in labels)):
+        return http.HttpResponseBadRequest(
+            'The body must be an array of labels.')
+    return JSONResponse(reconcile.resolve_labels(labels))
+
+
 def locations_json(request):
     """Presents the Locations and related Names serialized into JSON."""
     if request.is_ajax():
         locations = Location.objects.filter(status=0)
-
-        data = serializers.LocationSerializer(
-            locations, many=True, context={'request': request})
-
-        return JSONResponse(data.data)
+        return JSONResponse(
+            fast.locations(locations, fast.detail_url(request)))
     return http.HttpResponseNotFound()
@@ -13,3 +13,41 @@ NAME_FEED_AUTHOR_LINK = getattr(settings, 'NAME_FEED_AUTHOR_LINK', None)
 NAME_APP_TITLE = getattr(settings, 'NAME_APP_TITLE', __title__)
 
 NAME_ADMIN_EMAIL = getattr(settings, 'NAME_ADMIN_EMAIL', None)
+
+# App level settings for search.
+NAME_SEARCH_BACKEND = getattr(settings, 'NAME_SEARCH_BACKEND', 'icontains')
+
+NAME_SEARCH_TRIGRAM_THRESHOLD = getattr(
+    settings, 'NAME_SEARCH_TRIGRAM_THRESHOLD', 0.3)
+
+NAME_SEARCH_TRIGRAM_CANDIDATES = getattr(
+    settings, 'NAME_SEARCH_TRIGRAM_CANDIDATES', 500)
+
+NAME_SEARCH_PAGINATION = getattr(settings, 'NAME_SEARCH_PAGINATION', 'page')
+
+NAME_SEARCH_CACHE = getattr(settings, 'NAME_SEARCH_CACHE', None)
+
+NAME_SEARCH_COUNT_THRESHOLD = getattr(
+    settings, 'NAME_SEARCH_COUNT_THRESHOLD', 1000)
+
+# App level settings for the pages of single Names.
+NAME_PAGE_CACHE = getattr(settings, 'NAME_PAGE_CACHE', None)
+
+# App level settings for statistics.
+NAME_STATS_CACHE = getattr(settings, 'NAME_STATS_CACHE', None)
+
+# App level settings for the export.
+NAME_EXPORT_CHUNK_SIZE = getattr(settings, 'NAME_EXPORT_CHUNK_SIZE', 1000)
+
+NAME_EXPORT_SNAPSHOT_DIR = getattr(settings, 'NAME_EXPORT_SNAPSHOT_DIR', None)
+
+# App level settings for reconciliation.
+NAME_RECONCILE_CHUNK_SIZE = getattr(settings, 'NAME_RECONCILE_CHUNK_SIZE', 500)
+
+NAME_RECONCILE_WORKERS = getattr(settings, 'NAME_RECONCILE_WORKERS', 4)
+
+# App level settings for autocompletion.
+NAME_AUTOCOMPLETE_ENABLED = getattr(settings, 'NAME_AUTOCOMPLETE_ENABLED', False)
+
+NAME_AUTOCOMPLETE_REFRESH_INTERVAL = getattr(
+    settings, 'NAME_AUTOCOMPLETE_REFRESH_INTERVAL', 30)
@@ -0,0 +1,260 @@
+"""In-process prefix index used to answer autocompletion requests.
+
+Each worker process keeps the normalized names and variants of all
+visible Names in memory, so that autocompletion does not query the
+database on every keystroke.
+
+The index is a sorted list of keys with a parallel list of Name ids,
+searched with bisect. This is far more compact in Python than a trie
+made of one object per character, while a prefix lookup is still a
+binary search followed by a scan over the matching keys.
+
+Every word of a normalized form starts a key, so 'smith john' is
+indexed as both 'smith john' and 'john'. A query matches a Name if the
+normalized query is a prefix of one of its keys.
+
+Changes made in the same process are applied through signals. Changes
+made by other processes are picked up by looking for Names modified
+since the last refresh, at most once every
+NAME_AUTOCOMPLETE_REFRESH_INTERVAL seconds. Deleted Names leave no
+modified date behind, so the number of visible Names is compared with
+the number of Names in the index, and their ids are compared when the
+numbers differ.
+"""
+import datetime
+import threading
+import time
+from bisect import bisect_left
+
+from django.db.models.signals import post_delete, post_save
+from pynaco.naco import normalizeSimplified
+
+from . import app_settings
+from .models import Name, Variant
+
+# The Name fields kept in memory for each indexed Name. These are the
+# fields needed to serialize search results.
+FIELDS = ('id', 'name', 'name_type', 'begin', 'disambiguation', 'name_id')
+NAME_TYPE = FIELDS.index('name_type')
+
+# Every refresh reads the Names modified since this long before the
+# latest last_modified date seen, so that a transaction that commits
+# after a refresh, with an earlier last_modified date, is not missed.
+SYNC_OVERLAP = datetime.timedelta(minutes=5)
+
+# The number of ids looked up per query when comparing the ids of the
+# visible Names with the index.
+ID_CHUNK_SIZE = 500
+
+
+def index_keys(normalized):
+    """Returns a key for every word that starts the normalized string."""
+    words = normalized.split()
+    return [u' '.join(words[i:]) for i in range(len(words))]
+
+
+class PrefixIndex(object):
+    """Sorted array prefix index over the visible Names."""
+
+    def __init__(self, chunk_size=10000):
+        self.chunk_size = chunk_size
+        self._lock = threading.RLock()
+        self._keys = []
+        self._ids = []
+        self._records = {}
+        self._synced = None
+        self._checked = None
+
+    @property
+    def loaded(self):
+        return self._checked is not None
+
+    def load(self):
+        """Load all visible Names into the index.
+
+        Names are read in primary key ranges, and the keys are sorted
+        once at the end rather than inserted one at a time.
+        """
+        with self._lock:
+            self._records, self._synced = {}, None
+            pairs = []
+
+            names = Name.objects.order_by('id')
+            last_id = 0
+            while True:
+                chunk = list(self._collect(
+                    names.filter(id__gt=last_id)[:self.chunk_size]))
+                if not chunk:
+                    break
+                for fields, keys in chunk:
+                    if keys is not None:
+                        self._records[fields[0]] = (fields, keys)
+                        pairs.extend((key, fields[0]) for key in keys)
+                last_id = chunk[-1][0][0]
+
+            pairs.sort()
+            self._keys = [key for key, id in pairs]
+            self._ids = [id for key, id in pairs]
+            self._checked = time.time()
+
+    def refresh(self):
+        """Apply the changes made to Names since the last refresh."""
+        with self._lock:
+            if self._synced is None:
+                self.load()
+                return
+            self._update(Name.objects.filter(
+                last_modified__gte=self._synced - SYNC_OVERLAP))
+            self._sync_ids()
+            self._checked = time.time()
+
+    def update_name(self, name_id):
+        """Reindex a single Name by id."""
+        with self._lock:
+            self._update(Name.objects.filter(id=name_id))
+
+    def remove_name(self, name_id):
+        """Drop a single Name from the index by id."""
+        with self._lock:
+            self._remove(name_id)
+
+    def search(self, q, name_types=None, limit=10):
+        """Returns up to limit unsaved Name instances whose normalized
+        name or variants have a word sequence starting with q.
+
+        The results are ordered by the matching key, and may be
+        restricted to a list of Name Types.
+        """
+        return [Name(**row) for row in self.search_rows(q, name_types, limit)]
+
+    def search_rows(self, q, name_types=None, limit=10):
+        """Same as search, but returns dicts mapping the FIELDS to the
+        values of each Name, like the rows of a values() queryset.
+        """
+        self._ensure_fresh()
+
+        prefix = normalizeSimplified(q) if q else u''
+        results, seen = [], set()
+
+        with self._lock:
+            position = bisect_left(self._keys, prefix)
+            while len(results) < limit and position < len(self._keys):
+                if not self._keys[position].startswith(prefix):
+                    break
+
+                id = self._ids[position]
+                fields = self._records[id][0]
+                position += 1
+
+                if id in seen:
+                    continue
+                if name_types and fields[NAME_TYPE] not in name_types:
+                    continue
+
+                seen.add(id)
+                results.append(dict(zip(FIELDS, fields)))
+        return results
+
+    def _ensure_fresh(self):
+        if not self.loaded:
+            self.load()
+        elif (time.time() - self._checked >
+                app_settings.NAME_AUTOCOMPLETE_REFRESH_INTERVAL):
+            self.refresh()
+
+    def _collect(self, names):
+        """Yields a (fields, keys) tuple for every Name in the names
+        queryset. The keys of Names that are not visible are None.
+        """
+        rows = list(names.values_list('record_status', 'merged_with',
+                                      'normalized_name', 'last_modified',
+                                      *FIELDS))
+        forms = dict((row[4], [row[2]]) for row in rows)
+        variants = (Variant.objects.filter(belong_to_name__in=forms.keys())
+                                   .values_list('belong_to_name',
+                                                'normalized_variant'))
+        for id, normalized_variant in variants:
+            forms[id].append(normalized_variant)
+
+        for row in rows:
+            status, merged_with, normalized, modified = row[:4]
+            fields = row[4:]
+            if self._synced is None or modified > self._synced:
+                self._synced = modified
+
+            keys = None
+            if status == Name.ACTIVE and merged_with is None:
+                keys = set()
+                for form in forms[fields[0]]:
+                    keys.update(index_keys(form))
+            yield fields, keys
+
+    def _update(self, names):
+        """Reindex every Name in the names queryset."""
+        for fields, keys in list(self._collect(names.order_by())):
+            self._remove(fields[0])
+            if keys is None:
+                continue
+
+            self._records[fields[0]] = (fields, keys)
+            for key in keys:
+                position = bisect_left(self._keys, key)
+                self._keys.insert(position, key)
+                self._ids.insert(position, fields[0])
+
+    def _sync_ids(self):
+        """Bring the ids in the index in line with those of the visible
+        Names, when their numbers differ.
+
+        This drops the Names deleted by other processes, including with
+        raw SQL, and adds visible Names that were missed.
+        """
+        visible = Name.objects.visible()
+        if visible.count() == len(self._records):
+            return
+
+        ids = set(visible.values_list('id', flat=True).iterator())
+        for id in [id for id in self._records if id not in ids]:
+            self._remove(id)
+
+        missing = sorted(ids.difference(self._records))
+        for start in range(0, len(missing), ID_CHUNK_SIZE):
+            chunk = missing[start:start + ID_CHUNK_SIZE]
+            self._update(Name.objects.filter(id__in=chunk))
+
+    def _remove(self, id):
+        record = self._records.pop(id, None)
+        if record is None:
+            return
+
+        for key in record[1]:
+            position = bisect_left(self._keys, key)
+            while self._ids[position] != id:
+                position += 1
+            del self._keys[position]
+            del self._ids[position]
+
+
+# The index for this process.
+index = PrefixIndex()
+
+
+def _name_saved(sender, instance, **kwargs):
+    if index.loaded:
+        index.update_name(instance.id)
+
+
+def _name_deleted(sender, instance, **kwargs):
+    if index.loaded:
+        index.remove_name(instance.id)
+
+
+def _variant_changed(sender, instance, **kwargs):
+    if index.loaded:
+        index.update_name(instance.belong_to_name_id)
+
+
+post_save.connect(_name_saved, sender=Name)
+post_delete.connect(_name_deleted, sender=Name)
+post_save.connect(_variant_changed, sender=Variant)
+post_delete.connect(_variant_changed, sender=Variant)
@@ -0,0 +1,140 @@
+"""Caches invalidated by bumping a generation counter.
+
+Every key of a GenerationCache includes the current value of a counter
+kept in the cache itself. Instead of finding and deleting the entries
+built from data that changed, the counter is bumped, so the following
+lookups use new keys and the old entries are never read again. They are
+left to expire, or to be evicted by the cache.
+
+The counter is bumped straight away, and bumped again when the request
+ends if the change was made inside a transaction, since other processes
+could have cached the data as it was before the transaction committed.
+"""
+import hashlib
+import threading
+import time
+
+from django.core.signals import request_finished
+from django.db import connection
+
+from . import app_settings
+
+try:
+    from django.core.cache import caches
+except ImportError:
+    # Django 1.6
+    from django.core.cache import get_cache
+else:
+    def get_cache(alias):
+        return caches[alias]
+
+
+_pending = threading.local()
+
+
+class GenerationCache(object):
+    """A namespace of cache entries that are all invalidated together.
+
+    setting is the name of the app setting holding the alias of the
+    cache to use. Caching is disabled while the setting is None.
+    """
+
+    def __init__(self, namespace, setting):
+        self.namespace = namespace
+        self.setting = setting
+
+    @property
+    def cache(self):
+        alias = getattr(app_settings, self.setting)
+        return get_cache(alias) if alias else None
+
+    @property
+    def enabled(self):
+        return self.cache is not None
+
+    def _generation_key(self):
+        return 'name:{0}:generation'.format(self.namespace)
+
+    def generation(self):
+        """Returns the current value of the counter."""
+        cache, key = self.cache, self._generation_key()
+        value = cache.get(key)
+        if value is None:
+            # Start from the current time rather than from 0, so a
+            # counter that was evicted does not go back to a generation
+            # whose entries may still be in the cache.
+            cache.add(key, int(time.time() * 1000))
+            value = cache.get(key)
+        return value
+
+    def make_key(self, key):
+        """Returns the cache key for key in the current generation.
+
+        Make the key before computing the value to store, so a value
+        computed while the counter is bumped is stored under the old
+        generation.
+        """
+        if not self.enabled:
+            return None
+        digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+        return 'name:{0}:{1}:{2}'.format(
+            self.namespace, self.generation(), digest)
+
+    def get(self, key):
+        if key is None:
+            return None
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        if key is not None:
+            self.cache.set(key, value)
+
+    def bump(self):
+        """Bump the counter, making every existing entry unreachable."""
+        if not self.enabled:
+            return
+
+        try:
+            self.cache.incr(self._generation_key())
+        except ValueError:
+            self.generation()
+
+    def invalidate(self):
+        """Bump the counter now, and again at the end of the request if
+        a transaction is open.
+        """
+        self.bump()
+        if self.enabled and connection.in_atomic_block:
+            if not hasattr(_pending, 'caches'):
+                _pending.caches = set()
+            _pending.caches.add(self)
+
+
+def _invalidate_pending(sender, **kwargs):
+    caches = getattr(_pending, 'caches', set())
+    _pending.caches = set()
+    for cache in caches:
+        cache.bump()
+
+
+request_finished.connect(_invalidate_pending)
+
+
+# Ordered ids of search results, see name.utils.cached_search.
+search_results = GenerationCache('search', 'NAME_SEARCH_CACHE')
+
+# Rendered pages of single Names, see name.decorators.cache_name_page.
+# Bumping name_pages invalidates the pages of every Name.
+name_pages = GenerationCache('pages', 'NAME_PAGE_CACHE')
+
+
+def name_page(name_id):
+    """Returns the cache of the rendered pages of a single Name, whose
+    counter serves as the version of the Name.
+    """
+    return GenerationCache('page:{0}'.format(name_id), 'NAME_PAGE_CACHE')
+
+
+# Counts of the visible Names by Name Type, see
+# name.models.NameManager.active_type_counts.
+type_counts = GenerationCache('type-counts', 'NAME_STATS_CACHE')
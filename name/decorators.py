@@ -28,3 +28,98 @@ def jsonp(f):
             return resp
 
     return jsonp_wrapper
+
+
+def cache_name_page(f):
+    """Cache the successful responses of a view of a single Name.
+
+    Responses are stored, with their headers, under the absolute URL of
+    the request and the version of the Name, which is bumped whenever the Name or one of its
+    related objects changes, see name.models.invalidate_name_pages.
+    Only anonymous requests are served from, and stored in, the cache,
+    since authenticated users are shown controls to edit the Name.
+
+    Usage:
+
+    @cache_name_page
+    def my_name_view(request, name_id):
+        ...
+    """
+    from functools import wraps
+    from django import http
+    from .cache import name_page, name_pages
+
+    @wraps(f)
+    def cache_name_page_wrapper(request, name_id, *args, **kwargs):
+        page = name_page(name_id)
+        user = getattr(request, 'user', None)
+        if not page.enabled or (user and user.is_authenticated()):
+            return f(request, name_id, *args, **kwargs)
+
+        key = page.make_key(u'{0} {1}'.format(
+            name_pages.generation(), request.build_absolute_uri()))
+        cached = page.get(key)
+        if cached is not None:
+            content, headers = cached
+            resp = http.HttpResponse(content)
+            for header, value in headers:
+                resp[header] = value
+            return resp
+
+        resp = f(request, name_id, *args, **kwargs)
+        if resp.status_code == 200 and not resp.streaming:
+            page.set(key, (resp.content, list(resp.items())))
+        return resp
+
+    return cache_name_page_wrapper
+
+
+def _name_last_modified(request, name_id):
+    """Returns the last_modified date of the Name, which is looked up
+    once per request.
+    """
+    from .models import Name
+
+    if not hasattr(request, '_name_last_modified'):
+        request._name_last_modified = (
+            Name.objects.filter(name_id=name_id)
+                        .values_list('last_modified', flat=True)
+                        .first())
+    return request._name_last_modified
+
+
+def _name_etag(request, name_id):
+    """Derives the ETag of a view of a single Name from its last_modified
+    date, which changes along with its related objects, and from the
+    BIOGRAPHY_RENDERER, which changes the biography HTML without
+    changing the date. Authenticated users are shown a different page,
+    so they get a different ETag.
+    """
+    import hashlib
+
+    from .models import BIOGRAPHY_RENDERER
+
+    last_modified = _name_last_modified(request, name_id)
+    if last_modified is None:
+        return None
+    user = getattr(request, 'user', None)
+    authenticated = bool(user and user.is_authenticated())
+    return hashlib.md5(u'{0} {1} {2} {3}'.format(
+        name_id, last_modified.isoformat(), authenticated,
+        BIOGRAPHY_RENDERER)).hexdigest()
+
+
+def name_condition(f):
+    """Answer conditional requests for a view of a single Name with a
+    304 Not Modified response, using a single query on the Name.
+
+    Usage:
+
+    @name_condition
+    def my_name_view(request, name_id):
+        ...
+    """
+    from django.views.decorators.http import condition
+
+    return condition(etag_func=_name_etag,
+                     last_modified_func=_name_last_modified)(f)
@@ -0,0 +1,204 @@
+"""Dumps of all the visible Names, for use offline.
+
+The Name table is split into shards of consecutive primary keys, and
+each shard is written to a file per format by a pool of processes, each
+with its own database connection. The files of the shards are then
+concatenated into a single file per format, or kept as they are, and
+listed in a manifest along with their sizes and SHA-1 digests.
+
+The TSV and JSON lines formats are those of the export, and each MADS
+XML record is that of the detail page of the Name.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+
+import django
+from django.db import connections
+from django.db.models import Max
+from django.template import Context, loader
+from django.utils import timezone
+
+from .api.fast import base_detail_url
+from .export import chunked_rows, export_jsonl, export_tsv
+from .models import Name
+from .snapshots import read_file
+
+MADS_HEADER = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+               '<madsCollection xmlns="http://www.loc.gov/mads/v2">\n')
+MADS_FOOTER = '</madsCollection>\n'
+
+MANIFEST = 'manifest.json'
+
+
+def dump_tsv(names, base_url, chunk_size):
+    return export_tsv(names, base_detail_url(base_url), chunk_size)
+
+
+def dump_jsonl(names, base_url, chunk_size):
+    return export_jsonl(names, base_detail_url(base_url), chunk_size)
+
+
+def mads_renderer():
+    """Returns a function rendering the MADS XML record of a Name from
+    a context dict, loading the template once rather than per Name.
+    """
+    template = loader.get_template('name/name.mads.xml')
+    # Templates take a Context before Django 1.8, and a dict since.
+    if django.VERSION < (1, 8):
+        return lambda context: template.render(Context(context))
+    return template.render
+
+
+def dump_mads(names, base_url, chunk_size):
+    """Yields the MADS XML collection of the names queryset, a string
+    for the records of every chunk of chunk_size Names.
+    """
+    render = mads_renderer()
+    yield MADS_HEADER
+    for chunk in chunked_rows(names, (), chunk_size):
+        records = (Name.objects.with_related()
+                               .filter(id__in=[row[0] for row in chunk])
+                               .order_by('id'))
+        yield ''.join(
+            render({'name': name, 'base_url': base_url})
+            .strip().encode('utf-8') + '\n'
+            for name in records)
+    yield MADS_FOOTER
+
+
+# The file extension, the generator, and the header and footer of the
+# file of each format. The header and footer are only written once to
+# concatenated files.
+FORMATS = {
+    'tsv': ('tsv', dump_tsv, '', ''),
+    'jsonl': ('jsonl', dump_jsonl, '', ''),
+    'mads': ('xml', dump_mads, MADS_HEADER, MADS_FOOTER),
+}
+
+
+def shard_ranges(shard_size):
+    """Returns the (first, last) primary keys of every shard of
+    shard_size primary keys up to the last Name.
+    """
+    last_id = Name.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+    return [(start + 1, min(start + shard_size, last_id))
+            for start in range(0, last_id, shard_size)]
+
+
+def write_file(path, pieces):
+    """Writes the strings of pieces to the file at path.
+
+    Returns the size and SHA-1 digest of the file.
+    """
+    digest, size = hashlib.sha1(), 0
+    with open(path, 'wb') as f:
+        for piece in pieces:
+            f.write(piece)
+            digest.update(piece)
+            size += len(piece)
+    return {'size': size, 'sha1': digest.hexdigest()}
+
+
+def dump_shard(task):
+    """Writes the files of a shard, for a process of the pool.
+
+    task is a (directory, formats, base_url, first, last, chunk_size)
+    tuple. Returns the entry of the shard in the manifest.
+    """
+    directory, formats, base_url, first, last, chunk_size = task
+    names = Name.objects.visible().filter(id__gte=first, id__lte=last)
+
+    files = {}
+    for format in formats:
+        extension, dump, header, footer = FORMATS[format]
+        name = '{0}-{1:09d}.{2}'.format(format, first, extension)
+        files[format] = write_file(os.path.join(directory, name),
+                                   dump(names, base_url, chunk_size))
+        files[format]['path'] = name
+
+    return {'first_id': first, 'last_id': last,
+            'names': names.count(), 'files': files}
+
+
+def concatenate(directory, format, shards):
+    """Concatenates the files of format of the shards into a single
+    file, keeping a single header and footer, and deletes them.
+
+    Returns the entry of the file in the manifest.
+    """
+    extension, dump, header, footer = FORMATS[format]
+
+    def pieces():
+        yield header
+        for shard in shards:
+            info = shard['files'][format]
+            path = os.path.join(directory, info['path'])
+            for block in read_file(path, len(header),
+                                   info['size'] - len(footer)):
+                yield block
+        yield footer
+
+    name = 'names.{0}'.format(extension)
+    info = write_file(os.path.join(directory, name), pieces())
+    info['path'] = name
+
+    for shard in shards:
+        os.remove(os.path.join(directory, shard['files'][format]['path']))
+    return info
+
+
+def close_connections():
+    """Closes the database connections, which must not be shared with
+    the processes of the pool.
+    """
+    for connection in connections.all():
+        connection.close()
+
+
+def dump(directory, base_url, formats=tuple(FORMATS), processes=None,
+         shard_size=10000, chunk_size=1000, concatenated=True):
+    """Dumps the visible Names to directory in formats, with the URLs
+    of the site at base_url.
+
+    The shards of shard_size primary keys are written by a pool of
+    processes, as many as there are CPUs by default, or in this
+    process if processes is 1. Each shard is read in chunks of
+    chunk_size Names. Returns the manifest, which is also written to
+    the directory.
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    tasks = [(directory, formats, base_url, first, last, chunk_size)
+             for first, last in shard_ranges(shard_size)]
+
+    if processes == 1:
+        shards = [dump_shard(task) for task in tasks]
+    else:
+        close_connections()
+        pool = multiprocessing.Pool(processes, close_connections)
+        try:
+            shards = pool.map(dump_shard, tasks, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+    manifest = {
+        'created': timezone.now().isoformat(),
+        'base_url': base_url,
+        'shard_size': shard_size,
+        'names': sum(shard['names'] for shard in shards),
+        'shards': shards,
+        'files': {},
+    }
+    if concatenated:
+        for format in formats:
+            manifest['files'][format] = concatenate(directory, format, shards)
+        for shard in shards:
+            del shard['files']
+
+    with open(os.path.join(directory, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=4, sort_keys=True)
+    return manifest
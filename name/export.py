@@ -0,0 +1,214 @@
+"""Export of Names as tab separated values, or as JSON lines.
+
+The export reads the Names in chunks of primary keys, as values_list
+rows rather than model instances, and writes each chunk as soon as it
+is read, so the memory used does not grow with the number of Names.
+
+The delta export only lists the Names changed since a date, and the
+Names removed from the export since then, which were merged, deleted or
+suppressed, so that mirrors can be kept up to date.
+"""
+import csv
+import datetime
+import itertools
+import json
+from collections import OrderedDict
+
+from dateutil import parser, tz
+from django.conf import settings
+from django.utils import timezone
+
+from .api import fast
+from .models import DeletedName, Name
+
+# The columns of the TSV export.
+TSV_FIELDS = ('name_type', 'name', 'name_id')
+
+# The statuses of the Names removed from the export, listed by the delta
+# export.
+DELETED = 'deleted'
+MERGED = 'merged'
+SUPPRESSED = 'suppressed'
+
+STATUSES = {Name.DELETED: DELETED, Name.SUPPRESSED: SUPPRESSED}
+
+# The delta export lists the changes made since this long before the
+# since date, so that a transaction that commits after the previous
+# download, with an earlier last_modified date, is not missed.
+DELTA_OVERLAP = datetime.timedelta(minutes=5)
+
+
+class Buffer(object):
+    """A file-like object keeping what is written to it until it is
+    read, for the csv writer.
+    """
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(data)
+
+    def read(self):
+        data, self.parts = ''.join(self.parts), []
+        return data
+
+
+def chunked_rows(names, fields, chunk_size):
+    """Yields the values_list rows of the names queryset, with the id
+    followed by fields, in lists of up to chunk_size rows.
+
+    The rows are read in primary key order, each list with a query
+    starting after the last id of the previous one, so every chunk costs
+    the same and only one is held in memory at a time.
+    """
+    rows = names.order_by('id').values_list('id', *fields)
+    last_id = 0
+    while True:
+        chunk = list(rows.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            break
+        yield chunk
+        last_id = chunk[-1][0]
+
+
+def export_tsv(names, url, chunk_size):
+    """Yields the TSV export of the names queryset, a string for every
+    chunk of chunk_size Names.
+
+    Each row holds the lowercased Name Type, the name and the URL of the
+    detail page, built by the url function from the name_id.
+    """
+    buffer = Buffer()
+    writer = csv.writer(buffer, delimiter='\t', quoting=csv.QUOTE_MINIMAL)
+
+    for chunk in chunked_rows(names, TSV_FIELDS, chunk_size):
+        writer.writerows(
+            [fast.NAME_TYPES[name_type], name.encode('utf-8'), url(name_id)]
+            for id, name_type, name, name_id in chunk)
+        yield buffer.read()
+
+
+def export_jsonl(names, url, chunk_size):
+    """Yields the JSON lines export of the names queryset, a string for
+    every chunk of chunk_size Names.
+
+    Each line is the JSON object of a Name, as returned by the API.
+    """
+    for chunk in chunked_rows(names, fast.NAME_FIELDS[1:], chunk_size):
+        rows = [dict(zip(fast.NAME_FIELDS, row)) for row in chunk]
+        lines = []
+        for data in fast.names(rows, url):
+            line = json.dumps(data, ensure_ascii=False,
+                              separators=(',', ':'))
+            if isinstance(line, unicode):
+                line = line.encode('utf-8')
+            lines.append(line + '\n')
+        yield ''.join(lines)
+
+
+def parse_since(value):
+    """Parses the since date of the delta export, an ISO 8601 date and
+    time, such as 2015-06-30T12:00:00Z. Dates without a time zone are in
+    the current time zone.
+
+    Raises ValueError if value is not a valid date.
+    """
+    try:
+        # Otherwise, UTC is read as the local time zone when they match.
+        since = parser.parse(value, tzinfos={'UTC': tz.tzutc()})
+    except (OverflowError, TypeError):
+        raise ValueError('Invalid date: {0!r}'.format(value))
+
+    zone = timezone.get_current_timezone()
+    if settings.USE_TZ and timezone.is_naive(since):
+        since = timezone.make_aware(since, zone)
+    elif not settings.USE_TZ and timezone.is_aware(since):
+        since = timezone.make_naive(since, zone)
+    return since
+
+
+def removed_names(since, chunk_size):
+    """Yields lists of up to chunk_size (status, name_id, name,
+    merged_with) tuples, for every Name removed from the export since
+    the since date.
+
+    The status is MERGED, with the name_id of the Name it was merged
+    with as merged_with, DELETED or SUPPRESSED.
+    """
+    names = (Name.objects.filter(last_modified__gt=since)
+                         .exclude(record_status=Name.ACTIVE, merged_with=None))
+    fields = ('name_id', 'name', 'record_status', 'canonical_target__name_id',
+              'merged_with__name_id')
+    for chunk in chunked_rows(names, fields, chunk_size):
+        removed = []
+        for id, name_id, name, status, target, merged_with in chunk:
+            if merged_with:
+                removed.append((MERGED, name_id, name, target or merged_with))
+            else:
+                removed.append((STATUSES[status], name_id, name, None))
+        yield removed
+
+    deleted = DeletedName.objects.filter(deleted__gt=since)
+    for chunk in chunked_rows(deleted, ('name_id', 'name'), chunk_size):
+        yield [(DELETED, name_id, name, None) for id, name_id, name in chunk]
+
+
+def removed_tsv(since, url, chunk_size):
+    """Yields the TSV rows of the Names removed from the export since
+    the since date, with their status in place of their Name Type.
+    """
+    buffer = Buffer()
+    writer = csv.writer(buffer, delimiter='\t', quoting=csv.QUOTE_MINIMAL)
+
+    for chunk in removed_names(since, chunk_size):
+        writer.writerows([status, name.encode('utf-8'), url(name_id)]
+                         for status, name_id, name, merged_with in chunk)
+        yield buffer.read()
+
+
+def removed_jsonl(since, url, chunk_size):
+    """Yields the JSON lines of the Names removed from the export since
+    the since date, each an object with the identifier of the Name, its
+    status and, for merged Names, the identifier of the Name it was
+    merged with.
+    """
+    for chunk in removed_names(since, chunk_size):
+        lines = []
+        for status, name_id, name, merged_with in chunk:
+            data = OrderedDict([('identifier', url(name_id)),
+                                ('status', status)])
+            if merged_with:
+                data['merged_with'] = url(merged_with)
+            lines.append(json.dumps(data, separators=(',', ':')) + '\n')
+        yield ''.join(lines)
+
+
+def export_delta(format, since, url, chunk_size):
+    """Yields the export of format for the visible Names changed since
+    the since date, followed by the Names removed from the export since
+    then.
+
+    The changes are read from DELTA_OVERLAP before the since date, so
+    Names may be listed again by the next delta export. Removed Names
+    are also listed again when their Variants, Notes, Identifiers or
+    Locations change, which mirrors apply the same way.
+    """
+    export, content_type = FORMATS[format]
+    since -= DELTA_OVERLAP
+    names = Name.objects.visible().filter(last_modified__gt=since)
+    return itertools.chain(export(names, url, chunk_size),
+                           REMOVED[format](since, url, chunk_size))
+
+
+# The generator and content type of each format of the export.
+FORMATS = {
+    'tsv': (export_tsv, 'text/csv'),
+    'jsonl': (export_jsonl, 'application/x-ndjson'),
+}
+
+# The generator of the removed Names of each format of the delta export.
+REMOVED = {
+    'tsv': removed_tsv,
+    'jsonl': removed_jsonl,
+}
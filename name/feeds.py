@@ -58,8 +58,9 @@ class NameAtomFeed(Feed):
         return obj.last_modified
 
     def item_location(self, obj):
-        if obj.has_current_location():
-            return obj.location_set.current_location.geo_point()
+        location = obj.current_location()
+        if location:
+            return location.geo_point()
 
     def item_extra_kwargs(self, obj):
         return {u'geo_point': self.item_location(obj)}
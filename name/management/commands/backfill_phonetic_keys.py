@@ -0,0 +1,69 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from name.cache import search_results
+from name.models import Name, Variant
+from name.phonetic import phonetic_key
+
+
+def backfill(model, normalized_field, phonetic_field, chunk_size):
+    """Compute the phonetic keys of every row of model, reading the rows
+    in primary key ranges of chunk_size. Only rows whose key changed are
+    written.
+
+    Yields the number of rows processed and updated after each chunk.
+    """
+    rows = (model.objects.order_by('id')
+                         .values_list('id', normalized_field, phonetic_field))
+    last_id, processed, updated = 0, 0, 0
+
+    while True:
+        chunk = list(rows.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            break
+
+        with transaction.atomic():
+            for id, normalized, phonetic in chunk:
+                key = phonetic_key(normalized)
+                if key != phonetic:
+                    model.objects.filter(id=id).update(**{phonetic_field: key})
+                    updated += 1
+
+        last_id = chunk[-1][0]
+        processed += len(chunk)
+        yield processed, updated
+
+
+class Command(BaseCommand):
+    help = ('Computes the phonetic keys of existing Names and Variants, '
+            'which are otherwise set when they are saved.')
+
+    option_list = BaseCommand.option_list + (
+        make_option('--chunk-size',
+                    action='store',
+                    type='int',
+                    dest='chunk_size',
+                    default=1000,
+                    help='Number of rows to process per transaction.'),
+    )
+
+    def handle(self, *args, **options):
+        tables = ((Name, 'normalized_name', 'phonetic_name'),
+                  (Variant, 'normalized_variant', 'phonetic_variant'))
+
+        for model, normalized_field, phonetic_field in tables:
+            label = model._meta.verbose_name_plural
+            processed = updated = 0
+            for processed, updated in backfill(model, normalized_field,
+                                               phonetic_field,
+                                               options['chunk_size']):
+                if int(options.get('verbosity', 1)) > 1:
+                    self.stdout.write('Processed {0} {1}.'
+                                      .format(processed, label))
+
+            self.stdout.write('Updated the phonetic keys of {0} of {1} {2}.'
+                              .format(updated, processed, label))
+
+        search_results.invalidate()
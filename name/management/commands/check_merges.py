@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from name.merges import find_merge_problems
+from name.models import Name
+
+
+class Command(BaseCommand):
+    help = ('Checks the merges of every Name, reporting the loops of '
+            'merges and the Names merged with missing Names.')
+
+    def handle(self, *args, **options):
+        rows = (Name.objects.order_by('id')
+                            .values_list('id', 'merged_with').iterator())
+        loops, orphans = find_merge_problems(rows)
+
+        # Report the Names by name_id.
+        ids = set(orphans)
+        for loop in loops:
+            ids.update(loop)
+        name_ids = dict(Name.objects.filter(id__in=ids)
+                                    .values_list('id', 'name_id'))
+
+        for loop in loops:
+            self.stdout.write('Merge loop: {0}'.format(
+                ' -> '.join(name_ids[id] for id in loop + loop[:1])))
+
+        for id, merged_with in sorted(orphans.items()):
+            self.stdout.write('{0} is merged with the missing Name with '
+                              'id {1}.'.format(name_ids[id], merged_with))
+
+        if loops or orphans:
+            raise CommandError('Found {0} merge loops and {1} orphaned '
+                               'merges.'.format(len(loops), len(orphans)))
+        self.stdout.write('No merge problems found.')
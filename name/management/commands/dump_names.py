@@ -0,0 +1,75 @@
+import multiprocessing
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from name import app_settings
+from name.dump import FORMATS, dump
+
+
+class Command(BaseCommand):
+    help = ('Dumps every visible Name to a directory as TSV, JSON lines '
+            'and MADS XML files, writing shards of Names in parallel.')
+
+    option_list = BaseCommand.option_list + (
+        make_option('--output',
+                    action='store',
+                    dest='output',
+                    default=None,
+                    help='Directory to write the files to.'),
+        make_option('--base-url',
+                    action='store',
+                    dest='base_url',
+                    default=None,
+                    help='URL of the site the dumped URLs point to, '
+                         'such as https://example.org.'),
+        make_option('--formats',
+                    action='store',
+                    dest='formats',
+                    default=','.join(sorted(FORMATS)),
+                    help='Comma separated formats to dump, among '
+                         '{0}.'.format(', '.join(sorted(FORMATS)))),
+        make_option('--processes',
+                    action='store',
+                    type='int',
+                    dest='processes',
+                    default=multiprocessing.cpu_count(),
+                    help='Number of processes writing shards.'),
+        make_option('--shard-size',
+                    action='store',
+                    type='int',
+                    dest='shard_size',
+                    default=10000,
+                    help='Number of primary keys per shard.'),
+        make_option('--chunk-size',
+                    action='store',
+                    type='int',
+                    dest='chunk_size',
+                    default=app_settings.NAME_EXPORT_CHUNK_SIZE,
+                    help='Number of Names to read per query.'),
+        make_option('--no-concatenate',
+                    action='store_false',
+                    dest='concatenated',
+                    default=True,
+                    help='Keep a file per shard rather than a single '
+                         'file per format.'),
+    )
+
+    def handle(self, *args, **options):
+        if not options['output']:
+            raise CommandError('--output is required.')
+        if not options['base_url']:
+            raise CommandError('--base-url is required.')
+
+        formats = [format.strip() for format in options['formats'].split(',')]
+        unknown = [format for format in formats if format not in FORMATS]
+        if unknown:
+            raise CommandError('Unknown formats: {0}.'.format(
+                ', '.join(unknown)))
+
+        manifest = dump(options['output'], options['base_url'], formats,
+                        max(options['processes'], 1), options['shard_size'],
+                        options['chunk_size'], options['concatenated'])
+
+        self.stdout.write('Dumped {0} Names in {1} shards to {2}.'.format(
+            manifest['names'], len(manifest['shards']), options['output']))
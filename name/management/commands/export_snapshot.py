@@ -0,0 +1,63 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from name import app_settings
+from name.snapshots import write_snapshot
+
+
+class Command(BaseCommand):
+    help = ('Writes a snapshot of the export to NAME_EXPORT_SNAPSHOT_DIR, '
+            'which /export/ then serves. Only the shards of Names that '
+            'changed since the latest snapshot are written.')
+
+    option_list = BaseCommand.option_list + (
+        make_option('--base-url',
+                    action='store',
+                    dest='base_url',
+                    default=None,
+                    help='URL of the site the exported URLs point to, '
+                         'such as https://example.org.'),
+        make_option('--shard-size',
+                    action='store',
+                    type='int',
+                    dest='shard_size',
+                    default=10000,
+                    help='Number of primary keys per shard.'),
+        make_option('--chunk-size',
+                    action='store',
+                    type='int',
+                    dest='chunk_size',
+                    default=app_settings.NAME_EXPORT_CHUNK_SIZE,
+                    help='Number of Names to read per query.'),
+        make_option('--keep',
+                    action='store',
+                    type='int',
+                    dest='keep',
+                    default=2,
+                    help='Number of snapshots to keep, so that '
+                         'downloads in progress can finish.'),
+        make_option('--force',
+                    action='store_true',
+                    dest='force',
+                    default=False,
+                    help='Write every shard.'),
+    )
+
+    def handle(self, *args, **options):
+        directory = app_settings.NAME_EXPORT_SNAPSHOT_DIR
+        if not directory:
+            raise CommandError('NAME_EXPORT_SNAPSHOT_DIR is not set.')
+        if not options['base_url']:
+            raise CommandError('--base-url is required.')
+
+        manifest, written = write_snapshot(
+            directory, options['base_url'], options['shard_size'],
+            options['chunk_size'], options['force'], options['keep'])
+
+        if manifest is None:
+            self.stdout.write('The latest snapshot is up to date.')
+        else:
+            self.stdout.write('Wrote {0} of {1} shards to snapshot {2}.'
+                              .format(written, len(manifest['shards']),
+                                      manifest['version']))
@@ -0,0 +1,32 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from name.models import SEARCH_INDEXES
+
+
+class Command(BaseCommand):
+    help = ('Rebuilds the search indexes for all Names. Only the indexes '
+            'maintained for the configured NAME_SEARCH_BACKEND are rebuilt.')
+
+    option_list = BaseCommand.option_list + (
+        make_option('--chunk-size',
+                    action='store',
+                    type='int',
+                    dest='chunk_size',
+                    default=1000,
+                    help='Number of Names to index per transaction.'),
+    )
+
+    def handle(self, *args, **options):
+        for index in SEARCH_INDEXES:
+            if not index.is_maintained():
+                continue
+
+            indexed = 0
+            for indexed in index.rebuild(options['chunk_size']):
+                if int(options.get('verbosity', 1)) > 1:
+                    self.stdout.write('Indexed {0} names.'.format(indexed))
+
+            self.stdout.write('Rebuilt the {0} index for {1} names.'
+                              .format(index.label, indexed))
@@ -0,0 +1,69 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from name.cache import name_pages
+from name.models import BIOGRAPHY_RENDERER, Name, render_markdown
+
+
+def render(chunk_size, force=False):
+    """Render the biographies of the Names whose stored HTML was rendered
+    by another BIOGRAPHY_RENDERER, or of every Name if force is True,
+    reading the Names in primary key ranges of chunk_size.
+
+    Yields the number of Names rendered after each chunk.
+    """
+    names = (Name.objects.order_by('id')
+                         .only('id', 'biography', 'biography_renderer'))
+    if not force:
+        names = names.exclude(biography_renderer=BIOGRAPHY_RENDERER)
+    last_id, rendered = 0, 0
+
+    while True:
+        chunk = list(names.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            break
+
+        with transaction.atomic():
+            for name in chunk:
+                # Stored without touching the last_modified date, as the
+                # ETag of the Name includes the BIOGRAPHY_RENDERER.
+                Name.objects.filter(pk=name.pk).update(
+                    biography_html=render_markdown(name.biography),
+                    biography_renderer=BIOGRAPHY_RENDERER)
+
+        last_id = chunk[-1].id
+        rendered += len(chunk)
+        yield rendered
+
+
+class Command(BaseCommand):
+    help = ('Renders the biographies of the Names that were rendered by '
+            'another version of markdown2, such as after upgrading it.')
+
+    option_list = BaseCommand.option_list + (
+        make_option('--chunk-size',
+                    action='store',
+                    type='int',
+                    dest='chunk_size',
+                    default=1000,
+                    help='Number of Names to render per transaction.'),
+        make_option('--all',
+                    action='store_true',
+                    dest='force',
+                    default=False,
+                    help='Render the biographies of every Name.'),
+    )
+
+    def handle(self, *args, **options):
+        rendered = 0
+        for rendered in render(options['chunk_size'], options['force']):
+            if int(options.get('verbosity', 1)) > 1:
+                self.stdout.write('Rendered {0} biographies.'
+                                  .format(rendered))
+
+        self.stdout.write('Rendered the biographies of {0} names with {1}.'
+                          .format(rendered, BIOGRAPHY_RENDERER))
+
+        name_pages.invalidate()
@@ -0,0 +1,30 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from name.cache import name_pages
+from name.merges import repair_canonical_targets
+from name.models import Name
+
+
+class Command(BaseCommand):
+    help = ('Recomputes the canonical target, the Name at the end of the '
+            'chain of merges, of every Name.')
+
+    option_list = BaseCommand.option_list + (
+        make_option('--chunk-size',
+                    action='store',
+                    type='int',
+                    dest='chunk_size',
+                    default=500,
+                    help='Number of Names to update per query.'),
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            changed = repair_canonical_targets(Name, options['chunk_size'])
+        self.stdout.write('Repaired the canonical targets of {0} names.'
+                          .format(changed))
+        if changed:
+            name_pages.invalidate()
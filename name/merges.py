@@ -0,0 +1,183 @@
+"""Chains of merged Names.
+
+A Name merged with another Name points to it with merged_with, and the
+other Name may itself be merged, so following the links one Name at a
+time costs a query per merge. Each merged Name also stores the Name at
+the end of its chain, its canonical target, which is kept up to date
+by Name.save and can be recomputed for the whole table with
+repair_canonical_targets.
+
+The functions here only use the manager of the model they are given,
+so the migrations can call them with their historical models.
+"""
+import sqlite3
+
+from django.db import connection
+from django.utils import timezone
+
+# Selects the ids of the Names on the chain of merges starting at a
+# Name. UNION discards the rows already found, so the query ends even
+# if the chain loops.
+CHAIN_SQL = """
+    WITH RECURSIVE chain (id, merged_with_id) AS (
+        SELECT id, merged_with_id FROM {name} WHERE id = %s
+        UNION
+        SELECT {name}.id, {name}.merged_with_id FROM {name}
+        INNER JOIN chain ON {name}.id = chain.merged_with_id
+    )
+    SELECT id FROM chain
+"""
+
+
+def supports_recursive_queries():
+    """True if the database supports WITH RECURSIVE, which is the case
+    for PostgreSQL, for SQLite since version 3.8.3, and for MySQL since
+    version 8.0 and MariaDB since version 10.2.
+    """
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'sqlite':
+        return sqlite3.sqlite_version_info >= (3, 8, 3)
+    if connection.vendor == 'mysql':
+        # MariaDB versions start at 10, after the last MySQL 5 version.
+        version = connection.mysql_version
+        return (8, 0) <= version < (10,) or version >= (10, 2)
+    return False
+
+
+def merge_chain(model, id):
+    """Returns the set of ids of the Names on the chain of merges that
+    starts at the Name with the given id, including it if it exists.
+
+    The chain is selected with a single recursive query where the
+    database supports it, and with a query per Name otherwise.
+    """
+    if supports_recursive_queries():
+        cursor = connection.cursor()
+        table = connection.ops.quote_name(model._meta.db_table)
+        cursor.execute(CHAIN_SQL.format(name=table), [id])
+        return set(row[0] for row in cursor.fetchall())
+
+    chain = set()
+    while id is not None and id not in chain:
+        merged_with = (model.objects.filter(id=id)
+                                    .values_list('merged_with', flat=True))
+        if not merged_with:
+            break
+        chain.add(id)
+        id = merged_with[0]
+    return chain
+
+
+def find_survivors(links):
+    """Returns a dict mapping every id of links, a dict mapping the id
+    of each Name to the id of the Name it is merged with or None, to the
+    id of the Name at the end of its chain of merges.
+
+    A Name that is not merged is its own survivor. Names whose chain
+    loops, or leads to a Name that is not in links, have no survivor and
+    map to None.
+    """
+    survivors = {}
+    for start in links:
+        path, seen, current = [], set(), start
+        while True:
+            if current in survivors:
+                survivor = survivors[current]
+                break
+            if current not in links or current in seen:
+                survivor = None
+                break
+            path.append(current)
+            seen.add(current)
+            if links[current] is None:
+                survivor = current
+                break
+            current = links[current]
+
+        for id in path:
+            survivors[id] = survivor
+    return survivors
+
+
+def repair_canonical_targets(model, chunk_size=500, touch=True):
+    """Recompute the canonical_target of every row of the Name model.
+
+    The (id, merged_with) pairs of the whole table are read at once,
+    and only the rows whose canonical target changed are written, with
+    one UPDATE per target and chunk of chunk_size rows. The
+    last_modified date of the changed rows is updated unless touch is
+    False. Run it in a transaction, so the table does not change in
+    between. Returns the number of changed rows.
+    """
+    rows = (model.objects.order_by()
+                         .values_list('id', 'merged_with', 'canonical_target'))
+    links, current = {}, {}
+    for id, merged_with, canonical_target in rows.iterator():
+        links[id] = merged_with
+        current[id] = canonical_target
+
+    changes = {}
+    for id, survivor in find_survivors(links).items():
+        target = survivor if survivor != id else None
+        if current[id] != target:
+            changes.setdefault(target, []).append(id)
+
+    values = {'last_modified': timezone.now()} if touch else {}
+    changed = 0
+    for target, ids in changes.items():
+        ids.sort()
+        for i in range(0, len(ids), chunk_size):
+            chunk = ids[i:i + chunk_size]
+            model.objects.filter(id__in=chunk).update(
+                canonical_target=target, **values)
+            changed += len(chunk)
+    return changed
+
+
+def find_merge_problems(links):
+    """Checks the merges of a table of Names in a single pass over its
+    (id, merged_with id) pairs, with a union-find structure.
+
+    Returns a (loops, orphans) tuple. loops is a list of the loops of
+    merges, each a list of ids in merge order, and orphans is a dict
+    mapping the id of every Name merged with a missing Name to the id
+    of the missing Name.
+    """
+    ids, parents, merges, closing = set(), {}, {}, []
+
+    def find(id):
+        root = id
+        while parents.get(root, root) != root:
+            root = parents[root]
+        # Compress the path, so later finds are fast.
+        while id != root:
+            parents[id], id = root, parents[id]
+        return root
+
+    for id, merged_with in links:
+        ids.add(id)
+        parents.setdefault(id, id)
+        if merged_with is None:
+            continue
+        merges[id] = merged_with
+        parents.setdefault(merged_with, merged_with)
+        root, other = find(id), find(merged_with)
+        if root == other:
+            # Each Name is merged with at most one Name, so a merge
+            # between Names that are already connected closes a loop.
+            closing.append(id)
+        else:
+            parents[root] = other
+
+    loops = []
+    for id in closing:
+        loop, current = [id], merges[id]
+        while current != id:
+            loop.append(current)
+            current = merges[current]
+        loops.append(loop)
+
+    orphans = dict((id, merged_with) for id, merged_with in merges.items()
+                   if merged_with not in ids)
+    return loops, orphans
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('name', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NameToken',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('token', models.CharField(max_length=255, db_index=True)),
+                ('belong_to_name', models.ForeignKey(to='name.Name')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='nametoken',
+            unique_together=set([('token', 'belong_to_name')]),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+# The search_vector column is only used by the postgres search backend,
+# so it is only created on PostgreSQL.
+FORWARDS_SQL = [
+    'ALTER TABLE name_name ADD COLUMN search_vector tsvector',
+    'CREATE INDEX name_name_search_vector ON name_name '
+    'USING gin(search_vector)',
+]
+
+BACKWARDS_SQL = [
+    'DROP INDEX name_name_search_vector',
+    'ALTER TABLE name_name DROP COLUMN search_vector',
+]
+
+
+def forwards(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in FORWARDS_SQL:
+            schema_editor.execute(sql)
+
+
+def backwards(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in BACKWARDS_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('name', '0003_nametrigram'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
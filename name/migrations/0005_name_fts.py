@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import DatabaseError, migrations
+
+# The name_name_fts table is only used by the sqlite search backend, so
+# it is only created on SQLite, and only when SQLite was built with the
+# FTS5 extension.
+FORWARDS_SQL = [
+    "CREATE VIRTUAL TABLE name_name_fts USING fts5("
+    "name, disambiguation, variants, "
+    "tokenize='unicode61 remove_diacritics 1')",
+]
+
+BACKWARDS_SQL = [
+    'DROP TABLE IF EXISTS name_name_fts',
+]
+
+
+def forwards(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        try:
+            for sql in FORWARDS_SQL:
+                schema_editor.execute(sql)
+        except DatabaseError:
+            pass
+
+
+def backwards(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in BACKWARDS_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('name', '0004_name_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
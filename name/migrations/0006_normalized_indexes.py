@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('name', '0005_name_fts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='name',
+            name='normalized_name',
+            field=models.CharField(help_text=b'NACO normalized form of the name', max_length=255, editable=False, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='variant',
+            name='normalized_variant',
+            field=models.CharField(help_text=b'NACO normalized variant text', max_length=255, editable=False, db_index=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('name', '0006_normalized_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='name',
+            name='phonetic_name',
+            field=models.CharField(help_text=b'Phonetic key of the normalized name', max_length=255, editable=False, db_index=True, blank=True),
+        ),
+        migrations.AddField(
+            model_name='variant',
+            name='phonetic_variant',
+            field=models.CharField(help_text=b'Phonetic key of the normalized variant', max_length=255, editable=False, db_index=True, blank=True),
+        ),
+    ]
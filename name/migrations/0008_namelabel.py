@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+# Index the labels of the existing Names and Variants. UNION drops the
+# duplicate (label, Name) pairs.
+POPULATE_SQL = """
+    INSERT INTO name_namelabel (token, belong_to_name_id)
+    SELECT normalized_name, id FROM name_name
+    WHERE normalized_name <> ''
+    UNION
+    SELECT normalized_variant, belong_to_name_id FROM name_variant
+    WHERE normalized_variant <> ''
+"""
+
+
+def populate(apps, schema_editor):
+    schema_editor.execute(POPULATE_SQL)
+
+
+def clear(apps, schema_editor):
+    schema_editor.execute('DELETE FROM name_namelabel')
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('name', '0007_phonetic_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NameLabel',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('token', models.CharField(max_length=255, db_index=True)),
+                ('belong_to_name', models.ForeignKey(to='name.Name')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='namelabel',
+            unique_together=set([('token', 'belong_to_name')]),
+        ),
+        migrations.RunPython(populate, clear),
+    ]
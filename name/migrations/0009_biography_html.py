@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('name', '0008_namelabel'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='name',
+            name='biography_html',
+            field=models.TextField(editable=False, blank=True),
+        ),
+        migrations.AddField(
+            model_name='name',
+            name='biography_renderer',
+            field=models.CharField(max_length=50, editable=False, blank=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from name.merges import repair_canonical_targets
+
+
+def populate(apps, schema_editor):
+    repair_canonical_targets(apps.get_model('name', 'Name'), touch=False)
+
+
+def noop(apps, schema_editor):
+    # RunPython.noop is only available from Django 1.8.
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('name', '0009_biography_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='name',
+            name='canonical_target',
+            field=models.ForeignKey(related_name='+', on_delete=django.db.models.deletion.SET_NULL, blank=True, editable=False, to='name.Name', null=True),
+        ),
+        migrations.RunPython(populate, noop),
+    ]
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('name', '0010_canonical_target'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedName',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('name_id', models.CharField(max_length=10)),
+                ('name', models.CharField(max_length=255)),
+                ('deleted', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='name',
+            name='last_modified',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
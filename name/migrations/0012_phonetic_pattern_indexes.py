@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+# The phonetic search matches the keys by prefix, with LIKE 'key%',
+# which PostgreSQL only answers from an index with the pattern operator
+# class, unless the database uses the C locale.
+FORWARDS_SQL = [
+    'CREATE INDEX name_name_phonetic_name_like ON name_name '
+    '(phonetic_name varchar_pattern_ops)',
+    'CREATE INDEX name_variant_phonetic_variant_like ON name_variant '
+    '(phonetic_variant varchar_pattern_ops)',
+]
+
+BACKWARDS_SQL = [
+    'DROP INDEX name_variant_phonetic_variant_like',
+    'DROP INDEX name_name_phonetic_name_like',
+]
+
+
+def forwards(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in FORWARDS_SQL:
+            schema_editor.execute(sql)
+
+
+def backwards(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in BACKWARDS_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('name', '0011_deleted_names'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -1,4 +1,6 @@
+import abc
 import json
+import threading
 import markdown2
 
 from django.utils.six.moves.urllib.request import urlopen
@@ -6,11 +8,26 @@ from django.utils.six.moves.urllib.parse import quote
 
 from django.core.urlresolvers import reverse
 from django.db import models, transaction, connection
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.utils import timezone
 from pynaco.naco import normalizeSimplified
 
+from . import app_settings
+from .cache import name_page, name_pages, search_results, type_counts
+from .phonetic import phonetic_key
 from .validators import validate_merged_with
 
 
+# Stamped on the stored biography HTML, so HTML rendered by another
+# version of markdown2 is rendered again.
+BIOGRAPHY_RENDERER = u'markdown2 {0}'.format(markdown2.__version__)
+
+
+def render_markdown(text):
+    """Returns the Markdown text rendered to HTML by BIOGRAPHY_RENDERER."""
+    return markdown2.markdown(text) if text else u''
+
+
 class Identifier_Type(models.Model):
     """Custom Identifier Type.
 
@@ -132,8 +149,16 @@ class Variant(models.Model):
     normalized_variant = models.CharField(
         max_length=255,
         editable=False,
+        db_index=True,
         help_text='NACO normalized variant text')
 
+    phonetic_variant = models.CharField(
+        max_length=255,
+        editable=False,
+        blank=True,
+        db_index=True,
+        help_text='Phonetic key of the normalized variant')
+
     def get_variant_type_label(self):
         """Returns the label associated with an instance's
         variant_type.
@@ -141,9 +166,10 @@ class Variant(models.Model):
         id, variant_type = self.VARIANT_TYPE_CHOICES[self.variant_type]
         return variant_type
 
-    def save(self):
+    def save(self, **kwargs):
         self.normalized_variant = normalizeSimplified(self.variant)
-        super(Variant, self).save()
+        self.phonetic_variant = phonetic_key(self.normalized_variant)
+        super(Variant, self).save(**kwargs)
 
     def __unicode__(self):
         return self.variant
@@ -208,23 +234,40 @@ class NameManager(models.Manager):
         return self.get_queryset().filter(
             record_status=self.model.ACTIVE, merged_with=None)
 
+    def with_related(self):
+        """Retrieves Name objects along with their Identifiers and
+        Identifier Types, Notes, Variants and Locations.
+
+        Each relation is prefetched with a single query, so displaying
+        or serializing a Name takes a fixed number of queries however
+        many related objects it has.
+        """
+        return self.get_queryset().prefetch_related(
+            'identifier_set__type', 'note_set', 'variant_set',
+            'location_set')
+
     def active_type_counts(self):
         """Calculates counts of Name objects by Name Type.
 
-        Statistics are based off of the queryset returned by visible.
-        The total number is calculated using the count method. All
-        additional figures are calculated using Python to reduce the number
-        of queries.
+        Statistics are based off of the queryset returned by visible,
+        counted with a single query grouping the Names by Name Type.
+        The counts are cached in NAME_STATS_CACHE, if set, until a Name
+        is saved or deleted.
         """
-        names = self.visible()
-        return {
-            'total': names.count(),
-            'personal': len(filter(lambda n: n.is_personal(), names)),
-            'organization': len(filter(lambda n: n.is_organization(), names)),
-            'event': len(filter(lambda n: n.is_event(), names)),
-            'software': len(filter(lambda n: n.is_software(), names)),
-            'building': len(filter(lambda n: n.is_building(), names))
-        }
+        key = type_counts.make_key('active')
+        counts = type_counts.get(key)
+        if counts is not None:
+            return counts
+
+        totals = dict(self.visible()
+                          .order_by()
+                          .values_list('name_type')
+                          .annotate(count=models.Count('id')))
+        counts = {'total': sum(totals.values())}
+        for name_type, label in self.model.NAME_TYPE_CHOICES:
+            counts[label.lower()] = totals.get(name_type, 0)
+        type_counts.set(key, counts)
+        return counts
 
     def _counts_per_month(self, date_column):
         """Calculates the number of Names by month according to the
@@ -331,8 +374,16 @@ class Name(models.Model):
     normalized_name = models.CharField(
         max_length=255,
         editable=False,
+        db_index=True,
         help_text='NACO normalized form of the name')
 
+    phonetic_name = models.CharField(
+        max_length=255,
+        editable=False,
+        blank=True,
+        db_index=True,
+        help_text='Phonetic key of the normalized name')
+
     name_type = models.IntegerField(max_length=1, choices=NAME_TYPE_CHOICES)
 
     # Date, month or year of birth or incorporation of the name
@@ -356,6 +407,12 @@ class Name(models.Model):
         blank=True,
         help_text='Compatible with MARKDOWN')
 
+    # The biography rendered to HTML, and the BIOGRAPHY_RENDERER that
+    # rendered it.
+    biography_html = models.TextField(blank=True, editable=False)
+    biography_renderer = models.CharField(
+        max_length=50, blank=True, editable=False)
+
     record_status = models.IntegerField(
         default=ACTIVE,
         choices=RECORD_STATUS_CHOICES)
@@ -366,8 +423,19 @@ class Name(models.Model):
         null=True,
         related_name='merged_with_name')
 
+    # The Name at the end of the chain of merged_with links, see
+    # name.merges.
+    canonical_target = models.ForeignKey(
+        'self',
+        blank=True,
+        null=True,
+        editable=False,
+        related_name='+',
+        on_delete=models.SET_NULL)
+
     date_created = models.DateTimeField(auto_now_add=True, editable=False)
-    last_modified = models.DateTimeField(auto_now=True, editable=False)
+    last_modified = models.DateTimeField(
+        auto_now=True, editable=False, db_index=True)
     name_id = models.CharField(max_length=10, unique=True, editable=False)
 
     objects = NameManager()
@@ -393,9 +461,36 @@ class Name(models.Model):
         """
         return self.DATE_DISPLAY_LABELS.get(self.name_type)
 
+    def current_location(self):
+        """Returns the Location marked as current, or None.
+
+        The Locations are filtered in Python, so no query is made when
+        they were prefetched.
+        """
+        for location in self.location_set.all():
+            if location.is_current():
+                return location
+        return None
+
+    def public_notes(self):
+        """Returns the Notes that are not Nonpublic.
+
+        Like current_location, this uses the prefetched Notes if any.
+        """
+        return [note for note in self.note_set.all()
+                if note.note_type != Note.NONPUBLIC]
+
+    def get_canonical_target(self):
+        """Returns the Name at the end of the chain of merges of this
+        Name, or None if it is not merged.
+        """
+        if self.merged_with_id is None:
+            return None
+        return self.canonical_target or self.merged_with
+
     def has_current_location(self):
         """True if the Name has a current location in the location_set."""
-        return self.location_set.current_location is not None
+        return self.current_location() is not None
 
     def has_geocode(self):
         """True if the instance has one or more related Locations."""
@@ -458,14 +553,27 @@ class Name(models.Model):
         return self._is_record_status(self.SUPPRESSED)
 
     def render_biography(self):
-        """Render the Markdown biography to HTML."""
-        return markdown2.markdown(self.biography)
+        """Returns the Markdown biography rendered to HTML.
+
+        The HTML is rendered and stored when the Name is saved. If it was
+        rendered by another version of the renderer, it is rendered again
+        but not stored, which is left to the render_biographies command.
+        """
+        if self.biography_renderer != BIOGRAPHY_RENDERER:
+            return render_markdown(self.biography)
+        return self.biography_html
 
     def __normalize_name(self):
         """Normalize the name attribute and assign it the normalized_name
-        attribute.
+        attribute, and its phonetic key to the phonetic_name attribute.
         """
         self.normalized_name = normalizeSimplified(self.name)
+        self.phonetic_name = phonetic_key(self.normalized_name)
+
+    def __render_biography(self):
+        """Render the biography to the biography_html attribute."""
+        self.biography_html = render_markdown(self.biography)
+        self.biography_renderer = BIOGRAPHY_RENDERER
 
     def __find_location(self):
         """Use the normalized_name attribute and the Location.URL to
@@ -493,10 +601,49 @@ class Name(models.Model):
         if not self.name_id:
             self.name_id = unicode(BaseTicketing.objects.create())
 
+    def __update_canonical_target(self):
+        """Set the canonical_target attribute to the Name at the end of
+        the chain of merged_with links, using the canonical target of
+        the Name this Name is merged with.
+        """
+        if self.merged_with_id is None:
+            self.canonical_target_id = None
+            return
+
+        target = (Name.objects.filter(id=self.merged_with_id)
+                              .values_list('canonical_target', flat=True)
+                              .first())
+        target = target or self.merged_with_id
+        # A loop has no surviving Name.
+        self.canonical_target_id = target if target != self.pk else None
+
+    def __update_merged_names(self):
+        """Point the Names merged with this Name, directly or through
+        other Names, at its canonical target, or at this Name if it is
+        not merged. Their last_modified date is updated as well.
+        """
+        merged, level = set(), [self.pk]
+        while level:
+            level = [id for id in (Name.objects.filter(merged_with__in=level)
+                                               .values_list('id', flat=True))
+                     if id not in merged and id != self.pk]
+            merged.update(level)
+
+        if merged:
+            Name.objects.filter(id__in=merged).update(
+                canonical_target=self.canonical_target_id or self.pk,
+                last_modified=timezone.now())
+
     def save(self, **kwargs):
         self.__normalize_name()
+        self.__render_biography()
         self.__assign_name_id()
+        canonical_target_id = self.canonical_target_id
+        self.__update_canonical_target()
         super(Name, self).save()
+        if self.canonical_target_id != canonical_target_id:
+            self.__update_merged_names()
+        index_name(self)
         if self.is_building() and not self.location_set.count():
             self.__find_location()
 
@@ -589,3 +736,501 @@ class Location(models.Model):
 
     def __unicode__(self):
         return self.geo_point()
+
+
+class DeletedName(models.Model):
+    """Records the deletion of a Name, so that the delta export can
+    list the Names deleted since a date.
+    """
+    name_id = models.CharField(max_length=10)
+    name = models.CharField(max_length=255)
+    deleted = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __unicode__(self):
+        return self.name_id
+
+
+class SearchIndexManager(models.Manager):
+    """Custom Manager for the search index models.
+
+    Provides methods for maintaining an index of the terms produced by
+    the model's tokenize method for each Name and its Variants.
+    """
+
+    def _name_tokens(self, name):
+        """Collect the tokens for the name and all of its variants."""
+        tokens = set(self.model.tokenize(name.normalized_name))
+        variants = (Variant.objects.filter(belong_to_name=name)
+                                   .values_list('normalized_variant', flat=True))
+        for normalized_variant in variants:
+            tokens.update(self.model.tokenize(normalized_variant))
+        return tokens
+
+    def is_maintained(self):
+        return self.model.is_maintained()
+
+    @property
+    def label(self):
+        return self.model._meta.verbose_name
+
+    def index_name(self, name):
+        """Bring the tokens of a single Name object up to date.
+
+        Only the difference between the stored tokens and the current
+        tokens is written, so saving a Name without changing its name or
+        variants does not touch the index. Nothing is done when the
+        index is not maintained.
+        """
+        if not self.is_maintained():
+            return
+
+        tokens = self._name_tokens(name)
+        indexed = set(self.filter(belong_to_name=name)
+                          .values_list('token', flat=True))
+
+        with transaction.atomic():
+            stale = indexed - tokens
+            if stale:
+                self.filter(belong_to_name=name, token__in=stale).delete()
+            self.bulk_create([
+                self.model(token=token, belong_to_name=name)
+                for token in tokens - indexed
+            ])
+
+    def remove_name(self, name_id):
+        """Nothing to do, the rows of a deleted Name are removed with it
+        by the cascade.
+        """
+        pass
+
+    def rebuild(self, chunk_size=1000):
+        """Rebuild the entire index.
+
+        Names are read in primary key ranges of chunk_size so the whole
+        table is never held in memory. Yields the number of Names
+        indexed after each chunk.
+        """
+        self.all().delete()
+
+        names = Name.objects.order_by('id').values_list('id', 'normalized_name')
+        last_id, indexed = 0, 0
+
+        while True:
+            chunk = list(names.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+
+            tokens = dict((id, set(self.model.tokenize(normalized)))
+                          for id, normalized in chunk)
+            variants = (Variant.objects.filter(belong_to_name__in=tokens.keys())
+                               .values_list('belong_to_name', 'normalized_variant'))
+            for id, normalized_variant in variants:
+                tokens[id].update(self.model.tokenize(normalized_variant))
+
+            with transaction.atomic():
+                self.bulk_create([
+                    self.model(token=token, belong_to_name_id=id)
+                    for id, name_tokens in tokens.items()
+                    for token in name_tokens
+                ])
+
+            last_id = chunk[-1][0]
+            indexed += len(chunk)
+            yield indexed
+
+
+class SearchIndex(models.Model):
+    """Abstract base for the search index models.
+
+    Each row relates a single term to the Name whose normalized name, or
+    one of whose normalized variants, produced it. The terms are the
+    words of the normalized string, unless a subclass breaks it into
+    terms differently.
+    """
+    token = models.CharField(max_length=255, db_index=True)
+    belong_to_name = models.ForeignKey('Name')
+
+    objects = SearchIndexManager()
+
+    class Meta:
+        abstract = True
+        unique_together = (('token', 'belong_to_name'),)
+
+    @staticmethod
+    def tokenize(normalized):
+        """Split a NACO normalized string into its words."""
+        return normalized.split()
+
+    @classmethod
+    def is_maintained(cls):
+        """True if the index is updated when Names and Variants are
+        saved.
+        """
+        return True
+
+    def __unicode__(self):
+        return self.token
+
+
+class NameToken(SearchIndex):
+    """A single word of a Name's normalized name or of one of its
+    normalized variants.
+
+    This is an inverted index that allows searching Names by the words
+    they contain using indexed lookups, rather than scanning the Name
+    and Variant tables with a substring match.
+    """
+
+    @classmethod
+    def is_maintained(cls):
+        return app_settings.NAME_SEARCH_BACKEND == 'token'
+
+
+class NameTrigram(SearchIndex):
+    """A trigram of a Name's normalized name or of one of its
+    normalized variants.
+
+    Used by the trigram search backend to find Names that are similar,
+    but not identical, to the query. The table holds many rows per
+    Name, so it is only maintained while the trigram backend is
+    selected.
+    """
+
+    @staticmethod
+    def tokenize(normalized):
+        """Break a NACO normalized string into trigrams.
+
+        Each word is padded with two spaces in front and one behind, so
+        the beginnings of words weigh more than their ends. For
+        example, 'john' produces '  j', ' jo', 'joh', 'ohn', 'hn '.
+        """
+        trigrams = set()
+        for word in normalized.split():
+            padded = u'  {0} '.format(word)
+            trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+        return trigrams
+
+    @classmethod
+    def is_maintained(cls):
+        return app_settings.NAME_SEARCH_BACKEND == 'trigram'
+
+    @classmethod
+    def similarity(cls, a, b):
+        """Jaccard similarity of two sets of trigrams."""
+        if not a or not b:
+            return 0.0
+        shared = len(a & b)
+        return float(shared) / (len(a) + len(b) - shared)
+
+
+class NameLabelManager(SearchIndexManager):
+    """Custom Manager for the NameLabel model."""
+
+    def resolve(self, labels):
+        """Resolve normalized labels to the Names they identify.
+
+        Returns a dict mapping each label to the sorted name_ids of the
+        Names it resolves to, after following merges to the surviving
+        Names. A label that is the normalized name of some Name only
+        resolves to those Names, and to Names of which it is a variant
+        otherwise. An empty list means the label is unknown, and more
+        than one name_id that it is ambiguous.
+        """
+        labels = set(labels)
+        rows = (self.filter(token__in=labels)
+                    .values_list('token',
+                                 'belong_to_name__name_id',
+                                 'belong_to_name__normalized_name',
+                                 'belong_to_name__merged_with',
+                                 'belong_to_name__canonical_target__name_id'))
+
+        matches = dict((label, ([], [])) for label in labels)
+        for label, name_id, normalized_name, merged_with, target in rows:
+            authoritative, variant = matches[label]
+            if merged_with is not None:
+                # Names in a merge loop have no canonical target.
+                name_id = target
+            if name_id is None:
+                continue
+            if normalized_name == label:
+                authoritative.append(name_id)
+            else:
+                variant.append(name_id)
+
+        return dict((label, sorted(set(authoritative or variant)))
+                    for label, (authoritative, variant) in matches.items())
+
+
+class NameLabel(SearchIndex):
+    """The whole normalized name, or a whole normalized variant, of a
+    Name.
+
+    Used to resolve a label to the Name it identifies with a single
+    indexed lookup, instead of scanning the Name and Variant tables.
+    """
+
+    objects = NameLabelManager()
+
+    @staticmethod
+    def tokenize(normalized):
+        """The label is the normalized string itself."""
+        return [normalized] if normalized else []
+
+
+class SQLSearchIndex(object):
+    """Base for the search indexes maintained with raw SQL over ranges
+    of Name ids.
+
+    An index is maintained while its backend is selected and the
+    database is of its vendor. Subclasses define _update.
+    """
+    __metaclass__ = abc.ABCMeta
+
+    label = None
+    backend = None
+    vendor = None
+
+    def is_maintained(self):
+        return (app_settings.NAME_SEARCH_BACKEND == self.backend and
+                connection.vendor == self.vendor)
+
+    @abc.abstractmethod
+    def _update(self, first_id, last_id):
+        """Update the index for the Names with ids in the range
+        (first_id, last_id].
+        """
+
+    def index_name(self, name):
+        """Bring the index of a single Name object up to date."""
+        if self.is_maintained():
+            self._update(name.id - 1, name.id)
+
+    def remove_name(self, name_id):
+        """Drop a deleted Name from the index."""
+        pass
+
+    def clear(self):
+        """Called before the index is rebuilt."""
+        pass
+
+    def rebuild(self, chunk_size=1000):
+        """Recompute the index for all Names.
+
+        The Names are updated in primary key ranges of chunk_size. Yields
+        the number of Names indexed after each chunk.
+        """
+        self.clear()
+
+        ids = Name.objects.order_by('id').values_list('id', flat=True)
+        last_id, indexed = 0, 0
+
+        while True:
+            chunk = list(ids.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+
+            with transaction.atomic():
+                self._update(last_id, chunk[-1])
+
+            last_id = chunk[-1]
+            indexed += len(chunk)
+            yield indexed
+
+
+class PostgresSearchVector(SQLSearchIndex):
+    """Maintains the search_vector column of the Name table.
+
+    The column is a tsvector of the normalized name, the normalized
+    variants and the disambiguation of the Name, weighted in that
+    order, and is backed by a GIN index. It is only created by the
+    migrations on PostgreSQL, and is only maintained while the postgres
+    search backend is selected.
+    """
+    label = 'postgres search vector'
+    backend = 'postgres'
+    vendor = 'postgresql'
+
+    UPDATE_SQL = """
+        UPDATE {name} SET search_vector =
+            setweight(to_tsvector('simple', {name}.normalized_name), 'A') ||
+            setweight(to_tsvector('simple', coalesce((
+                SELECT string_agg(normalized_variant, ' ')
+                FROM {variant}
+                WHERE {variant}.belong_to_name_id = {name}.id), '')), 'B') ||
+            setweight(to_tsvector('simple', {name}.disambiguation), 'C')
+        WHERE {name}.id > %s AND {name}.id <= %s
+    """
+
+    def _update(self, first_id, last_id):
+        qn = connection.ops.quote_name
+        sql = self.UPDATE_SQL.format(name=qn(Name._meta.db_table),
+                                     variant=qn(Variant._meta.db_table))
+        connection.cursor().execute(sql, [first_id, last_id])
+
+
+class SQLiteFullTextIndex(SQLSearchIndex):
+    """Maintains the name_name_fts FTS5 virtual table.
+
+    The table holds the name, the disambiguation and the variants of
+    each Name, with the Name id as the rowid. It is only created by the
+    migrations on SQLite, and is only maintained while the sqlite search
+    backend is selected.
+    """
+    label = 'sqlite full text'
+    backend = 'sqlite'
+    vendor = 'sqlite'
+    table = 'name_name_fts'
+
+    DELETE_SQL = 'DELETE FROM {fts} WHERE rowid > %s AND rowid <= %s'
+
+    INSERT_SQL = """
+        INSERT INTO {fts} (rowid, name, disambiguation, variants)
+        SELECT {name}.id, {name}.name, {name}.disambiguation,
+            coalesce((
+                SELECT group_concat(variant, ' ')
+                FROM {variant}
+                WHERE {variant}.belong_to_name_id = {name}.id), '')
+        FROM {name}
+        WHERE {name}.id > %s AND {name}.id <= %s
+    """
+
+    def _update(self, first_id, last_id):
+        qn = connection.ops.quote_name
+        cursor = connection.cursor()
+        cursor.execute(self.DELETE_SQL.format(fts=self.table),
+                       [first_id, last_id])
+        cursor.execute(self.INSERT_SQL.format(fts=self.table,
+                                              name=qn(Name._meta.db_table),
+                                              variant=qn(Variant._meta.db_table)),
+                       [first_id, last_id])
+
+    def remove_name(self, name_id):
+        if self.is_maintained():
+            connection.cursor().execute(
+                self.DELETE_SQL.format(fts=self.table), [name_id - 1, name_id])
+
+    def clear(self):
+        connection.cursor().execute('DELETE FROM {0}'.format(self.table))
+
+
+# The search indexes that are updated when a Name or Variant is saved,
+# and rebuilt by the rebuild_search_index command.
+SEARCH_INDEXES = (NameLabel.objects, NameToken.objects, NameTrigram.objects,
+                  PostgresSearchVector(), SQLiteFullTextIndex())
+
+
+def index_name(name):
+    """Update every maintained search index for the Name, and invalidate
+    the cached search results.
+    """
+    for index in SEARCH_INDEXES:
+        index.index_name(name)
+    search_results.invalidate()
+
+
+# The ids of the Names being deleted in this thread. Their Variants are
+# deleted before them, and must not add them to the indexes again.
+_deleting = threading.local()
+
+
+def names_being_deleted():
+    if not hasattr(_deleting, 'ids'):
+        _deleting.ids = set()
+    return _deleting.ids
+
+
+def mark_name_deleted(sender, instance, **kwargs):
+    names_being_deleted().add(instance.id)
+
+
+def unindex_name(sender, instance, **kwargs):
+    """Remove a deleted Name from every maintained search index."""
+    names_being_deleted().discard(instance.id)
+    for index in SEARCH_INDEXES:
+        index.remove_name(instance.id)
+    search_results.invalidate()
+
+
+pre_delete.connect(mark_name_deleted, sender=Name)
+post_delete.connect(unindex_name, sender=Name)
+
+
+def index_variant_name(sender, instance, **kwargs):
+    """Update the search indexes of the Name that the saved or deleted
+    Variant belongs to, however it was saved or deleted.
+    """
+    if instance.belong_to_name_id in names_being_deleted():
+        # Deleted along with the Name, which is removed from the
+        # indexes by its own signal.
+        return
+    index_name(instance.belong_to_name)
+
+
+post_save.connect(index_variant_name, sender=Variant)
+post_delete.connect(index_variant_name, sender=Variant)
+
+
+def invalidate_name_pages(sender, instance, **kwargs):
+    """Bump the version of the cached pages of the Name that was saved
+    or deleted, or that the saved or deleted object belongs to.
+    """
+    if isinstance(instance, Name):
+        name = instance
+    else:
+        try:
+            name = instance.belong_to_name
+        except Name.DoesNotExist:
+            # Deleted along with the Name, whose pages are invalidated
+            # by its own signal.
+            return
+    name_page(name.name_id).invalidate()
+
+
+def invalidate_type_counts(sender, instance, **kwargs):
+    """Any saved or deleted Name may change the counts by Name Type."""
+    type_counts.invalidate()
+
+
+def invalidate_all_name_pages(sender, instance, **kwargs):
+    """Identifier Types are shown on the pages of every Name using them."""
+    name_pages.invalidate()
+
+
+def touch_name(sender, instance, **kwargs):
+    """Update the last_modified date of the Name that the saved or
+    deleted object belongs to.
+    """
+    (Name.objects.filter(id=instance.belong_to_name_id)
+                 .update(last_modified=timezone.now()))
+
+
+def touch_identifier_type_names(sender, instance, **kwargs):
+    """Update the last_modified date of every Name with an Identifier of
+    the saved Identifier Type.
+    """
+    (Name.objects.filter(identifier__type=instance)
+                 .update(last_modified=timezone.now()))
+
+
+def record_deleted_name(sender, instance, **kwargs):
+    """Keep a record of the deleted Name for the delta export."""
+    DeletedName.objects.create(name_id=instance.name_id, name=instance.name)
+
+
+for model in (Name, Variant, Note, Identifier, Location):
+    post_save.connect(invalidate_name_pages, sender=model)
+    post_delete.connect(invalidate_name_pages, sender=model)
+
+for model in (Variant, Note, Identifier, Location):
+    post_save.connect(touch_name, sender=model)
+    post_delete.connect(touch_name, sender=model)
+
+post_save.connect(touch_identifier_type_names, sender=Identifier_Type)
+
+post_delete.connect(record_deleted_name, sender=Name)
+
+post_save.connect(invalidate_type_counts, sender=Name)
+post_delete.connect(invalidate_type_counts, sender=Name)
+
+post_save.connect(invalidate_all_name_pages, sender=Identifier_Type)
+post_delete.connect(invalidate_all_name_pages, sender=Identifier_Type)
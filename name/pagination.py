@@ -0,0 +1,267 @@
+"""Keyset (seek) pagination for search results.
+
+Rather than skipping over the rows of the previous pages with OFFSET,
+each page is fetched by filtering for the rows that sort after (or
+before) the last row of the previous page. The cost of a page is then
+the same however deep it is, and no COUNT is needed.
+
+The position is passed between requests as an opaque, signed cursor
+holding the sort value and id of the boundary row.
+"""
+import json
+
+from django.core import signing
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connection
+from django.db.models import Q
+
+from .cache import search_results
+
+
+class InvalidCursor(Exception):
+    """The cursor could not be decoded, or was made for a different
+    ordering.
+    """
+    pass
+
+
+class CursorPage(object):
+    """A single page of results produced by the CursorPaginator."""
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator(object):
+    """Paginates a queryset by the field in ordering, using the primary
+    key to break ties.
+
+    ordering is a single field name, optionally prefixed with '-' for
+    descending order, such as the values of SearchView.VALID_SORTS.
+    """
+    SALT = 'name.pagination.cursor'
+
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = ordering
+        self.field = ordering.lstrip('-')
+        self.descending = ordering.startswith('-')
+
+    def encode_cursor(self, obj, forward):
+        """Make the cursor for the page after (forward) or before obj."""
+        data = dict(o=self.ordering, v=getattr(obj, self.field), id=obj.pk,
+                    f=forward)
+        return signing.dumps(data, salt=self.SALT, compress=True)
+
+    def decode_cursor(self, cursor):
+        try:
+            data = signing.loads(cursor, salt=self.SALT)
+        except signing.BadSignature:
+            raise InvalidCursor('The cursor is not valid.')
+
+        if data.get('o') != self.ordering:
+            raise InvalidCursor('The cursor was made for another ordering.')
+        return data['v'], data['id'], data['f']
+
+    def _seek(self, value, pk, after):
+        """Filter and order the queryset for the rows after, or before,
+        the row with the given sort value and primary key.
+        """
+        lookup = 'gt' if after else 'lt'
+        order = [self.field, 'pk'] if after else ['-' + self.field, '-pk']
+
+        queryset = self.queryset.order_by(*order)
+        if pk is None:
+            return queryset
+
+        return queryset.filter(
+            Q(**{'{0}__{1}'.format(self.field, lookup): value}) |
+            Q(**{self.field: value, 'pk__{0}'.format(lookup): pk}))
+
+    def page(self, cursor=None):
+        """Returns the CursorPage for the cursor, or the first page when
+        no cursor is given.
+        """
+        value, pk, forward = None, None, True
+        if cursor:
+            value, pk, forward = self.decode_cursor(cursor)
+
+        # Rows are read in display order when moving forward. Moving
+        # backward they are read in reverse and flipped afterwards.
+        after = forward != self.descending
+        rows = list(self._seek(value, pk, after)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or not forward:
+                next_cursor = self.encode_cursor(rows[-1], True)
+            if pk is not None and (has_more or forward):
+                previous_cursor = self.encode_cursor(rows[0], False)
+
+        return CursorPage(rows, self, next_cursor, previous_cursor)
+
+
+def estimate_count(queryset):
+    """Returns the number of rows the database planner expects the
+    queryset to return, or None if the database gives no estimate.
+    """
+    vendor = connection.vendor
+    if vendor not in ('postgresql', 'mysql'):
+        return None
+
+    sql, params = queryset.query.sql_with_params()
+    cursor = connection.cursor()
+
+    if vendor == 'postgresql':
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+        if not isinstance(plan, list):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    # The first row describes the outer query on the Name table.
+    cursor.execute('EXPLAIN ' + sql, params)
+    columns = [column[0] for column in cursor.description]
+    row = dict(zip(columns, cursor.fetchone()))
+    return int((row.get('rows') or 0) * (row.get('filtered') or 100) / 100)
+
+
+class EstimatedPage(Page):
+    """A page of an EstimatedPaginator whose count is an estimate.
+
+    Whether there is a next page is known from the rows read, rather
+    than from the estimated number of pages.
+    """
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super(EstimatedPage, self).__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1
+
+
+class EstimatedPaginator(Paginator):
+    """Paginator that avoids counting large result sets exactly.
+
+    Up to threshold objects are counted exactly. Above that, the
+    estimate of the database planner is used, when the database gives
+    one, and is_estimate is True. The count is stored in the search
+    results cache under cache_key, which may be None.
+
+    An estimate may be above or below the real count, so it is only
+    shown as the number of results. Pages are then read with one more
+    row than they hold, which tells whether there is a next page, and
+    any page number is valid as long as the page has rows.
+    """
+
+    def __init__(self, object_list, per_page, threshold=None, cache_key=None,
+                 **kwargs):
+        super(EstimatedPaginator, self).__init__(object_list, per_page, **kwargs)
+        self.threshold = threshold
+        self.cache_key = cache_key
+        self._estimate = None
+        # The number of pages known to exist from the pages read.
+        self._known_pages = 1
+
+    def _get_estimate(self):
+        if self._estimate is None:
+            self._estimate = search_results.get(self.cache_key)
+        if self._estimate is None:
+            self._estimate = self._count_objects()
+            search_results.set(self.cache_key, self._estimate)
+        return self._estimate
+
+    def _count_objects(self):
+        """Returns a (count, is_estimate) tuple."""
+        if self.threshold is not None:
+            # Read no more primary keys than needed to tell whether the
+            # result set is above the threshold. Counting a sliced
+            # queryset counts every row before Django 1.8.
+            pks = self.object_list.order_by().values_list('pk', flat=True)
+            count = len(pks[:self.threshold + 1])
+            if count <= self.threshold:
+                return count, False
+
+            estimate = estimate_count(self.object_list)
+            if estimate is not None:
+                return max(estimate, count), True
+        return self.object_list.count(), False
+
+    @property
+    def count(self):
+        return self._get_estimate()[0]
+
+    @property
+    def is_estimate(self):
+        return self._get_estimate()[1]
+
+    @property
+    def page_range(self):
+        """The pages up to the page after the latest page read, when the
+        count is an estimate.
+        """
+        if not self.is_estimate:
+            return super(EstimatedPaginator, self).page_range
+        return range(1, self._known_pages + 1)
+
+    def validate_number(self, number):
+        if not self.is_estimate:
+            return super(EstimatedPaginator, self).validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        if not self.is_estimate:
+            return super(EstimatedPaginator, self).page(number)
+
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('That page contains no results')
+        return self.cached_page(rows[:self.per_page], number,
+                                len(rows) > self.per_page)
+
+    def cached_page(self, object_list, number, has_next):
+        """Returns the page number holding object_list, as read from the
+        cache along with whether it has a next page.
+        """
+        if not self.is_estimate:
+            return Page(object_list, number, self)
+        self._known_pages = max(self._known_pages,
+                                number + 1 if has_next else number)
+        return EstimatedPage(object_list, number, self, has_next)
@@ -0,0 +1,46 @@
+"""Phonetic keys for matching names that sound alike.
+
+Names are keyed with American Soundex, the phonetic code used to index
+census and other genealogical records, so that spellings such as Meyer
+and Meier, or Smith and Smyth, share a key.
+"""
+import re
+
+# The Soundex digit of each consonant. Vowels, and y, separate letters
+# with the same digit, while h and w do not.
+CODES = {}
+for letters, digit in (('bfpv', '1'), ('cgjkqsxz', '2'), ('dt', '3'),
+                       ('l', '4'), ('mn', '5'), ('r', '6'), ('aeiouy', '')):
+    for letter in letters:
+        CODES[letter] = digit
+
+
+def soundex(word):
+    """Returns the Soundex code of word, such as M600 for meyer, or an
+    empty string if word has no letters.
+    """
+    letters = re.sub(r'[^a-z]', '', word.lower())
+    if not letters:
+        return u''
+
+    digits = []
+    previous = CODES.get(letters[0], '')
+    for letter in letters[1:]:
+        if letter in 'hw':
+            continue
+        digit = CODES[letter]
+        if digit and digit != previous:
+            digits.append(digit)
+        previous = digit
+    return (letters[0].upper() + u''.join(digits) + u'000')[:4]
+
+
+def phonetic_key(normalized):
+    """Returns the phonetic key of a NACO normalized string, the
+    Soundex codes of its words separated by spaces.
+
+    Since every code has four characters, the key of a query is a
+    prefix of the key of every string whose first words sound the same.
+    """
+    codes = (soundex(word) for word in normalized.split())
+    return u' '.join(code for code in codes if code)
@@ -0,0 +1,205 @@
+"""Reconciliation of batches of labels against the Name records.
+
+Implements the query part of the OpenRefine Reconciliation Service API,
+https://github.com/OpenRefine/OpenRefine/wiki/Reconciliation-Service-API
+
+Every label in a batch is NACO normalized, and the batch is resolved
+with a few set based lookups on the indexed Name.normalized_name and
+Variant.normalized_variant columns, instead of one search per label.
+Large batches are split in chunks that are looked up in parallel.
+
+Batches of labels can also be resolved to name_ids the way the label
+view resolves a single label, through the NameLabel index.
+"""
+from multiprocessing.dummy import Pool
+
+from django.db import connection
+from pynaco.naco import normalizeSimplified
+
+from . import app_settings
+from .models import Name, NameLabel, Variant
+
+# The score of a candidate whose normalized name is the normalized
+# label, and of a candidate with such a normalized variant.
+NAME_SCORE = 100
+VARIANT_SCORE = 90
+
+DEFAULT_LIMIT = 5
+
+FIELDS = ('id', 'name_id', 'name', 'name_type')
+
+# The outcomes of resolving a label, and the messages reported for the
+# labels that could not be resolved.
+FOUND = 'found'
+NOT_FOUND = 'not found'
+AMBIGUOUS = 'ambiguous'
+
+NOT_FOUND_MESSAGE = (
+    'No matching term found - authoritative or variant - for "{0}"')
+AMBIGUOUS_MESSAGE = (
+    'There are multiple Name objects with the same name: "{0}".')
+
+
+def get_types():
+    """Returns the Name Types in the format of the reconciliation API."""
+    return [{'id': label, 'name': label}
+            for type_id, label in Name.NAME_TYPE_CHOICES]
+
+
+def lookup(labels):
+    """Returns a dict mapping every normalized label in labels that
+    matches a visible Name to a dict of the matching Names.
+
+    The Names are keyed by id, and given as a (score, fields) tuple,
+    where fields are the values of FIELDS.
+    """
+    matches = dict((label, {}) for label in labels)
+    names = Name.objects.visible()
+
+    rows = (names.filter(normalized_name__in=labels)
+                 .values_list('normalized_name', *FIELDS))
+    for row in rows:
+        matches[row[0]][row[1]] = (NAME_SCORE, row[1:])
+
+    variant_fields = ['belong_to_name__' + field for field in FIELDS]
+    rows = (Variant.objects.filter(normalized_variant__in=labels,
+                                   belong_to_name__in=names)
+                           .values_list('normalized_variant', *variant_fields))
+    for row in rows:
+        matches[row[0]].setdefault(row[1], (VARIANT_SCORE, row[1:]))
+
+    return dict((label, m) for label, m in matches.items() if m)
+
+
+def _lookup_in_thread(labels):
+    """Runs lookup in a worker thread, closing the database connection
+    the thread opened.
+    """
+    try:
+        return lookup(labels)
+    finally:
+        connection.close()
+
+
+def lookup_all(labels, chunk_size=None, workers=None):
+    """Looks up the set of normalized labels, chunk_size labels at a
+    time, using up to workers threads.
+    """
+    chunk_size = chunk_size or app_settings.NAME_RECONCILE_CHUNK_SIZE
+    workers = workers or app_settings.NAME_RECONCILE_WORKERS
+
+    labels = sorted(labels)
+    chunks = [labels[i:i + chunk_size]
+              for i in range(0, len(labels), chunk_size)]
+
+    if len(chunks) < 2 or workers < 2:
+        results = [lookup(chunk) for chunk in chunks]
+    else:
+        pool = Pool(min(workers, len(chunks)))
+        try:
+            results = pool.map(_lookup_in_thread, chunks)
+        finally:
+            pool.close()
+            pool.join()
+
+    matches = {}
+    for result in results:
+        matches.update(result)
+    return matches
+
+
+def resolve_query(query):
+    """Returns a (normalized label, name types, limit) tuple for a query
+    in the format of the reconciliation API. The query is either a
+    label, or a dict with a `query` label and optional `type` and `limit`.
+    """
+    if not isinstance(query, dict):
+        query = {'query': query}
+
+    label = normalizeSimplified(unicode(query.get('query') or ''))
+
+    types = query.get('type') or []
+    if not isinstance(types, list):
+        types = [types]
+    name_types = [type_id for type_id, type_label in Name.NAME_TYPE_CHOICES
+                  if type_label in types]
+
+    try:
+        limit = int(query.get('limit') or DEFAULT_LIMIT)
+    except (TypeError, ValueError):
+        limit = DEFAULT_LIMIT
+    return label, name_types, limit
+
+
+def format_candidate(score, fields):
+    id, name_id, name, name_type = fields
+    type_label = dict(Name.NAME_TYPE_CHOICES)[name_type]
+    return {
+        'id': name_id,
+        'name': name,
+        'type': [{'id': type_label, 'name': type_label}],
+        'score': score,
+        'match': False,
+    }
+
+
+def reconcile(queries):
+    """Reconciles a batch of queries.
+
+    queries is a dict mapping a key to a query, as accepted by
+    resolve_query. Returns a dict mapping each key to the scored
+    candidates, best first. A candidate is marked as a match if it is
+    the only candidate whose normalized name is the normalized label.
+    """
+    resolved = dict((key, resolve_query(query))
+                    for key, query in queries.items())
+    matches = lookup_all(set(label for label, name_types, limit
+                             in resolved.values() if label))
+
+    results = {}
+    for key, (label, name_types, limit) in resolved.items():
+        candidates = sorted(
+            (candidate for candidate in matches.get(label, {}).values()
+             if not name_types or candidate[1][3] in name_types),
+            key=lambda candidate: (-candidate[0], candidate[1][2]))
+
+        result = [format_candidate(score, fields)
+                  for score, fields in candidates[:limit]]
+        exact = [c for c in candidates if c[0] == NAME_SCORE]
+        if len(exact) == 1 and result:
+            result[0]['match'] = True
+        results[key] = {'result': result}
+    return results
+
+
+def resolve_labels(labels, chunk_size=None):
+    """Resolves a batch of labels to name_ids, as the label view does.
+
+    Each distinct label is normalized once, and the normalized labels
+    are looked up chunk_size at a time. Returns a dict mapping each
+    label to a dict with its `status`, and either the `name_id` it
+    resolves to or the `message` the label view would respond with.
+    Ambiguous labels also list the `name_ids` they match.
+    """
+    chunk_size = chunk_size or app_settings.NAME_RECONCILE_CHUNK_SIZE
+
+    normalized = dict((label, normalizeSimplified(label))
+                      for label in set(labels))
+    forms = sorted(set(normalized.values()))
+    name_ids = {}
+    for i in range(0, len(forms), chunk_size):
+        name_ids.update(NameLabel.objects.resolve(forms[i:i + chunk_size]))
+
+    results = {}
+    for label, form in normalized.items():
+        ids = name_ids[form]
+        if len(ids) == 1:
+            results[label] = {'status': FOUND, 'name_id': ids[0]}
+        elif not ids:
+            results[label] = {'status': NOT_FOUND,
+                              'message': NOT_FOUND_MESSAGE.format(label)}
+        else:
+            results[label] = {'status': AMBIGUOUS,
+                              'name_ids': ids,
+                              'message': AMBIGUOUS_MESSAGE.format(form)}
+    return results
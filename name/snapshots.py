@@ -0,0 +1,326 @@
+"""Snapshots of the export, written to files and served as they are.
+
+A snapshot holds the TSV and JSON lines exports of the visible Names,
+each both plain and gzip compressed, so downloading the export does not
+read the database.
+
+The Names are split into shards of consecutive primary keys. The files
+of each shard are kept between snapshots in the shards directory, and a
+shard is only written again when one of its Names was created, changed
+or deleted, which is found from the number of Names and the latest
+last_modified date of the shard.
+
+Each snapshot is a directory, named after its version, holding the
+files of the shards concatenated, and a manifest. Concatenated gzip
+files are a valid gzip file, so the shards are not compressed again
+either. The LATEST file holds the version of the latest snapshot.
+"""
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import time
+
+from django import http
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+
+from .api.fast import base_detail_url
+from .export import FORMATS
+from .models import Name
+
+# Bumped whenever the contents of the files change, so that snapshots
+# written by older versions have all their shards written again.
+SNAPSHOT_FORMAT = 1
+
+LATEST = 'LATEST'
+MANIFEST = 'manifest.json'
+SHARDS = 'shards'
+
+# The size of the blocks files are copied and served in.
+BLOCK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def shard_states(shard_size):
+    """Returns a dict mapping the key of every shard of shard_size
+    primary keys holding Names, visible or not, to the number of Names
+    it holds and their latest last_modified date.
+    """
+    last_id = Name.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+    states = {}
+    for shard in range((last_id + shard_size - 1) // shard_size):
+        state = (Name.objects.filter(id__gt=shard * shard_size,
+                                     id__lte=(shard + 1) * shard_size)
+                             .aggregate(count=Count('id'),
+                                        modified=Max('last_modified')))
+        if state['count']:
+            states['{0:06d}'.format(shard)] = [
+                state['count'], state['modified'].isoformat()]
+    return states
+
+
+def file_names(format):
+    """Returns the names of the plain and compressed files of format."""
+    return 'data.{0}'.format(format), 'data.{0}.gz'.format(format)
+
+
+def write_atomically(path, write):
+    """Calls write with a file open in place of path, and moves it to
+    path once written, so readers never see part of the file.
+    """
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as f:
+        write(f)
+    os.rename(temporary, path)
+
+
+def write_shard(directory, shard, shard_size, url, chunk_size):
+    """Writes the plain and compressed files of every format for the
+    visible Names of shard.
+    """
+    start = int(shard) * shard_size
+    names = Name.objects.visible().filter(id__gt=start,
+                                          id__lte=start + shard_size)
+
+    for format, (export, content_type) in FORMATS.items():
+        paths = [os.path.join(directory, '{0}.{1}'.format(shard, name))
+                 for name in file_names(format)]
+        with open(paths[0] + '.tmp', 'wb') as plain, \
+                open(paths[1] + '.tmp', 'wb') as compressed:
+            with gzip.GzipFile(filename='', mode='wb', fileobj=compressed,
+                               mtime=0) as gz:
+                for piece in export(names, url, chunk_size):
+                    plain.write(piece)
+                    gz.write(piece)
+        for path in paths:
+            os.rename(path + '.tmp', path)
+
+
+def empty_gzip():
+    """Returns the gzip compressed form of an empty file."""
+    buffer = io.BytesIO()
+    gzip.GzipFile(filename='', mode='wb', fileobj=buffer, mtime=0).close()
+    return buffer.getvalue()
+
+
+def concatenate(paths, target, empty=''):
+    """Writes the files at paths, one after the other, to target, or
+    empty if there are no paths.
+
+    Returns the size and SHA-1 digest of the target.
+    """
+    digest, size = hashlib.sha1(), [0]
+
+    def blocks():
+        if not paths:
+            yield empty
+        for path in paths:
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(BLOCK_SIZE), ''):
+                    yield block
+
+    def write(out):
+        for block in blocks():
+            out.write(block)
+            digest.update(block)
+            size[0] += len(block)
+
+    write_atomically(target, write)
+    return {'size': size[0], 'sha1': digest.hexdigest()}
+
+
+def latest(directory):
+    """Returns the manifest of the latest snapshot written to directory,
+    or None if there is none.
+    """
+    try:
+        with open(os.path.join(directory, LATEST)) as f:
+            version = f.read().strip()
+        with open(os.path.join(directory, version, MANIFEST)) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return None
+
+
+def versions(directory):
+    """Returns the versions of the snapshots in directory, oldest first."""
+    return sorted(name for name in os.listdir(directory)
+                  if name != SHARDS and
+                  os.path.isfile(os.path.join(directory, name, MANIFEST)))
+
+
+def write_snapshot(directory, base_url, shard_size=10000, chunk_size=1000,
+                   force=False, keep=2):
+    """Writes a snapshot of the export to directory, with the URLs of
+    the site at base_url.
+
+    Only the shards that changed since the latest snapshot are written,
+    unless force is True. The latest keep snapshots are kept, and older
+    ones deleted.
+
+    Returns a (manifest, written) tuple, where written is the number of
+    shards written, or (None, 0) if no shard changed.
+    """
+    shards = os.path.join(directory, SHARDS)
+    if not os.path.isdir(shards):
+        os.makedirs(shards)
+
+    previous = latest(directory)
+    reuse = (not force and previous is not None and
+             previous['format'] == SNAPSHOT_FORMAT and
+             previous['base_url'] == base_url and
+             previous['shard_size'] == shard_size)
+    old_states = previous['shards'] if reuse else {}
+
+    states = shard_states(shard_size)
+    changed = sorted(shard for shard in states
+                     if old_states.get(shard) != states[shard])
+    if reuse and not changed and set(old_states) == set(states):
+        return None, 0
+
+    url = base_detail_url(base_url)
+    for shard in changed:
+        write_shard(shards, shard, shard_size, url, chunk_size)
+    for name in os.listdir(shards):
+        if name.split('.')[0] not in states:
+            os.remove(os.path.join(shards, name))
+
+    now = timezone.now()
+    version = now.strftime('%Y%m%dT%H%M%S%fZ')
+    os.makedirs(os.path.join(directory, version))
+    manifest = {
+        'version': version,
+        'created': now.isoformat(),
+        'timestamp': int(time.time()),
+        'format': SNAPSHOT_FORMAT,
+        'base_url': base_url,
+        'shard_size': shard_size,
+        'shards': states,
+        'files': {},
+    }
+    for format in FORMATS:
+        for name in file_names(format):
+            paths = [os.path.join(shards, '{0}.{1}'.format(shard, name))
+                     for shard in sorted(states)]
+            # Without Names, the compressed file is still valid gzip.
+            empty = empty_gzip() if name.endswith('.gz') else ''
+            manifest['files'][name] = concatenate(
+                paths, os.path.join(directory, version, name), empty)
+
+    write_atomically(os.path.join(directory, version, MANIFEST),
+                     lambda f: json.dump(manifest, f, indent=4))
+    write_atomically(os.path.join(directory, LATEST),
+                     lambda f: f.write(version))
+
+    for old in versions(directory)[:-max(keep, 1)]:
+        shutil.rmtree(os.path.join(directory, old))
+    return manifest, len(changed)
+
+
+def accepts_gzip(request):
+    """True if the request accepts gzip encoded responses."""
+    for coding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        params = [param.strip() for param in coding.split(';')]
+        if params[0] == 'gzip':
+            return 'q=0' not in params and 'q=0.0' not in params
+    return False
+
+
+def parse_range(header, size):
+    """Returns the (start, end) offsets, end excluded, of the single
+    byte range in the Range header, None if there is no usable range,
+    or False if the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # A suffix range, such as the last 500 bytes.
+        return (max(size - int(last), 0), size) if int(last) else False
+    start = int(first)
+    end = min(int(last) + 1, size) if last else size
+    if last and int(last) < start:
+        return None
+    return (start, end) if start < size else False
+
+
+def read_file(path, start, end):
+    """Yields the bytes of the file at path from start to end."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(BLOCK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+
+def serve(request, directory, manifest, format):
+    """Serves the file of format from the snapshot with the manifest.
+
+    The gzip compressed file is served to requests accepting it, and
+    single byte ranges are supported. Every file has an ETag, the SHA-1
+    digest of its contents, so requests for an unchanged file are
+    answered with 304 Not Modified.
+    """
+    plain, compressed = file_names(format)
+    name = compressed if accepts_gzip(request) else plain
+    info = manifest['files'][name]
+    path = os.path.join(directory, manifest['version'], name)
+
+    etag = '"{0}"'.format(info['sha1'])
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(manifest['timestamp']),
+        'Vary': 'Accept-Encoding',
+        'Accept-Ranges': 'bytes',
+    }
+
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        not_modified = (if_none_match.strip() == '*' or
+                        info['sha1'] in parse_etags(if_none_match))
+    else:
+        if_modified_since = parse_http_date_safe(
+            request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        not_modified = (if_modified_since is not None and
+                        if_modified_since >= manifest['timestamp'])
+    if not_modified:
+        response = http.HttpResponseNotModified()
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    size, byte_range = info['size'], None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if 'HTTP_RANGE' in request.META and (not if_range or if_range == etag):
+        byte_range = parse_range(request.META['HTTP_RANGE'], size)
+    if byte_range is False:
+        response = http.HttpResponse(status=416)
+        response['Content-Range'] = 'bytes */{0}'.format(size)
+        return response
+
+    start, end = byte_range or (0, size)
+    response = http.StreamingHttpResponse(
+        read_file(path, start, end), content_type=FORMATS[format][1],
+        status=206 if byte_range else 200)
+    for header, value in headers.items():
+        response[header] = value
+    response['Content-Length'] = str(end - start)
+    response['Content-Disposition'] = 'attachment; filename="{0}"'.format(
+        plain)
+    if byte_range:
+        response['Content-Range'] = 'bytes {0}-{1}/{2}'.format(
+            start, end - 1, size)
+    if name == compressed:
+        response['Content-Encoding'] = 'gzip'
+    return response
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+from south.utils import datetime_utils as datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding model 'NameToken'
+        db.create_table(u'name_nametoken', (
+            (u'id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('token', self.gf('django.db.models.fields.CharField')(max_length=255, db_index=True)),
+            ('belong_to_name', self.gf('django.db.models.fields.related.ForeignKey')(to=orm['name.Name'])),
+        ))
+        db.send_create_signal(u'name', ['NameToken'])
+
+        # Adding unique constraint on 'NameToken', fields ['token', 'belong_to_name']
+        db.create_unique(u'name_nametoken', ['token', 'belong_to_name_id'])
+
+
+    def backwards(self, orm):
+        # Removing unique constraint on 'NameToken', fields ['token', 'belong_to_name']
+        db.delete_unique(u'name_nametoken', ['token', 'belong_to_name_id'])
+
+        # Deleting model 'NameToken'
+        db.delete_table(u'name_nametoken')
+
+
+    models = {
+        u'name.baseticketing': {
+            'Meta': {'object_name': 'BaseTicketing'},
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'stub': ('django.db.models.fields.BooleanField', [], {'default': 'True', 'unique': 'True'})
+        },
+        u'name.identifier': {
+            'Meta': {'ordering': "['order', 'type']", 'object_name': 'Identifier'},
+            'belong_to_name': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['name.Name']"}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'order': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'type': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['name.Identifier_Type']"}),
+            'value': ('django.db.models.fields.CharField', [], {'max_length': '500'}),
+            'visible': ('django.db.models.fields.BooleanField', [], {'default': 'True'})
+        },
+        u'name.identifier_type': {
+            'Meta': {'ordering': "['label']", 'object_name': 'Identifier_Type'},
+            'homepage': ('django.db.models.fields.URLField', [], {'max_length': '200', 'blank': 'True'}),
+            'icon_path': ('django.db.models.fields.CharField', [], {'max_length': '255', 'blank': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'label': ('django.db.models.fields.CharField', [], {'max_length': '255'})
+        },
+        u'name.location': {
+            'Meta': {'ordering': "['status']", 'object_name': 'Location'},
+            'belong_to_name': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['name.Name']"}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'latitude': ('django.db.models.fields.DecimalField', [], {'max_digits': '13', 'decimal_places': '10'}),
+            'longitude': ('django.db.models.fields.DecimalField', [], {'max_digits': '13', 'decimal_places': '10'}),
+            'status': ('django.db.models.fields.IntegerField', [], {'default': '0', 'max_length': '2'})
+        },
+        u'name.name': {
+            'Meta': {'ordering': "['name']", 'unique_together': "(('name', 'name_id'),)", 'object_name': 'Name'},
+            'begin': ('django.db.models.fields.CharField', [], {'max_length': '25', 'blank': 'True'}),
+            'biography': ('django.db.models.fields.TextField', [], {'blank': 'True'}),
+            'date_created': ('django.db.models.fields.DateTimeField', [], {'auto_now_add': 'True', 'blank': 'True'}),
+            'disambiguation': ('django.db.models.fields.CharField', [], {'max_length': '255', 'blank': 'True'}),
+            'end': ('django.db.models.fields.CharField', [], {'max_length': '25', 'blank': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'last_modified': ('django.db.models.fields.DateTimeField', [], {'auto_now': 'True', 'blank': 'True'}),
+            'merged_with': ('django.db.models.fields.related.ForeignKey', [], {'blank': 'True', 'related_name': "'merged_with_name'", 'null': 'True', 'to': u"orm['name.Name']"}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '255'}),
+            'name_id': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '10'}),
+            'name_type': ('django.db.models.fields.IntegerField', [], {'max_length': '1'}),
+            'normalized_name': ('django.db.models.fields.CharField', [], {'max_length': '255'}),
+            'record_status': ('django.db.models.fields.IntegerField', [], {'default': '0'})
+        },
+        u'name.nametoken': {
+            'Meta': {'unique_together': "(('token', 'belong_to_name'),)", 'object_name': 'NameToken'},
+            'belong_to_name': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['name.Name']"}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'token': ('django.db.models.fields.CharField', [], {'max_length': '255', 'db_index': 'True'})
+        },
+        u'name.note': {
+            'Meta': {'object_name': 'Note'},
+            'belong_to_name': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['name.Name']"}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'note': ('django.db.models.fields.TextField', [], {}),
+            'note_type': ('django.db.models.fields.IntegerField', [], {})
+        },
+        u'name.variant': {
+            'Meta': {'object_name': 'Variant'},
+            'belong_to_name': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['name.Name']"}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'normalized_variant': ('django.db.models.fields.CharField', [], {'max_length': '255'}),
+            'variant': ('django.db.models.fields.CharField', [], {'max_length': '255'}),
+            'variant_type': ('django.db.models.fields.IntegerField', [], {'max_length': '50'})
+        }
+    }
+
+    complete_apps = ['name']
\ No newline at end of file
@@ -6,6 +6,10 @@ register = template.Library()
 
 @register.simple_tag(name="absolute_url", takes_context=True)
 def absolute_url(context, name, *args):
+    url = reverse(name, args=filter(None, list(args)))
     request = context.get('request')
-    return request.build_absolute_uri(
-        reverse(name, args=filter(None, list(args))))
+    if request is None:
+        # Rendered outside of a request, such as for dumps, with the URL
+        # of the site as base_url.
+        return context.get('base_url', '').rstrip('/') + url
+    return request.build_absolute_uri(url)
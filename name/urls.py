@@ -13,9 +13,11 @@ urlpatterns = [
     url(r'export/$', views.export, name='export'),
     url(r'feed/$', feeds.NameAtomFeed(), name='feed'),
     url(r'label/(?P<name_value>.*)$', views.label, name='label'),
+    url(r'labels.json$', api.labels_json, name='labels-json'),
     url(r'locations.json/$', api.locations_json, name='locations-json'),
     url(r'map/$', views.locations, name='map'),
     url(r'opensearch.xml$', views.opensearch, name='opensearch'),
+    url(r'reconcile/$', api.reconcile_json, name='reconcile'),
     url(r'search/$', views.SearchView.as_view(), name='search'),
     url(r'search.json$', api.search_json, name="search-json"),
     url(r'stats.json/$', api.stats_json, name='stats-json'),
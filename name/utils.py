@@ -1,7 +1,15 @@
+import math
 import re
 
-from django.db.models import Q
-from .models import Name
+from django.db import connection
+from django.db.models import Count, Q
+from pynaco.naco import normalizeSimplified
+
+from . import app_settings
+from .cache import search_results
+from .phonetic import phonetic_key
+from .models import (Name, NameToken, NameTrigram, SQLiteFullTextIndex,
+                     Variant)
 
 
 def normalize_query(query_string):
@@ -24,29 +32,277 @@ def compose_query(query_string):
     """Composes a Q object from the query_string.
 
     This will first normalize the query_sting and split the string up
-    into words. Then it will iterate over the list of words creating Q
-    object for each one. Last, it reduces the generated Q objects into
-    a single Q object by combining them using the & operator.
+    into words. Then it will NACO normalize each word, the same way
+    Name.normalized_name is, and create a Q object for each one. Last,
+    it reduces the generated Q objects into a single Q object by
+    combining them using the & operator.
 
     The reduce function essential performs the following operation for
     a query_string that contains 4 words,
 
         (((Q1 & Q2) & Q3) & Q4)
 
-    where Q1-4 are instances of the Q object.
+    where Q1-4 are instances of the Q object. Returns None if no word
+    is left after normalization.
     """
     # Normalize the query_string which will also split the single string
     # into a list of terms.
-    terms = normalize_query(query_string)
+    terms = (normalizeSimplified(term) for term in normalize_query(query_string))
 
-    # Create a generator that produces an instance of the Q object
-    # for each term.
-    qs = (Q(name__icontains=term) for term in terms)
+    # Create a list with an instance of the Q object for each term.
+    qs = [Q(normalized_name__contains=term) for term in terms if term]
+    if not qs:
+        return None
 
     # Use bitwise AND to compose the objects into a single instance of Q.
     return reduce(lambda x, y: x & y, qs)
 
 
+def compose_token_query(query_string):
+    """Returns the set of tokens that should be looked up in the
+    NameToken index for the query_string.
+
+    Each term found by normalize_query is NACO normalized the same way
+    Name.normalized_name and Variant.normalized_variant are, then split
+    into tokens. Quoted terms contribute each of their words.
+    """
+    tokens = set()
+    for term in normalize_query(query_string):
+        tokens.update(NameToken.tokenize(normalizeSimplified(term)))
+    return tokens
+
+
+def search_icontains(names, q):
+    """Filter names with a substring match on the NACO normalized name
+    and variants.
+
+    The variants are matched with a semi-join, an IN subquery on the
+    Variant table, rather than a JOIN. Each Name then appears once
+    without a DISTINCT, which would make the database de-duplicate
+    every matching row.
+    """
+    name_filter = compose_query(q)
+    normalized = normalizeSimplified(q)
+    if name_filter is None or not normalized:
+        return names.none()
+
+    # All names that fit query OR all variants that contain query
+    variants = (Variant.objects.filter(normalized_variant__contains=normalized)
+                               .values('belong_to_name'))
+    return names.filter(name_filter | Q(id__in=variants))
+
+
+def search_tokens(names, q):
+    """Filter names using the NameToken index.
+
+    Every token in the query must prefix match a token of the name or
+    one of its variants. Each token is resolved with an indexed lookup
+    on NameToken, and the database intersects the results.
+    """
+    tokens = compose_token_query(q)
+    if not tokens:
+        return names.none()
+
+    for token in sorted(tokens):
+        matches = (NameToken.objects.filter(token__startswith=token)
+                                    .values('belong_to_name'))
+        names = names.filter(id__in=matches)
+    return names
+
+
+def rank_trigram_candidates(names, q):
+    """Returns a list of (name id, similarity) tuples for the Names
+    in the names queryset that are similar to q, most similar first.
+
+    Candidates are the Names sharing the most trigrams with the query,
+    found by counting matches in the NameTrigram index. At most
+    NAME_SEARCH_TRIGRAM_CANDIDATES candidates are scored, which bounds
+    the cost of the query. A candidate's similarity is the best score
+    among its name and variants, and only candidates reaching
+    NAME_SEARCH_TRIGRAM_THRESHOLD are returned.
+    """
+    query = NameTrigram.tokenize(normalizeSimplified(q))
+    if not query:
+        return []
+
+    threshold = app_settings.NAME_SEARCH_TRIGRAM_THRESHOLD
+
+    # The similarity of a Name can not be greater than the fraction of
+    # the query's trigrams it shares, so skip the Names that share too
+    # few to reach the threshold.
+    min_shared = max(1, int(math.ceil(threshold * len(query))))
+    candidates = (NameTrigram.objects
+                  .filter(token__in=query, belong_to_name__in=names)
+                  .values('belong_to_name')
+                  .annotate(shared=Count('id'))
+                  .filter(shared__gte=min_shared)
+                  .order_by('-shared'))
+    # The rows are read as dicts, as values_list drops the annotation
+    # before Django 1.8.
+    candidates = [
+        row['belong_to_name'] for row in
+        candidates[:app_settings.NAME_SEARCH_TRIGRAM_CANDIDATES]]
+
+    forms = list(Name.objects.filter(id__in=candidates).order_by()
+                     .values_list('id', 'normalized_name'))
+    forms.extend(Variant.objects.filter(belong_to_name__in=candidates)
+                        .values_list('belong_to_name', 'normalized_variant'))
+
+    scores = {}
+    for id, normalized in forms:
+        score = NameTrigram.similarity(
+            query, NameTrigram.tokenize(normalized))
+        if score >= threshold and score > scores.get(id, 0):
+            scores[id] = score
+
+    return sorted(scores.items(), key=lambda s: (-s[1], s[0]))
+
+
+def search_trigram(names, q):
+    """Filter names to those similar to q, ordered by similarity.
+
+    This tolerates misspellings in the query. The similarity of each
+    result is available as the `similarity` attribute.
+    """
+    ranked = rank_trigram_candidates(names, q)
+    if not ranked:
+        return names.none()
+
+    # Order the results in the database so that the queryset can
+    # still be sliced and paginated.
+    qn = connection.ops.quote_name
+    column = '{0}.{1}'.format(qn(Name._meta.db_table), qn(Name._meta.pk.column))
+    similarity = 'CASE {0} {1} END'.format(
+        column, ' '.join(['WHEN %s THEN %s'] * len(ranked)))
+    params = [value for pair in ranked for value in pair]
+
+    return (names.filter(id__in=[id for id, score in ranked])
+                 .extra(select={'similarity': similarity},
+                        select_params=params,
+                        order_by=['-similarity', 'id']))
+
+
+def compose_tsquery(query_string):
+    """Composes a PostgreSQL tsquery from the query_string.
+
+    Every token of the query must match the beginning of a word in the
+    search vector. Characters with a meaning in tsquery syntax are
+    dropped from the tokens.
+    """
+    tokens = (re.sub(r'\W+', '', token, flags=re.UNICODE)
+              for token in compose_token_query(query_string))
+    return u' & '.join(u'{0}:*'.format(t) for t in sorted(tokens) if t)
+
+
+def search_postgres(names, q):
+    """Filter names with the PostgreSQL full text search vector.
+
+    Matches are found through the GIN index on the search_vector
+    column, and ordered by ts_rank. The rank of each result is
+    available as the `rank` attribute.
+    """
+    tsquery = compose_tsquery(q)
+    if not tsquery:
+        return names.none()
+
+    qn = connection.ops.quote_name
+    vector = '{0}.search_vector'.format(qn(Name._meta.db_table))
+    return names.extra(
+        select={'rank': "ts_rank({0}, to_tsquery('simple', %s))".format(vector)},
+        select_params=[tsquery],
+        where=["{0} @@ to_tsquery('simple', %s)".format(vector)],
+        params=[tsquery],
+        order_by=['-rank', 'id'])
+
+
+def compose_fts_query(query_string):
+    """Composes an SQLite FTS5 query from the query_string.
+
+    Every word of the query must match the beginning of a word in the
+    full text table. The words are quoted, so nothing in the query is
+    read as FTS5 syntax.
+    """
+    words = re.findall(r'\w+', query_string, flags=re.UNICODE)
+    return u' '.join(u'"{0}"*'.format(word) for word in words)
+
+
+def search_sqlite(names, q):
+    """Filter names with the SQLite FTS5 full text table.
+
+    Matches are found through the name_name_fts table, and ordered by
+    bm25 with the name weighted above the variants, and the variants
+    above the disambiguation. The rank of each result is available as
+    the `rank` attribute, where lower is better.
+    """
+    match = compose_fts_query(q)
+    if not match:
+        return names.none()
+
+    qn = connection.ops.quote_name
+    fts = SQLiteFullTextIndex.table
+    return names.extra(
+        select={'rank': 'bm25({0}, 10.0, 1.0, 5.0)'.format(fts)},
+        tables=[fts],
+        where=['{0}.rowid = {1}.id'.format(fts, qn(Name._meta.db_table)),
+               '{0} MATCH %s'.format(fts)],
+        params=[match],
+        order_by=['rank', 'id'])
+
+
+def search_phonetic(names, q):
+    """Filter names on the phonetic keys of the name and the variants.
+
+    The phonetic key of the query must start the key of the name or of
+    one of the variants, so a query matches the names whose first words
+    sound like its words, whatever words follow. The lookups are prefix
+    matches, LIKE 'key%', on the phonetic_name and phonetic_variant
+    columns, which have indexes with the pattern operator class on
+    PostgreSQL so that they are answered from the index.
+    """
+    key = phonetic_key(normalizeSimplified(q))
+    if not key:
+        return names.none()
+
+    variants = (Variant.objects.filter(phonetic_variant__startswith=key)
+                               .values('belong_to_name'))
+    return names.filter(Q(phonetic_name__startswith=key) | Q(id__in=variants))
+
+
+# Maps the NAME_SEARCH_BACKEND setting to the function that applies
+# the q parameter to the queryset.
+SEARCH_BACKENDS = {
+    'icontains': search_icontains,
+    'token': search_tokens,
+    'trigram': search_trigram,
+    'postgres': search_postgres,
+    'sqlite': search_sqlite,
+    'phonetic': search_phonetic,
+}
+
+# Backends that may also be selected for a single search with the
+# q_mode parameter.
+QUERY_MODES = ('phonetic',)
+
+# Backends that order the results by their relevance to the query.
+RANKED_SEARCH_BACKENDS = ('trigram', 'postgres', 'sqlite')
+
+# Backends that only work on a single database vendor. Other databases
+# fall back to the icontains backend.
+VENDOR_SEARCH_BACKENDS = {
+    'postgres': 'postgresql',
+    'sqlite': 'sqlite',
+}
+
+
+def get_search_backend():
+    """Returns the name of the search backend to use with the current
+    database.
+    """
+    backend = app_settings.NAME_SEARCH_BACKEND
+    vendor = VENDOR_SEARCH_BACKENDS.get(backend, connection.vendor)
+    return backend if vendor == connection.vendor else 'icontains'
+
+
 def resolve_type(q_type):
     """Resolve the Name Types passed to the request, and returns
     a list of Name Type IDs.
@@ -67,6 +323,67 @@ def resolve_type(q_type):
     return [k for k, v in Name.NAME_TYPE_CHOICES if v in q_type]
 
 
+def get_request_backend(request):
+    """Returns the name of the search backend to use for the request,
+    which is the q_mode parameter if it names one of the QUERY_MODES.
+    """
+    q_mode = request.GET.get('q_mode')
+    return q_mode if q_mode in QUERY_MODES else get_search_backend()
+
+
+def is_ranked(request):
+    """True if filter_names orders the results for the request by
+    relevance.
+    """
+    return bool(request.GET.get('q') and
+                get_request_backend(request) in RANKED_SEARCH_BACKENDS)
+
+
+def search_cache_key(request, *parts):
+    """Returns the key identifying the results of filter_names for the
+    request, combined with any other parts that affect the results.
+
+    Queries that only differ by case or by the spacing between their
+    terms share a key.
+    """
+    terms = [term.lower() for term in normalize_query(request.GET.get('q', ''))]
+    name_types = sorted(resolve_type(request.GET.get('q_type', None)))
+    return repr((get_request_backend(request), terms, name_types) + parts)
+
+
+def names_in_order(ids, fields=None):
+    """Returns the Names with the given ids, in the same order.
+
+    If fields are given, the values() rows of the Names with these
+    fields, which must include id, are returned instead.
+    """
+    if fields:
+        rows = Name.objects.filter(id__in=ids).values(*fields)
+        names = dict((row['id'], row) for row in rows)
+    else:
+        names = Name.objects.in_bulk(ids)
+    return [names[id] for id in ids if id in names]
+
+
+def cached_search(request, names, fields, *parts):
+    """Evaluates the names queryset, built by filter_names for the
+    request, and returns the values() rows of the Names with the given
+    fields, which must include id.
+
+    The ordered ids of the Names are cached, and the rows are read by
+    id when the same search is made again, until a Name or Variant is
+    saved or deleted.
+    """
+    key = search_results.make_key(search_cache_key(request, *parts))
+    ids = search_results.get(key)
+    if ids is not None:
+        return names_in_order(ids, fields)
+
+    rows = list(names.values(*fields))
+    search_results.set(key, [row['id'] for row in rows])
+    return rows
+
+
 # TODO: Look at reducing the number of queries.
 def filter_names(request):
     """Return the set of Name objects filtered on the query
@@ -84,8 +401,7 @@ def filter_names(request):
 
     # Do further filtering if the q parameter is present.
     if q:
-        # All names that fit query OR all variants that contain query
-        query_filter = compose_query(q) | Q(variant__variant__icontains=q)
-        names = names.filter(query_filter).distinct()
+        search = SEARCH_BACKENDS[get_request_backend(request)]
+        names = search(names, q)
 
     return names
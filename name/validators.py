@@ -1,5 +1,7 @@
 from django.core.exceptions import ValidationError
 
+from .merges import merge_chain
+
 
 def follow_merged_with(name):
     """A generator to get the merged_with relationship
@@ -37,18 +39,20 @@ def validate_merged_with(name):
     field.  Rather this method should be called from the `clean` method.
     """
     # Return early if there is no need to validate.
-    if name.merged_with is None:
+    if name.merged_with_id is None:
         return
 
     # Get the Name class from the model instance, to avoid
     # circular importing name.models.Name.
     Name = name.__class__
 
+    # Select the ids of the Names on the chain of merges starting at the
+    # merge target, with a single query where the database allows it.
+    chain = merge_chain(Name, name.merged_with_id)
+
     # Prevent the user from attempting to merge with a nonexistent
     # Name.
-    try:
-        merge_target = Name.objects.get(id=name.merged_with_id)
-    except Name.DoesNotExist:
+    if name.merged_with_id not in chain:
         raise ValidationError(
             dict(merged_with=u'The merge target must exist.'))
 
@@ -57,16 +61,9 @@ def validate_merged_with(name):
         raise ValidationError(
             dict(merged_with=u'Unable to merge a Name with itself.'))
 
-    # Iterate through the generator and keep track of the return names.
-    # We will find a loop if the return name is already in
-    # merged_list. If this happens we will raise a validation error.
-    # If we don't find duplicates, then no loop has been created and
-    # the generator will raise it's own StopIteration and we will
-    # implicitly return.
-    merge_sequence = [name]
-    for name in follow_merged_with(merge_target):
-        if name in merge_sequence:
-            msg = (u'The specified merge action completes a merge loop. '
-                   'Unable to complete merge.')
-            raise ValidationError(dict(merged_with=msg))
-        merge_sequence.append(name)
+    # The merge completes a loop if the chain of merges starting at the
+    # merge target leads back to the name.
+    if name.id in chain:
+        msg = (u'The specified merge action completes a merge loop. '
+               'Unable to complete merge.')
+        raise ValidationError(dict(merged_with=msg))
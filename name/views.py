@@ -1,5 +1,3 @@
-import csv
-
 from django import http
 from django.views import generic
 from django.core.urlresolvers import reverse
@@ -7,13 +5,23 @@ from django.templatetags.static import static
 from django.shortcuts import get_object_or_404, render, redirect
 from pynaco.naco import normalizeSimplified
 
-from .models import Name, Identifier
-from .utils import filter_names
+from . import app_settings, reconcile, snapshots
+from .models import Name, NameLabel, Identifier
+from .cache import search_results
+from .decorators import cache_name_page, name_condition
+from .api.fast import base_detail_url
+from .export import FORMATS, export_delta, parse_since
+from .pagination import CursorPaginator, EstimatedPaginator, InvalidCursor
+from .utils import filter_names, is_ranked, names_in_order, search_cache_key
 
 
 def label(request, name_value):
     """Find a name by label.
 
+    The label is matched against the normalized names and variants of
+    all Names, preferring names over variants, and merged Names are
+    followed to the Name they were merged with.
+
     If the label matches a single name, users are redirected
     to the name detail page. Otherwise, if the label
     does not exist, or the specified label matches multiple Name
@@ -23,34 +31,29 @@ def label(request, name_value):
         return http.HttpResponseNotFound()
 
     normalized_name = normalizeSimplified(name_value)
-    try:
-        name = Name.objects.get(normalized_name=normalized_name)
+    name_ids = NameLabel.objects.resolve([normalized_name])[normalized_name]
 
-        return http.HttpResponseRedirect(
-            reverse('name:detail', args=[name.name_id]))
-
-    except Name.DoesNotExist:
+    if not name_ids:
         return http.HttpResponseNotFound(
-            'No matching term found - authoritative or variant - for "{0}"'
-            .format(name_value))
-
-    except Name.MultipleObjectsReturned:
+            reconcile.NOT_FOUND_MESSAGE.format(name_value))
+    if len(name_ids) > 1:
         return http.HttpResponseNotFound(
-            'There are multiple Name objects with the same name: "{0}".'
-            .format(normalized_name))
+            reconcile.AMBIGUOUS_MESSAGE.format(normalized_name))
 
+    return http.HttpResponseRedirect(
+        reverse('name:detail', args=[name_ids[0]]))
 
+
+@name_condition
+@cache_name_page
 def detail(request, name_id):
     """View for the Name detail page."""
-    queryset = (
-        Name.objects.select_related().
-        prefetch_related('identifier_set__type')
-    )
-
-    name_entry = get_object_or_404(queryset, name_id=name_id)
+    name_entry = get_object_or_404(
+        Name.objects.with_related().select_related('canonical_target'),
+        name_id=name_id)
 
-    if name_entry.merged_with:
-        return redirect(name_entry.merged_with)
+    if name_entry.merged_with_id:
+        return redirect(name_entry.get_canonical_target())
 
     elif name_entry.is_suppressed():
         return http.HttpResponseNotFound(
@@ -63,22 +66,40 @@ def detail(request, name_id):
 
 
 def export(request):
-    """Exports Names to a TSV file."""
-    # Create a CSV response.
-    response = http.HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="data.tsv"'
-
-    writer = csv.writer(response, delimiter='\t', quoting=csv.QUOTE_MINIMAL)
-
-    # Iterate through the visible Names that are not merged with any other
-    # Name records and write a row for each record.
-    for n in Name.objects.visible():
-        writer.writerow([
-            n.get_name_type_label().lower(),
-            n.name.encode('utf-8'),
-            request.build_absolute_uri(n.get_absolute_url())
-        ])
+    """Exports the visible Names to a TSV file, or to a JSON lines file
+    with format=jsonl.
 
+    With since, an ISO 8601 date and time, only the Names changed since
+    then are exported, followed by the Names merged, deleted or
+    suppressed since then.
+
+    Otherwise, the latest snapshot of the export is served when
+    NAME_EXPORT_SNAPSHOT_DIR holds one. The file is streamed while the
+    Names are read, a chunk of NAME_EXPORT_CHUNK_SIZE Names at a time.
+    """
+    format = request.GET.get('format', 'tsv')
+    if format not in FORMATS:
+        raise http.Http404('Unknown export format.')
+    export, content_type = FORMATS[format]
+    chunk_size = app_settings.NAME_EXPORT_CHUNK_SIZE
+    url = base_detail_url(request.build_absolute_uri('/'))
+
+    if request.GET.get('since'):
+        try:
+            since = parse_since(request.GET['since'])
+        except ValueError:
+            return http.HttpResponseBadRequest('since is not a valid date.')
+        content = export_delta(format, since, url, chunk_size)
+    else:
+        directory = app_settings.NAME_EXPORT_SNAPSHOT_DIR
+        snapshot = snapshots.latest(directory) if directory else None
+        if snapshot:
+            return snapshots.serve(request, directory, snapshot, format)
+        content = export(Name.objects.visible(), url, chunk_size)
+
+    response = http.StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = (
+        'attachment; filename="data.{0}"'.format(format))
     return response
 
 
@@ -150,24 +171,104 @@ class SearchView(generic.ListView):
     DEFAULT_SORT = VALID_SORTS['name_a']
 
     def get_sort_method(self):
+        """Returns the ordering requested with the order parameter.
+
+        Returns None to keep the relevance ordering of a ranked search
+        when no valid order was requested.
+        """
         order = self.request.GET.get('order', '')
+        if order not in self.VALID_SORTS and is_ranked(self.request):
+            return None
         return self.VALID_SORTS.get(order, self.DEFAULT_SORT)
 
     def get_queryset(self):
         query = self.request.GET
         if query.get('q') or query.get('q_type'):
-            return filter_names(self.request).order_by(self.get_sort_method())
+            names = filter_names(self.request)
+            sort = self.get_sort_method()
+            return names.order_by(sort) if sort else names
         return Name.objects.none()
 
-
+    def use_cursor(self):
+        """True if the results should be paginated with cursors.
+
+        Cursors are used when one is passed with the request, or when
+        cursor pagination is configured and no page number was
+        requested, so existing page links keep working. Ranked results
+        have no sort column to seek on and are always paginated by page.
+        """
+        if self.get_sort_method() is None:
+            return False
+        if 'cursor' in self.request.GET:
+            return True
+        return (app_settings.NAME_SEARCH_PAGINATION == 'cursor' and
+                not self.request.GET.get('page'))
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_cursor():
+            return self.paginate_cached(queryset, page_size)
+
+        paginator = CursorPaginator(
+            queryset, page_size, self.get_sort_method())
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor as e:
+            raise http.Http404(str(e))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def get_paginator(self, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True, **kwargs):
+        """Returns an EstimatedPaginator, whose count is cached with the
+        search results.
+        """
+        cache_key = search_results.make_key(
+            search_cache_key(self.request, 'count'))
+        return EstimatedPaginator(
+            queryset, per_page,
+            threshold=app_settings.NAME_SEARCH_COUNT_THRESHOLD,
+            cache_key=cache_key, orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page, **kwargs)
+
+    def paginate_cached(self, queryset, page_size):
+        """Paginate by page number, caching the ordered ids of the Names
+        on the page.
+        """
+        page_number = (self.kwargs.get(self.page_kwarg) or
+                       self.request.GET.get(self.page_kwarg) or 1)
+        key = search_results.make_key(search_cache_key(
+            self.request, 'page', self.get_sort_method(), page_number,
+            page_size))
+
+        cached = search_results.get(key)
+        if cached is not None:
+            number, ids, has_next = cached
+            paginator = self.get_paginator(queryset, page_size)
+            page = paginator.cached_page(names_in_order(ids), number,
+                                         has_next)
+            return (paginator, page, page.object_list, page.has_other_pages())
+
+        paginator, page, object_list, is_paginated = super(
+            SearchView, self).paginate_queryset(queryset, page_size)
+        page.object_list = list(object_list)
+        search_results.set(key, (page.number,
+                                 [name.id for name in page.object_list],
+                                 page.has_next()))
+        return (paginator, page, page.object_list, is_paginated)
+
+
+@name_condition
+@cache_name_page
 def mads_serialize(request, name_id):
     """Renders the Name serialized into the MADS XML format."""
-    queryset = (
-        Name.objects.select_related()
-        .prefetch_related('identifier_set__type', 'note_set', 'variant_set')
-    )
+    name = get_object_or_404(
+        Name.objects.with_related().select_related('canonical_target'),
+        name_id=name_id)
+
+    if name.merged_with_id:
+        return redirect('name:mads-serialize',
+                        name.get_canonical_target().name_id)
 
-    context = dict(name=get_object_or_404(queryset, name_id=name_id))
+    context = dict(name=name)
 
     return render(request, 'name/name.mads.xml',
                   context, content_type='text/xml')
@@ -1,5 +1,8 @@
 import pytest
 import random
+from importlib import import_module
+
+from django.db import connection
 from name.models import Name
 
 
@@ -85,3 +88,16 @@ def search_fixtures(db, scope='module'):
         Name.objects.create(
             name="Building {0}".format(x), name_type=Name.BUILDING)
     return Name.objects.all()
+
+
+@pytest.fixture
+def sqlite_backend(db, monkeypatch):
+    """Select the sqlite search backend, and create the name_name_fts
+    table, which is added by a migration that does not run when the
+    tests are run with --nomigrations.
+    """
+    monkeypatch.setattr('name.app_settings.NAME_SEARCH_BACKEND', 'sqlite')
+    migration = import_module('name.migrations.0005_name_fts')
+    cursor = connection.cursor()
+    for sql in migration.FORWARDS_SQL:
+        cursor.execute(sql)
@@ -0,0 +1,164 @@
+import datetime
+import json
+
+import pytest
+
+from django.core.urlresolvers import reverse
+from django.db import connection
+
+from name import autocomplete
+from name.api import serializers
+from name.models import Name, NameLabel, Variant
+
+# Give all tests access to the database.
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def index():
+    """An empty, unloaded PrefixIndex for the test."""
+    return autocomplete.PrefixIndex()
+
+
+@pytest.fixture
+def process_index(monkeypatch):
+    """Replace the index of the process with a new one, so tests do
+    not share state.
+    """
+    index = autocomplete.PrefixIndex()
+    monkeypatch.setattr('name.autocomplete.index', index)
+    monkeypatch.setattr('name.app_settings.NAME_AUTOCOMPLETE_ENABLED', True)
+    return index
+
+
+def test_index_keys():
+    expected = [u'smith john q', u'john q', u'q']
+    assert expected == autocomplete.index_keys(u'smith john q')
+
+
+def test_search_matches_word_prefixes(index):
+    name = Name.objects.create(name='Smith, John', name_type=Name.PERSONAL)
+    Name.objects.create(name='Doe, Jane', name_type=Name.PERSONAL)
+
+    for q in ['smi', 'Smith, J', 'jo', 'john']:
+        assert [name.id] == [n.id for n in index.search(q)]
+    assert [] == index.search('smith jane')
+
+
+def test_search_matches_variants(index):
+    name = Name.objects.create(name='Smith, John', name_type=Name.PERSONAL)
+    name.variant_set.create(variant='Smythe', variant_type=Variant.OTHER)
+    assert [name.id] == [n.id for n in index.search('smy')]
+
+
+def test_search_filters_name_types(index, search_fixtures):
+    results = index.search('1', [Name.PERSONAL, Name.EVENT])
+    assert ['Event 1', 'Personal 1'] == sorted(n.name for n in results)
+
+
+def test_search_limit(index, twenty_name_fixtures):
+    assert 10 == len(index.search('name'))
+    assert 3 == len(index.search('', limit=3))
+
+
+def test_search_excludes_names_that_are_not_visible(index,
+                                                    merged_name_fixtures,
+                                                    status_name_fixtures):
+    results = index.search('test')
+    assert all(n.record_status == Name.ACTIVE for n in results)
+    assert merged_name_fixtures[0].id not in [n.id for n in results]
+
+
+def test_index_follows_changes_in_process(process_index):
+    process_index.load()
+    name = Name.objects.create(name='Smith, John', name_type=Name.PERSONAL)
+    assert [name.id] == [n.id for n in process_index.search('smith')]
+
+    variant = name.variant_set.create(variant='Smythe',
+                                      variant_type=Variant.OTHER)
+    assert [name.id] == [n.id for n in process_index.search('smythe')]
+
+    variant.delete()
+    assert [] == process_index.search('smythe')
+
+    name.record_status = Name.SUPPRESSED
+    name.save()
+    assert [] == process_index.search('smith')
+
+    name.record_status = Name.ACTIVE
+    name.save()
+    name.delete()
+    assert [] == process_index.search('smith')
+
+
+def test_refresh_picks_up_changes_from_other_processes(index):
+    name = Name.objects.create(name='Smith, John', name_type=Name.PERSONAL)
+    index.load()
+
+    # Simulate a change made in another process, which the signal
+    # receivers do not see.
+    Name.objects.filter(id=name.id).update(
+        normalized_name='smythe john', last_modified=name.last_modified)
+    index.refresh()
+    assert [name.id] == [n.id for n in index.search('smythe')]
+
+
+def test_refresh_picks_up_changes_committed_late(index):
+    name = Name.objects.create(name='Smith, John', name_type=Name.PERSONAL)
+    Name.objects.create(name='Doe, Jane', name_type=Name.PERSONAL)
+    index.load()
+
+    # A transaction committed after the load, with a last_modified date
+    # earlier than the latest one the index saw.
+    Name.objects.filter(id=name.id).update(
+        normalized_name='smythe john',
+        last_modified=name.last_modified - datetime.timedelta(seconds=1))
+    index.refresh()
+    assert [name.id] == [n.id for n in index.search('smythe')]
+
+
+def test_refresh_drops_names_deleted_by_other_processes(index):
+    name = Name.objects.create(name='Smith, John', name_type=Name.PERSONAL)
+    other = Name.objects.create(name='Doe, Jane', name_type=Name.PERSONAL)
+    index.load()
+
+    # Deleted outside of the signal receivers, and without a trace in
+    # the last_modified dates.
+    cursor = connection.cursor()
+    for model in (NameLabel, Name):
+        cursor.execute('DELETE FROM {0} WHERE {1} = %s'.format(
+            model._meta.db_table,
+            'id' if model is Name else 'belong_to_name_id'), [name.id])
+    index.refresh()
+    assert [] == index.search('smith')
+    assert [other.id] == [n.id for n in index.search('doe')]
+
+
+def test_refresh_adds_missed_names(index):
+    name = Name.objects.create(name='Smith, John', name_type=Name.PERSONAL)
+    index.load()
+    missed = Name.objects.create(name='Doe, Jane', name_type=Name.PERSONAL)
+    index.remove_name(missed.id)
+    # Too old to be read again by the refresh.
+    Name.objects.filter(id=missed.id).update(
+        last_modified=name.last_modified - datetime.timedelta(days=1))
+
+    index.refresh()
+    assert [missed.id] == [n.id for n in index.search('doe')]
+    assert [name.id] == [n.id for n in index.search('smith')]
+
+
+def test_search_json_xhr_uses_index(client, rf, process_index,
+                                    twenty_name_fixtures):
+    response = client.get(reverse('name:search-json'), {'q': 'name 1'},
+                          HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+    assert process_index.loaded
+
+    results = json.loads(response.content)
+    names = Name.objects.filter(id__in=[r['id'] for r in results])
+    request = rf.get('/')
+    expected = serializers.NameSearchSerializer(
+        names, many=True, context={'request': request}).data
+    key = lambda r: r['id']
+    assert sorted(expected, key=key) == sorted(results, key=key)
+    assert 10 == len(results)
@@ -0,0 +1,41 @@
+import pytest
+
+from django.core.cache import cache
+from name.cache import GenerationCache
+
+generations = GenerationCache('test', 'NAME_SEARCH_CACHE')
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr('name.app_settings.NAME_SEARCH_CACHE', 'default')
+    cache.clear()
+
+
+def test_disabled_cache_does_nothing():
+    key = generations.make_key('smith')
+    assert key is None
+    generations.set(key, [1, 2])
+    assert generations.get(key) is None
+    generations.invalidate()
+
+
+def test_get_and_set(enabled):
+    key = generations.make_key('smith')
+    generations.set(key, [1, 2])
+    assert generations.get(key) == [1, 2]
+    assert generations.get(generations.make_key('smithe')) is None
+
+
+def test_invalidate(enabled):
+    key = generations.make_key('smith')
+    generations.set(key, [1, 2])
+    generations.invalidate()
+    assert generations.make_key('smith') != key
+    assert generations.get(generations.make_key('smith')) is None
+
+
+def test_evicted_generation_does_not_restart(enabled):
+    old = generations.generation()
+    cache.delete('name:test:generation')
+    assert generations.generation() >= old
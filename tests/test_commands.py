@@ -0,0 +1,131 @@
+import pytest
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+
+from name import app_settings, snapshots
+from name.models import BIOGRAPHY_RENDERER, Name, NameToken
+
+# Give all tests access to the database.
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def token_backend(monkeypatch):
+    monkeypatch.setattr('name.app_settings.NAME_SEARCH_BACKEND', 'token')
+
+
+def test_rebuild_search_index(token_backend, search_fixtures):
+    NameToken.objects.all().delete()
+    call_command('rebuild_search_index')
+    assert NameToken.objects.filter(token='personal').count() == 4
+
+
+def test_rebuild_search_index_with_chunk_size(token_backend,
+                                              search_fixtures):
+    NameToken.objects.all().delete()
+    call_command('rebuild_search_index', chunk_size=3)
+    assert (NameToken.objects.values('belong_to_name').distinct().count()
+            == Name.objects.count())
+
+
+@pytest.mark.skipif(connection.vendor != 'sqlite', reason='Requires SQLite.')
+def test_rebuild_search_index_with_sqlite_backend(sqlite_backend,
+                                                  search_fixtures):
+    cursor = connection.cursor()
+    cursor.execute('DELETE FROM name_name_fts')
+    call_command('rebuild_search_index', chunk_size=3)
+    cursor.execute('SELECT count(*) FROM name_name_fts')
+    assert cursor.fetchone()[0] == Name.objects.count()
+
+
+def test_backfill_phonetic_keys():
+    name = Name.objects.create(name='Meyer, Mary', name_type=Name.PERSONAL)
+    variant = name.variant_set.create(variant='Smyth, M.', variant_type=4)
+    Name.objects.update(phonetic_name='')
+    name.variant_set.update(phonetic_variant='')
+
+    call_command('backfill_phonetic_keys', chunk_size=1)
+
+    assert Name.objects.get(id=name.id).phonetic_name == 'M600 M600'
+    assert (name.variant_set.get(id=variant.id).phonetic_variant ==
+            'S530 M000')
+
+
+def test_render_biographies():
+    current = Name.objects.create(name='Meyer, Mary', name_type=0,
+                                  biography='*Current*')
+    stale = Name.objects.create(name='Smyth, M.', name_type=0,
+                                biography='*Stale*')
+    Name.objects.filter(id=current.id).update(biography_html='Kept')
+    Name.objects.filter(id=stale.id).update(biography_html='Old',
+                                            biography_renderer='')
+    last_modified = Name.objects.get(id=stale.id).last_modified
+
+    call_command('render_biographies', chunk_size=1)
+
+    assert Name.objects.get(id=current.id).biography_html == 'Kept'
+    stale = Name.objects.get(id=stale.id)
+    assert stale.biography_html == '<p><em>Stale</em></p>\n'
+    assert stale.biography_renderer == BIOGRAPHY_RENDERER
+    assert stale.last_modified == last_modified
+
+    call_command('render_biographies', force=True)
+    assert (Name.objects.get(id=current.id).biography_html ==
+            '<p><em>Current</em></p>\n')
+
+
+def test_repair_canonical_targets():
+    survivor = Name.objects.create(name='Meyer, Mary', name_type=0)
+    merged = Name.objects.create(name='Meyer, M.', name_type=0,
+                                 merged_with=survivor)
+    Name.objects.update(canonical_target=None)
+
+    call_command('repair_canonical_targets')
+    assert Name.objects.get(id=merged.id).canonical_target == survivor
+
+
+def test_check_merges(capsys):
+    john = Name.objects.create(name='Smith, John', name_type=0)
+    jane = Name.objects.create(name='Doe, Jane', name_type=0)
+    call_command('check_merges')
+
+    Name.objects.filter(id=john.id).update(merged_with=jane)
+    Name.objects.filter(id=jane.id).update(merged_with=john)
+    with pytest.raises(CommandError):
+        call_command('check_merges')
+    out, err = capsys.readouterr()
+    assert 'Merge loop: {0} -> {1} -> {0}'.format(
+        jane.name_id, john.name_id) in out
+
+
+def test_export_snapshot(tmpdir, monkeypatch, capsys):
+    Name.objects.create(name='Smith, John', name_type=0)
+    with pytest.raises(CommandError):
+        call_command('export_snapshot', base_url='http://example.org')
+
+    monkeypatch.setattr(app_settings, 'NAME_EXPORT_SNAPSHOT_DIR', str(tmpdir))
+    with pytest.raises(CommandError):
+        call_command('export_snapshot')
+
+    call_command('export_snapshot', base_url='http://example.org')
+    version = snapshots.latest(str(tmpdir))['version']
+    call_command('export_snapshot', base_url='http://example.org')
+    out, err = capsys.readouterr()
+    assert 'Wrote 1 of 1 shards to snapshot {0}.'.format(version) in out
+    assert 'The latest snapshot is up to date.' in out
+
+
+def test_dump_names(tmpdir, capsys):
+    Name.objects.create(name='Smith, John', name_type=0)
+    with pytest.raises(CommandError):
+        call_command('dump_names', base_url='http://example.org')
+    with pytest.raises(CommandError):
+        call_command('dump_names', output=str(tmpdir),
+                     base_url='http://example.org', formats='tsv,csv')
+
+    call_command('dump_names', output=str(tmpdir),
+                 base_url='http://example.org', processes=1)
+    out, err = capsys.readouterr()
+    assert 'Dumped 1 Names in 1 shards to {0}.'.format(tmpdir) in out
+    assert 'Smith, John' in tmpdir.join('names.tsv').read()
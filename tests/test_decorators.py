@@ -1,4 +1,6 @@
-from name.decorators import jsonp
+from django import http
+from django.core.cache import cache
+from name.decorators import cache_name_page, jsonp
 from mock import MagicMock
 
 
@@ -63,3 +65,24 @@ def test_jsonp_request_does_not_have_callback():
     # Here we assert the the content was not altered
     # since we did not provide a callback.
     assert json == result.content
+
+
+def test_cache_name_page_keeps_the_headers(rf, monkeypatch):
+    monkeypatch.setattr('name.app_settings.NAME_PAGE_CACHE', 'default')
+    cache.clear()
+    calls = []
+
+    @cache_name_page
+    def view(request, name_id):
+        calls.append(name_id)
+        response = http.HttpResponse('{}', content_type='application/json')
+        response['Access-Control-Allow-Origin'] = '*'
+        response['Vary'] = 'Accept'
+        return response
+
+    request = rf.get('/name/nm0000001.json')
+    response = view(request, 'nm0000001')
+    cached = view(request, 'nm0000001')
+    assert ['nm0000001'] == calls
+    assert '{}' == cached.content
+    assert sorted(response.items()) == sorted(cached.items())
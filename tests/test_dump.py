@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+from xml.etree import ElementTree
+
+import pytest
+
+from django.core.urlresolvers import reverse
+
+from name import dump
+from name.api.fast import base_detail_url
+from name.export import export_jsonl, export_tsv
+from name.models import Location, Name, Variant
+
+BASE_URL = 'http://testserver'
+
+
+def read(directory, name):
+    with open(os.path.join(directory, name), 'rb') as f:
+        return f.read()
+
+
+def shard_ranges(names, shard_size):
+    """Returns the (first, last) ids of the shards of shard_size ids up
+    to the last of the names, as the sequences of the database are not
+    reset between tests.
+    """
+    last = names.last().id
+    return [(first, min(first + shard_size - 1, last))
+            for first in range(1, last + 1, shard_size)]
+
+
+@pytest.fixture
+def names(db):
+    for x in range(5):
+        Name.objects.create(name=u'Name {0} \xe9'.format(x),
+                            name_type=Name.PERSONAL, begin='1900')
+    name = Name.objects.order_by('id').first()
+    Variant.objects.create(belong_to_name=name, variant_type=0,
+                           variant='Variant')
+    Location.objects.create(belong_to_name=name, latitude=33.0,
+                            longitude=-97.0)
+    Name.objects.create(name=u'Suppressed', name_type=Name.PERSONAL,
+                        record_status=Name.SUPPRESSED)
+    return Name.objects.order_by('id')
+
+
+def test_dump(tmpdir, names):
+    directory = str(tmpdir)
+    manifest = dump.dump(directory, BASE_URL, processes=1, shard_size=2,
+                         chunk_size=1)
+
+    url = base_detail_url(BASE_URL)
+    visible = Name.objects.visible()
+    assert ''.join(export_tsv(visible, url, 10)) == read(directory,
+                                                         'names.tsv')
+    assert ''.join(export_jsonl(visible, url, 10)) == read(directory,
+                                                           'names.jsonl')
+
+    assert 5 == manifest['names']
+    assert shard_ranges(names, 2) == [
+        (shard['first_id'], shard['last_id'])
+        for shard in manifest['shards']]
+    assert 'names.xml' == manifest['files']['mads']['path']
+    assert manifest == json.loads(read(directory, dump.MANIFEST))
+    assert ['manifest.json', 'names.jsonl', 'names.tsv', 'names.xml'] == \
+        sorted(os.listdir(directory))
+
+
+def test_dump_in_processes(tmpdir, transactional_db, names):
+    # The processes of the pool open their own connections, so the
+    # Names are committed rather than left in a test transaction.
+    directory = str(tmpdir)
+    manifest = dump.dump(directory, BASE_URL, processes=2, shard_size=2,
+                         chunk_size=1)
+
+    url = base_detail_url(BASE_URL)
+    visible = Name.objects.visible()
+    assert ''.join(export_tsv(visible, url, 10)) == read(directory,
+                                                         'names.tsv')
+    assert ''.join(export_jsonl(visible, url, 10)) == read(directory,
+                                                           'names.jsonl')
+    assert 5 == len(ElementTree.fromstring(read(directory, 'names.xml')))
+    assert 5 == manifest['names']
+    assert [visible.filter(id__gte=first, id__lte=last).count()
+            for first, last in shard_ranges(names, 2)] == [
+        shard['names'] for shard in manifest['shards']]
+
+
+def test_dump_mads(tmpdir, client, names):
+    directory = str(tmpdir)
+    dump.dump(directory, BASE_URL, formats=['mads'], processes=1,
+              shard_size=2)
+
+    data = read(directory, 'names.xml')
+    collection = ElementTree.fromstring(data)
+    assert 5 == len(collection)
+
+    # Each record is the MADS XML of the Name, as served by the site.
+    name = names[0]
+    response = client.get(reverse('name:mads-serialize',
+                                  args=[name.name_id]))
+    assert response.content.strip() in data
+
+
+def test_dump_without_concatenating(tmpdir, names):
+    directory = str(tmpdir)
+    manifest = dump.dump(directory, BASE_URL, formats=['tsv', 'mads'],
+                         processes=1, shard_size=4, concatenated=False)
+
+    assert {} == manifest['files']
+    paths = [shard['files']['mads']['path'] for shard in manifest['shards']]
+    assert ['mads-{0:09d}.xml'.format(first)
+            for first, last in shard_ranges(names, 4)] == paths
+    for path in paths:
+        ElementTree.fromstring(read(directory, path))
+    assert 5 == sum(read(directory, shard['files']['tsv']['path'])
+                    .count('\n') for shard in manifest['shards'])
+
+
+def test_dump_without_names(tmpdir, db):
+    directory = str(tmpdir)
+    manifest = dump.dump(directory, BASE_URL, processes=1)
+    assert 0 == manifest['names']
+    assert '' == read(directory, 'names.tsv')
+    assert dump.MADS_HEADER + dump.MADS_FOOTER == read(directory,
+                                                       'names.xml')
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+import datetime
+import json
+
+import pytest
+
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from name.api.fast import base_detail_url
+from name.export import (DELTA_OVERLAP, chunked_rows, export_delta,
+                         export_tsv, parse_since)
+from name.models import DeletedName, Name
+
+
+@pytest.fixture
+def url():
+    return base_detail_url('http://testserver')
+
+
+def test_detail_url(url, name_fixture):
+    assert (url(name_fixture.name_id) ==
+            'http://testserver' + name_fixture.get_absolute_url())
+
+
+def test_export_tsv(url, merged_name_fixtures):
+    merged, survivor = merged_name_fixtures
+    rice = Name.objects.create(name=u'Universit\xe9 "Rice"\tHouston',
+                               name_type=Name.ORGANIZATION)
+    Name.objects.create(name=u'Suppressed', name_type=Name.PERSONAL,
+                        record_status=Name.SUPPRESSED)
+
+    content = ''.join(export_tsv(Name.objects.visible(), url, 1))
+
+    assert content == (
+        'personal\ttest person 2\t{0}\r\n'
+        'organization\t"Universit\xc3\xa9 ""Rice""\tHouston"\t{1}\r\n'
+        .format(url(survivor.name_id), url(rice.name_id)))
+
+
+def test_chunked_rows_reads_chunks_by_id(twenty_name_fixtures):
+    names = Name.objects.all()
+    with CaptureQueriesContext(connection) as queries:
+        chunks = list(chunked_rows(names, ('name',), 5))
+
+    assert [5, 5, 5, 5, 1] == [len(chunk) for chunk in chunks]
+    assert ([id for chunk in chunks for id, name in chunk] ==
+            list(names.order_by('id').values_list('id', flat=True)))
+    # A query per chunk, and one finding that there are no more rows.
+    assert 6 == len(queries)
+    assert all('LIMIT 5' in query['sql'] for query in queries)
+
+
+def test_export_tsv_holds_a_chunk_at_a_time(url, twenty_name_fixtures):
+    """The memory used by the export is bounded by the chunk size,
+    whatever the number of Names.
+    """
+    pieces = export_tsv(Name.objects.all(), url, 4)
+    peak = max(len(piece) for piece in pieces)
+
+    row = max(len('{0}\t{1}\t{2}\r\n'.format(
+        name.get_name_type_label().lower(), name.name, url(name.name_id)))
+        for name in Name.objects.all())
+    assert peak <= 4 * row
+
+
+@pytest.fixture
+def delta_names(db):
+    """Names changed, merged, suppressed and deleted since SINCE, and a
+    Name unchanged since then.
+    """
+    old = timezone.now() - datetime.timedelta(days=2)
+    unchanged = Name.objects.create(name=u'Unchanged', name_type=Name.EVENT)
+    changed = Name.objects.create(name=u'Chang\xe9', name_type=Name.PERSONAL)
+    survivor = Name.objects.create(name=u'Survivor', name_type=Name.EVENT)
+    merged = Name.objects.create(name=u'Merged', name_type=Name.EVENT)
+    suppressed = Name.objects.create(name=u'Suppressed', name_type=Name.EVENT)
+    deleted = Name.objects.create(name=u'Deleted', name_type=Name.EVENT)
+    Name.objects.update(last_modified=old)
+    DeletedName.objects.create(name_id='nm9999999', name='Old')
+    DeletedName.objects.update(deleted=old)
+
+    changed.save()
+    merged.merged_with = survivor
+    merged.save()
+    suppressed.record_status = Name.SUPPRESSED
+    suppressed.save()
+    deleted.delete()
+    return unchanged, changed, survivor, merged, suppressed, deleted
+
+
+SINCE = timezone.now() - datetime.timedelta(days=1)
+
+
+def test_export_delta_tsv(url, delta_names):
+    unchanged, changed, survivor, merged, suppressed, deleted = delta_names
+
+    content = ''.join(export_delta('tsv', SINCE, url, 2))
+
+    assert content == (
+        'personal\tChang\xc3\xa9\t{0}\r\n'
+        'merged\tMerged\t{1}\r\n'
+        'suppressed\tSuppressed\t{2}\r\n'
+        'deleted\tDeleted\t{3}\r\n'.format(
+            url(changed.name_id), url(merged.name_id),
+            url(suppressed.name_id), url(deleted.name_id)))
+
+
+def test_export_delta_jsonl(url, delta_names):
+    unchanged, changed, survivor, merged, suppressed, deleted = delta_names
+
+    lines = [json.loads(line) for line in
+             ''.join(export_delta('jsonl', SINCE, url, 2)).splitlines()]
+
+    assert lines[0]['authoritative_name'] == changed.name
+    assert lines[1:] == [
+        {'identifier': url(merged.name_id), 'status': 'merged',
+         'merged_with': url(survivor.name_id)},
+        {'identifier': url(suppressed.name_id), 'status': 'suppressed'},
+        {'identifier': url(deleted.name_id), 'status': 'deleted'},
+    ]
+
+
+def test_export_delta_lists_late_commits(url, delta_names):
+    unchanged, changed, survivor, merged, suppressed, deleted = delta_names
+    since = timezone.now()
+    # Committed after the previous download started at since, by a
+    # transaction started before it.
+    Name.objects.filter(id=unchanged.id).update(
+        last_modified=since - datetime.timedelta(minutes=1))
+    Name.objects.filter(id=suppressed.id).update(
+        last_modified=since - datetime.timedelta(minutes=2))
+    Name.objects.filter(id=changed.id).update(
+        last_modified=since - DELTA_OVERLAP - datetime.timedelta(minutes=1))
+    Name.objects.filter(id=merged.id).update(
+        last_modified=since - DELTA_OVERLAP - datetime.timedelta(minutes=1))
+    DeletedName.objects.update(
+        deleted=since - datetime.timedelta(minutes=1))
+
+    content = ''.join(export_delta('tsv', since, url, 2))
+
+    assert content == (
+        'event\tUnchanged\t{0}\r\n'
+        'suppressed\tSuppressed\t{1}\r\n'
+        'deleted\tOld\t{2}\r\n'
+        'deleted\tDeleted\t{3}\r\n'.format(
+            url(unchanged.name_id), url(suppressed.name_id),
+            url('nm9999999'), url(deleted.name_id)))
+
+
+def test_deleting_a_name_records_it(name_fixture):
+    name_fixture.delete()
+    deleted = DeletedName.objects.get()
+    assert deleted.name_id == name_fixture.name_id
+    assert deleted.name == name_fixture.name
+
+
+@pytest.mark.parametrize('value,expected', [
+    ('2015-06-30T12:00:00Z', datetime.datetime(2015, 6, 30, 12, 0)),
+    ('2015-06-30T14:00:00+02:00', datetime.datetime(2015, 6, 30, 12, 0)),
+    ('2015-06-30', datetime.datetime(2015, 6, 30)),
+])
+def test_parse_since(value, expected, settings):
+    settings.USE_TZ = True
+    # Dates without a time zone are in the current time zone.
+    with timezone.override(timezone.utc):
+        since = parse_since(value)
+    assert since == timezone.make_aware(expected, timezone.utc)
+
+
+def test_parse_since_invalid():
+    with pytest.raises(ValueError):
+        parse_since('yesterday')
+
+
+def test_export_view_delta(client, delta_names):
+    response = client.get(reverse('name:export'),
+                          {'since': SINCE.isoformat()})
+    assert 200 == response.status_code
+    assert 4 == ''.join(response.streaming_content).count('\n')
+
+    response = client.get(reverse('name:export'), {'since': 'yesterday'})
+    assert 400 == response.status_code
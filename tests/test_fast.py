@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from django.db import connection
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+
+from name.api import fast, serializers
+from name.models import Identifier_Type, Location, Name, Note, Variant
+
+
+def render(data):
+    """Renders data the way the JSON views do."""
+    return JSONRenderer().render(data, renderer_context={'indent': 4})
+
+
+@pytest.fixture
+def names(db):
+    website = Identifier_Type.objects.create(label='Website')
+    twitter = Identifier_Type.objects.create(label='Twitter')
+
+    john = Name.objects.create(
+        name=u'Smith, John', name_type=Name.PERSONAL, begin='1900-01-01',
+        end='1980-12-31', disambiguation=u'Composer')
+    john.identifier_set.create(type=website, value='http://example.com',
+                               order=1)
+    john.identifier_set.create(type=twitter, value='http://twitter.com/j')
+    john.identifier_set.create(type=website, value='http://example.org',
+                               visible=False, order=2)
+    john.note_set.create(note=u'A note', note_type=Note.SOURCE)
+    john.note_set.create(note=u'Private', note_type=Note.NONPUBLIC)
+    john.variant_set.create(variant=u'Smith, J.', variant_type=Variant.OTHER)
+    john.variant_set.create(variant=u'J. S.', variant_type=Variant.ACRONYM)
+    Location.objects.create(belong_to_name=john, latitude='29.7174',
+                            longitude='-95.40178')
+    Location.objects.create(belong_to_name=john, latitude='1',
+                            longitude='2', status=Location.FORMER)
+
+    rice = Name.objects.create(name=u'Rice Universit\xe9',
+                               name_type=Name.ORGANIZATION)
+    Location.objects.create(belong_to_name=rice, latitude='-29.7',
+                            longitude='95.123456789')
+
+    Name.objects.create(name=u'Hackathon', name_type=Name.EVENT,
+                        begin='2014')
+    return Name.objects.order_by('id')
+
+
+@pytest.fixture(params=[{}, {'format': 'json'}], ids=['plain', 'format'])
+def api_request(request):
+    """A request for search.json, with and without the format parameter
+    that the serializers carry over to the URLs.
+    """
+    return RequestFactory().get('/name/search.json', request.param)
+
+
+@pytest.fixture
+def url(api_request):
+    return fast.detail_url(api_request)
+
+
+def test_search_results_match_the_serializer(names, api_request, url):
+    expected = serializers.NameSearchSerializer(
+        names, many=True, context={'request': api_request}).data
+    rows = names.values(*fast.SEARCH_FIELDS)
+    assert render(expected) == render(fast.search_results(rows, url))
+
+
+def test_names_match_the_serializer(names, api_request, url):
+    expected = serializers.NameSerializer(
+        names, many=True, context={'request': api_request}).data
+    rows = names.values(*fast.NAME_FIELDS)
+    assert render(expected) == render(fast.names(rows, url))
+
+
+def test_locations_match_the_serializer(names, api_request, url):
+    locations = Location.objects.filter(status=Location.CURRENT)
+    expected = serializers.LocationSerializer(
+        locations, many=True, context={'request': api_request}).data
+    assert render(expected) == render(fast.locations(locations, url))
+
+
+def test_locations_use_a_fixed_number_of_queries(names, url):
+    with CaptureQueriesContext(connection) as queries:
+        fast.locations(Location.objects.all(), url)
+    assert 5 == len(queries)
+
+
+def test_detail_url(url):
+    assert url('nm0000001').startswith('http://testserver/name/nm0000001/')
+
+
+def test_base_detail_url_matches_detail_url():
+    url = fast.detail_url(RequestFactory().get('/name/search.json'))
+    assert fast.base_detail_url('http://testserver/')('nm0000001') == (
+        url('nm0000001'))
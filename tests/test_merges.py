@@ -0,0 +1,61 @@
+import pytest
+from mock import MagicMock
+
+from name.merges import (
+    find_merge_problems, find_survivors, repair_canonical_targets,
+    supports_recursive_queries)
+from name.models import Name
+
+
+def test_find_survivors():
+    links = {1: None, 2: 1, 3: 2, 4: 3, 5: None}
+    assert find_survivors(links) == {1: 1, 2: 1, 3: 1, 4: 1, 5: 5}
+
+
+def test_find_survivors_of_loops_and_orphans():
+    links = {1: 2, 2: 3, 3: 1, 4: 1, 5: 99, 6: 5}
+    assert find_survivors(links) == {
+        1: None, 2: None, 3: None, 4: None, 5: None, 6: None}
+
+
+@pytest.mark.parametrize('version,expected', [
+    ((5, 7, 22), False),
+    ((8, 0, 11), True),
+    ((10, 1, 48), False),
+    ((10, 2, 6), True),
+])
+def test_supports_recursive_queries_on_mysql(monkeypatch, version, expected):
+    monkeypatch.setattr('name.merges.connection',
+                        MagicMock(vendor='mysql', mysql_version=version))
+    assert supports_recursive_queries() is expected
+
+
+@pytest.mark.django_db
+def test_repair_canonical_targets():
+    names = [Name.objects.create(name='Name {0}'.format(i), name_type=0)
+             for i in range(4)]
+    for name, target in zip(names[1:], names):
+        name.merged_with = target
+        name.save()
+    Name.objects.update(canonical_target=None)
+
+    assert repair_canonical_targets(Name, chunk_size=2) == 3
+    targets = Name.objects.order_by('id').values_list('canonical_target',
+                                                      flat=True)
+    assert list(targets) == [None] + [names[0].id] * 3
+    assert repair_canonical_targets(Name) == 0
+
+
+def test_find_merge_problems():
+    links = [(1, None), (2, 1), (3, 4), (4, 5), (5, 3), (6, 5), (7, 99)]
+    loops, orphans = find_merge_problems(iter(links))
+    assert len(loops) == 1
+    loop = loops[0]
+    # The loop starts at the merge that closed it.
+    assert loop == [5, 3, 4]
+    assert orphans == {7: 99}
+
+
+def test_find_merge_problems_without_problems():
+    links = [(2, 1), (3, 2), (1, None), (4, 2)]
+    assert find_merge_problems(links) == ([], {})
@@ -1,12 +1,19 @@
 import pytest
 import json
 from mock import patch, Mock
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from name.models import (
+    BIOGRAPHY_RENDERER,
     Name,
     Note,
     Variant,
     BaseTicketing,
     Location,
+    NameLabel,
+    NameToken,
+    NameTrigram,
     Identifier_Type,
     Identifier)
 
@@ -38,6 +45,163 @@ class TestVariant:
         variant = Variant(variant=variant_variant)
         assert variant_variant == unicode(variant)
 
+    @pytest.mark.django_db
+    def test_saving_variant_touches_name(self):
+        name = Name.objects.create(name='Meyer, Mary', name_type=Name.PERSONAL)
+        variant = name.variant_set.create(variant='Smyth, M.',
+                                          variant_type=Variant.OTHER)
+        created = Name.objects.get(id=name.id).last_modified
+        assert created > name.last_modified
+
+        variant.delete()
+        assert Name.objects.get(id=name.id).last_modified > created
+
+    @pytest.mark.django_db
+    def test_saving_variant_sets_phonetic_key(self):
+        name = Name.objects.create(name='Meyer, Mary', name_type=Name.PERSONAL)
+        variant = name.variant_set.create(variant='Smyth, M.',
+                                          variant_type=Variant.OTHER)
+        assert variant.phonetic_variant == 'S530 M000'
+
+
+class TestNameToken:
+    def test_has_unicode_method(self):
+        token = NameToken(token='smith')
+        assert 'smith' == unicode(token)
+
+    def test_tokenize(self):
+        assert ['smith', 'john'] == NameToken.tokenize('smith john')
+
+    @pytest.fixture
+    def token_backend(self, monkeypatch):
+        monkeypatch.setattr('name.app_settings.NAME_SEARCH_BACKEND', 'token')
+
+    @pytest.mark.django_db
+    def test_saving_name_does_not_index_tokens_by_default(self):
+        name = Name.objects.create(name='Smith, John', name_type=0)
+        assert not name.nametoken_set.exists()
+
+    @pytest.mark.django_db
+    def test_saving_name_indexes_tokens(self, token_backend):
+        name = Name.objects.create(name='Smith, John', name_type=0)
+        tokens = name.nametoken_set.values_list('token', flat=True)
+        assert set(['smith', 'john']) == set(tokens)
+
+    @pytest.mark.django_db
+    def test_renaming_name_updates_tokens(self, token_backend):
+        name = Name.objects.create(name='Smith, John', name_type=0)
+        name.name = 'Smith, Jane'
+        name.save()
+        tokens = name.nametoken_set.values_list('token', flat=True)
+        assert set(['smith', 'jane']) == set(tokens)
+
+    @pytest.mark.django_db
+    def test_saving_variant_indexes_tokens(self, token_backend):
+        name = Name.objects.create(name='Smith, John', name_type=0)
+        variant = name.variant_set.create(
+            variant='Smythe, Johnny', variant_type=Variant.OTHER)
+        tokens = name.nametoken_set.values_list('token', flat=True)
+        assert set(['smith', 'john', 'smythe', 'johnny']) == set(tokens)
+
+        variant.delete()
+        tokens = name.nametoken_set.values_list('token', flat=True)
+        assert set(['smith', 'john']) == set(tokens)
+
+    @pytest.mark.django_db
+    def test_queryset_delete_of_variants_updates_tokens(self, token_backend):
+        name = Name.objects.create(name='Smith, John', name_type=0)
+        name.variant_set.create(variant='Smythe', variant_type=Variant.OTHER)
+        name.variant_set.all().delete()
+        tokens = name.nametoken_set.values_list('token', flat=True)
+        assert set(['smith', 'john']) == set(tokens)
+
+    @pytest.mark.django_db
+    def test_deleting_name_with_variants_leaves_no_tokens(self,
+                                                          token_backend):
+        name = Name.objects.create(name='Smith, John', name_type=0)
+        name.variant_set.create(variant='Smythe', variant_type=Variant.OTHER)
+        name.delete()
+        assert not NameToken.objects.exists()
+        assert not NameLabel.objects.exists()
+
+    @pytest.mark.django_db
+    def test_rebuild(self, token_backend):
+        name = Name.objects.create(name='Smith, John', name_type=0)
+        name.variant_set.create(variant='Smythe', variant_type=Variant.OTHER)
+        NameToken.objects.all().delete()
+
+        assert [1] == list(NameToken.objects.rebuild())
+        tokens = name.nametoken_set.values_list('token', flat=True)
+        assert set(['smith', 'john', 'smythe']) == set(tokens)
+
+
+class TestNameLabel:
+    def test_tokenize(self):
+        assert ['smith john'] == NameLabel.tokenize('smith john')
+        assert [] == NameLabel.tokenize('')
+
+    @pytest.mark.django_db
+    def test_saving_name_and_variant_indexes_labels(self):
+        name = Name.objects.create(name='Smith, John', name_type=0)
+        name.variant_set.create(variant='Smythe, Johnny',
+                                variant_type=Variant.OTHER)
+        labels = name.namelabel_set.values_list('token', flat=True)
+        assert set(['smith john', 'smythe johnny']) == set(labels)
+
+    @pytest.mark.django_db
+    def test_resolve_prefers_names_over_variants(self):
+        name = Name.objects.create(name='Smith, John', name_type=0)
+        other = Name.objects.create(name='Smith, J.', name_type=0)
+        other.variant_set.create(variant='Smith, John',
+                                 variant_type=Variant.OTHER)
+
+        resolved = NameLabel.objects.resolve(['smith john', 'smith j',
+                                              'unknown'])
+        assert [name.name_id] == resolved['smith john']
+        assert [other.name_id] == resolved['smith j']
+        assert [] == resolved['unknown']
+
+    @pytest.mark.django_db
+    def test_resolve_follows_merges(self):
+        first = Name.objects.create(name='Smith, John', name_type=0)
+        second = Name.objects.create(name='Smith, John', name_type=0)
+        survivor = Name.objects.create(name='Smith, Jonathan', name_type=0)
+        first.merged_with = second
+        first.save()
+        second.merged_with = survivor
+        second.save()
+
+        resolved = NameLabel.objects.resolve(['smith john'])
+        assert [survivor.name_id] == resolved['smith john']
+
+
+class TestNameTrigram:
+    def test_tokenize(self):
+        expected = set(['  j', ' jo', 'joh', 'ohn', 'hn '])
+        assert expected == NameTrigram.tokenize('john')
+
+    def test_similarity(self):
+        a = NameTrigram.tokenize('meyer')
+        assert 1.0 == NameTrigram.similarity(a, a)
+        assert 0.0 == NameTrigram.similarity(a, set())
+        assert 0 < NameTrigram.similarity(
+            a, NameTrigram.tokenize('meier')) < 1
+
+    @pytest.mark.django_db
+    def test_saving_name_does_not_index_trigrams_by_default(self):
+        name = Name.objects.create(name='Smith, John', name_type=0)
+        assert not name.nametrigram_set.exists()
+
+    @pytest.mark.django_db
+    def test_saving_name_indexes_trigrams(self, monkeypatch):
+        monkeypatch.setattr('name.app_settings.NAME_SEARCH_BACKEND',
+                            'trigram')
+        name = Name.objects.create(name='John', name_type=0)
+        name.variant_set.create(variant='Jo', variant_type=Variant.OTHER)
+        trigrams = name.nametrigram_set.values_list('token', flat=True)
+        expected = set(['  j', ' jo', 'joh', 'ohn', 'hn ', 'jo '])
+        assert expected == set(trigrams)
+
 
 class TestBaseTicketing:
     def test_has_unicode_method(self):
@@ -47,6 +211,66 @@ class TestBaseTicketing:
 
 
 class TestName:
+    @pytest.mark.django_db
+    def test_merging_sets_canonical_targets(self):
+        a, b, c, d = [Name.objects.create(name=x, name_type=0) for x in 'abcd']
+        a.merged_with = b
+        a.save()
+        b.merged_with = c
+        b.save()
+        assert Name.objects.get(id=a.id).canonical_target == c
+        assert Name.objects.get(id=b.id).canonical_target == c
+
+        # Merging the survivor moves every Name merged with it.
+        c.merged_with = d
+        c.save()
+        targets = Name.objects.filter(id__in=[a.id, b.id, c.id]).values_list(
+            'canonical_target', flat=True)
+        assert set(targets) == set([d.id])
+
+        # Unmerging a Name in the middle of the chain splits it.
+        b = Name.objects.get(id=b.id)
+        b.merged_with = None
+        b.save()
+        assert Name.objects.get(id=a.id).canonical_target == b
+        assert Name.objects.get(id=b.id).canonical_target is None
+        assert Name.objects.get(id=c.id).canonical_target == d
+        assert Name.objects.get(id=b.id).get_canonical_target() is None
+
+    @pytest.mark.django_db
+    def test_saving_name_renders_biography(self):
+        name = Name.objects.create(name='Meyer, Mary', name_type=0,
+                                   biography='*Born* in Denton.')
+        assert name.biography_html == (
+            '<p><em>Born</em> in Denton.</p>\n')
+        assert name.biography_renderer == BIOGRAPHY_RENDERER
+
+    @pytest.mark.django_db
+    def test_render_biography_uses_stored_html(self):
+        name = Name.objects.create(name='Meyer, Mary', name_type=0,
+                                   biography='*Born* in Denton.')
+        name.biography_html = '<p>Stored</p>'
+        assert name.render_biography() == '<p>Stored</p>'
+
+    @pytest.mark.django_db
+    def test_render_biography_renders_stale_html_again(self):
+        name = Name.objects.create(name='Meyer, Mary', name_type=0,
+                                   biography='*Born* in Denton.')
+        Name.objects.update(biography_html='<p>Old</p>',
+                            biography_renderer='markdown2 1.0')
+
+        name = Name.objects.get(id=name.id)
+        assert name.render_biography() == (
+            '<p><em>Born</em> in Denton.</p>\n')
+        stored = Name.objects.get(id=name.id)
+        assert stored.biography_renderer == 'markdown2 1.0'
+        assert stored.biography_html == '<p>Old</p>'
+
+    @pytest.mark.django_db
+    def test_saving_name_sets_phonetic_key(self):
+        name = Name.objects.create(name='Meyer, Mary', name_type=Name.PERSONAL)
+        assert name.phonetic_name == 'M600 M600'
+
     @pytest.mark.django_db
     def test_saving_name_increments_base_ticketing_id(self):
         """Test that the BaseTicketing ID is properly incremented
@@ -155,6 +379,41 @@ class TestName:
         assert name_id == unicode(name)
 
 
+class TestNameManager:
+    def test_active_type_counts(self, status_name_fixtures):
+        Name.objects.create(name='merged', name_type=Name.PERSONAL,
+                            merged_with=Name.objects.first())
+        with CaptureQueriesContext(connection) as queries:
+            counts = Name.objects.active_type_counts()
+        assert 1 == len(queries)
+        assert {'total': 5, 'personal': 1, 'organization': 1, 'event': 1,
+                'software': 1, 'building': 1} == counts
+
+    def test_active_type_counts_without_names(self, db):
+        counts = Name.objects.active_type_counts()
+        assert 0 == counts['total']
+        assert 0 == counts['personal']
+
+    def test_active_type_counts_are_cached(self, status_name_fixtures,
+                                           monkeypatch):
+        monkeypatch.setattr('name.app_settings.NAME_STATS_CACHE', 'default')
+        cache.clear()
+        Name.objects.active_type_counts()
+        with CaptureQueriesContext(connection) as queries:
+            assert 5 == Name.objects.active_type_counts()['total']
+        assert 0 == len(queries)
+
+        name = Name.objects.create(name='new', name_type=Name.PERSONAL)
+        assert 2 == Name.objects.active_type_counts()['personal']
+
+        name.record_status = Name.SUPPRESSED
+        name.save()
+        assert 1 == Name.objects.active_type_counts()['personal']
+
+        Name.objects.filter(name_type=Name.EVENT).delete()
+        assert 0 == Name.objects.active_type_counts()['event']
+
+
 class TestLocation:
     def test_has_unicode_method(self):
         lat_lng = 239
@@ -0,0 +1,25 @@
+import pytest
+
+from name.phonetic import phonetic_key, soundex
+
+
+@pytest.mark.parametrize('word,expected', [
+    ('robert', 'R163'),
+    ('rupert', 'R163'),
+    ('rubin', 'R150'),
+    ('ashcraft', 'A261'),
+    ('tymczak', 'T522'),
+    ('pfister', 'P236'),
+    ('honeyman', 'H555'),
+    ('meyer', 'M600'),
+    ('meier', 'M600'),
+    ('lee', 'L000'),
+    ('1900', ''),
+])
+def test_soundex(word, expected):
+    assert soundex(word) == expected
+
+
+def test_phonetic_key():
+    assert phonetic_key('smyth john 1900') == 'S530 J500'
+    assert phonetic_key('') == ''
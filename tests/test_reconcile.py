@@ -0,0 +1,184 @@
+import json
+
+import pytest
+
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from name import reconcile
+from name.models import Name, Variant
+
+
+@pytest.fixture
+def reconcile_fixtures(db):
+    john = Name.objects.create(name='Smith, John', name_type=Name.PERSONAL)
+    john.variant_set.create(variant='Smith, J.', variant_type=Variant.OTHER)
+    Name.objects.create(name='Smith, J.', name_type=Name.ORGANIZATION)
+    Name.objects.create(name='Smith, John', name_type=Name.PERSONAL,
+                        record_status=Name.SUPPRESSED)
+    return john
+
+
+def test_reconcile_exact_match(reconcile_fixtures):
+    results = reconcile.reconcile({'q0': {'query': 'SMITH JOHN'}})
+    result = results['q0']['result']
+    assert len(result) == 1
+    assert result[0]['id'] == reconcile_fixtures.name_id
+    assert result[0]['score'] == reconcile.NAME_SCORE
+    assert result[0]['type'] == [{'id': 'Personal', 'name': 'Personal'}]
+    assert result[0]['match']
+
+
+def test_reconcile_scores_variants_lower(reconcile_fixtures):
+    result = reconcile.reconcile({'q0': 'Smith, J.'})['q0']['result']
+    assert [r['score'] for r in result] == [reconcile.NAME_SCORE,
+                                            reconcile.VARIANT_SCORE]
+    assert result[1]['id'] == reconcile_fixtures.name_id
+    assert result[0]['match']
+    assert not result[1]['match']
+
+
+def test_reconcile_with_type_and_limit(reconcile_fixtures):
+    results = reconcile.reconcile({
+        'q0': {'query': 'Smith, J.', 'type': 'Personal'},
+        'q1': {'query': 'Smith, J.', 'limit': 1},
+        'q2': {'query': 'Nobody'},
+        'q3': {'query': ''},
+    })
+    assert [r['id'] for r in results['q0']['result']] == [
+        reconcile_fixtures.name_id]
+    assert len(results['q1']['result']) == 1
+    assert results['q2']['result'] == []
+    assert results['q3']['result'] == []
+
+
+def test_reconcile_uses_set_based_lookups(reconcile_fixtures):
+    queries = dict(('q{0}'.format(i), 'Name {0}'.format(i))
+                   for i in range(50))
+    with CaptureQueriesContext(connection) as captured:
+        reconcile.reconcile(queries)
+    assert 2 == len(captured)
+
+
+def check_chunked_reconcile():
+    names = [Name.objects.create(name='Name {0}'.format(i),
+                                 name_type=Name.PERSONAL) for i in range(7)]
+    queries = dict(('q{0}'.format(i), 'Name {0}'.format(i)) for i in range(7))
+
+    results = reconcile.reconcile(queries)
+    for i, name in enumerate(names):
+        assert results['q{0}'.format(i)]['result'][0]['id'] == name.name_id
+
+
+def test_reconcile_in_chunks(db, monkeypatch):
+    monkeypatch.setattr('name.app_settings.NAME_RECONCILE_CHUNK_SIZE', 2)
+    monkeypatch.setattr('name.app_settings.NAME_RECONCILE_WORKERS', 1)
+    check_chunked_reconcile()
+
+
+# The worker threads use their own connections, which do not share an
+# in-memory SQLite database.
+@pytest.mark.skipif(connection.vendor == 'sqlite',
+                    reason='Requires a database server.')
+@pytest.mark.django_db(transaction=True)
+def test_reconcile_in_parallel(monkeypatch):
+    monkeypatch.setattr('name.app_settings.NAME_RECONCILE_CHUNK_SIZE', 2)
+    check_chunked_reconcile()
+
+
+def test_reconcile_json_metadata(client):
+    response = client.get(reverse('name:reconcile'))
+    data = json.loads(response.content)
+    assert response.status_code == 200
+    assert data['view']['url'] == 'http://testserver/name/{{id}}/'
+    assert {'id': 'Personal', 'name': 'Personal'} in data['defaultTypes']
+
+
+def test_reconcile_json_batch(client, reconcile_fixtures):
+    queries = {'q0': {'query': 'Smith, John'}, 'q1': {'query': 'Nobody'}}
+    response = client.post(reverse('name:reconcile'),
+                           {'queries': json.dumps(queries)})
+    data = json.loads(response.content)
+    assert response.status_code == 200
+    assert data['q0']['result'][0]['id'] == reconcile_fixtures.name_id
+    assert data['q1']['result'] == []
+
+
+def test_reconcile_json_single_query(client, reconcile_fixtures):
+    response = client.get(reverse('name:reconcile'), {'query': 'Smith, John'})
+    data = json.loads(response.content)
+    assert data['result'][0]['id'] == reconcile_fixtures.name_id
+
+
+@pytest.mark.parametrize('queries', ['{not json', '["Smith, John"]'])
+def test_reconcile_json_bad_queries(client, queries):
+    response = client.post(reverse('name:reconcile'), {'queries': queries})
+    assert response.status_code == 400
+
+
+@pytest.fixture
+def label_fixtures(db):
+    john = Name.objects.create(name='Smith, John', name_type=Name.PERSONAL)
+    john.variant_set.create(variant='Smythe, Johnny',
+                            variant_type=Variant.OTHER)
+    Name.objects.create(name='Doe, Jane', name_type=Name.PERSONAL)
+    Name.objects.create(name='Doe, Jane', name_type=Name.PERSONAL)
+    return john
+
+
+def test_resolve_labels(label_fixtures):
+    results = reconcile.resolve_labels(
+        ['Smith, John', 'SMYTHE JOHNNY', 'Doe, Jane', 'Nobody'])
+
+    assert results['Smith, John'] == {'status': reconcile.FOUND,
+                                      'name_id': label_fixtures.name_id}
+    assert results['SMYTHE JOHNNY']['name_id'] == label_fixtures.name_id
+    assert results['Doe, Jane']['status'] == reconcile.AMBIGUOUS
+    assert len(results['Doe, Jane']['name_ids']) == 2
+    assert results['Doe, Jane']['message'] == (
+        'There are multiple Name objects with the same name: "doe jane".')
+    assert results['Nobody'] == {
+        'status': reconcile.NOT_FOUND,
+        'message': 'No matching term found - authoritative or variant - '
+                   'for "Nobody"'}
+
+
+def test_resolve_labels_in_chunks(label_fixtures, monkeypatch):
+    monkeypatch.setattr('name.app_settings.NAME_RECONCILE_CHUNK_SIZE', 50)
+    labels = ['Name {0}'.format(i) for i in range(99)] + ['Smith, John']
+    with CaptureQueriesContext(connection) as queries:
+        results = reconcile.resolve_labels(labels)
+    assert 2 == len(queries)
+    assert results['Smith, John']['name_id'] == label_fixtures.name_id
+
+
+def test_labels_json(client, label_fixtures):
+    response = client.post(reverse('name:labels-json'),
+                           json.dumps(['Smith, John', 'Nobody']),
+                           content_type='application/json')
+    data = json.loads(response.content)
+    assert response.status_code == 200
+    assert data['Smith, John']['name_id'] == label_fixtures.name_id
+    assert data['Nobody']['status'] == reconcile.NOT_FOUND
+
+
+def test_labels_json_after_queryset_delete_of_variants(client,
+                                                       label_fixtures):
+    label_fixtures.variant_set.all().delete()
+    response = client.post(reverse('name:labels-json'),
+                           json.dumps(['Smythe, Johnny']),
+                           content_type='application/json')
+    data = json.loads(response.content)
+    assert data['Smythe, Johnny']['status'] == reconcile.NOT_FOUND
+
+
+@pytest.mark.parametrize('body', ['{not json', '{"a": 1}', '[1, 2]'])
+def test_labels_json_bad_body(client, body):
+    response = client.post(reverse('name:labels-json'), body,
+                           content_type='application/json')
+    assert response.status_code == 400
+
+
+def test_labels_json_requires_post(client):
+    response = client.get(reverse('name:labels-json'))
+    assert response.status_code == 405
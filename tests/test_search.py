@@ -2,6 +2,9 @@ import pytest
 import json
 
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from name.models import Name
 
 # All test need access to the database in this file.
 pytestmark = pytest.mark.django
@@ -75,3 +78,260 @@ def test_search_without_query(client, search_fixtures):
     response = client.get(url)
     name_list = response.context[-1]['name_list']
     assert len(name_list) is 0
+
+
+def test_search_with_ranked_backend_keeps_relevance_order(
+        client, db, monkeypatch):
+    monkeypatch.setattr('name.app_settings.NAME_SEARCH_BACKEND', 'trigram')
+    Name.objects.create(name='Meyer, Anne', name_type=Name.PERSONAL)
+    Name.objects.create(name='Meyer, John', name_type=Name.PERSONAL)
+
+    url = reverse('name:search')
+    response = client.get(url, {'q': 'meyer john'})
+    name_list = response.context[-1]['name_list']
+    assert ['Meyer, John', 'Meyer, Anne'] == [n.name for n in name_list]
+
+    response = client.get(url, {'q': 'meyer john', 'order': 'name_a'})
+    name_list = response.context[-1]['name_list']
+    assert ['Meyer, Anne', 'Meyer, John'] == [n.name for n in name_list]
+
+
+@pytest.fixture
+def cursor_fixtures(db):
+    """40 Names with only four distinct begin dates, so that pages
+    break in the middle of runs of equal sort values.
+    """
+    for x in range(40):
+        Name.objects.create(name='Name {0:02d}'.format(x),
+                            name_type=Name.PERSONAL,
+                            begin='200{0}'.format(x % 4))
+
+
+def walk_cursor_pages(client, params, direction='next'):
+    """Follow the cursors from the first page, returning the names on
+    every page.
+    """
+    url = reverse('name:search')
+    response = client.get(url, params)
+    pages = [[n.name for n in response.context[-1]['name_list']]]
+    page_obj = response.context[-1]['page_obj']
+
+    while page_obj.has_next():
+        response = client.get(
+            url, dict(params, cursor=page_obj.next_cursor))
+        page_obj = response.context[-1]['page_obj']
+        pages.append([n.name for n in page_obj])
+    return pages, page_obj
+
+
+@pytest.mark.parametrize('order', ['name_a', 'name_d', 'begin_a', 'begin_d'])
+def test_search_cursor_pagination_matches_page_pagination(client, order,
+                                                          monkeypatch,
+                                                          cursor_fixtures):
+    params = {'q': 'name', 'order': order}
+    url = reverse('name:search')
+
+    expected = []
+    for page in range(1, 4):
+        response = client.get(url, dict(params, page=page))
+        expected.append([n.name for n in response.context[-1]['name_list']])
+
+    monkeypatch.setattr('name.app_settings.NAME_SEARCH_PAGINATION', 'cursor')
+    pages, last_page = walk_cursor_pages(client, params)
+
+    assert [len(page) for page in pages] == [15, 15, 10]
+    assert sorted(sum(pages, [])) == sorted(sum(expected, []))
+    if order.startswith('name'):
+        assert pages == expected
+
+    # Walk back to the first page.
+    page_obj = last_page
+    for page in reversed(pages[:-1]):
+        response = client.get(
+            url, dict(params, cursor=page_obj.previous_cursor))
+        page_obj = response.context[-1]['page_obj']
+        assert page == [n.name for n in page_obj]
+    assert not page_obj.has_previous()
+
+
+def test_search_page_links_work_in_cursor_mode(client, monkeypatch,
+                                               cursor_fixtures):
+    monkeypatch.setattr('name.app_settings.NAME_SEARCH_PAGINATION', 'cursor')
+    response = client.get(reverse('name:search'), {'q': 'name', 'page': 3})
+    assert 10 == len(response.context[-1]['name_list'])
+    assert 'page=2' in response.content
+
+
+def test_search_cursor_links_rendered(client, monkeypatch, cursor_fixtures):
+    monkeypatch.setattr('name.app_settings.NAME_SEARCH_PAGINATION', 'cursor')
+    response = client.get(reverse('name:search'), {'q': 'name'})
+    page_obj = response.context[-1]['page_obj']
+    assert 'cursor={0}'.format(page_obj.next_cursor) in response.content
+    assert 'page=' not in response.content.split('pagination')[-1]
+
+
+def test_search_with_invalid_cursor(client, cursor_fixtures):
+    response = client.get(reverse('name:search'),
+                          {'q': 'name', 'cursor': 'invalid'})
+    assert 404 == response.status_code
+
+
+def test_search_with_cursor_for_another_order(client, monkeypatch,
+                                              cursor_fixtures):
+    monkeypatch.setattr('name.app_settings.NAME_SEARCH_PAGINATION', 'cursor')
+    url = reverse('name:search')
+    response = client.get(url, {'q': 'name', 'order': 'name_a'})
+    cursor = response.context[-1]['page_obj'].next_cursor
+
+    response = client.get(url, {'q': 'name', 'order': 'end_a',
+                                'cursor': cursor})
+    assert 404 == response.status_code
+
+
+@pytest.fixture
+def search_cache(monkeypatch):
+    from django.core.cache import cache
+    monkeypatch.setattr('name.app_settings.NAME_SEARCH_CACHE', 'default')
+    cache.clear()
+
+
+def test_search_results_are_cached(db, client, search_cache):
+    for x in range(20):
+        Name.objects.create(name='Smith {0:02}'.format(x),
+                            name_type=Name.PERSONAL)
+
+    # The Names were created inside the test transaction, so the cache
+    # is invalidated again at the end of the first request.
+    url = reverse('name:search') + '?q=smith&page=2'
+    client.get(url)
+    response = client.get(url)
+    names = list(response.context['object_list'])
+
+    # Only the Names on the page are read.
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert 1 == len(queries)
+    assert names == list(response.context['object_list'])
+    assert response.context['paginator'].count == 20
+    assert response.context['page_obj'].number == 2
+
+    # Differing only by case and spacing shares the cached results.
+    with CaptureQueriesContext(connection) as queries:
+        client.get(reverse('name:search') + '?q=+SMITH+&page=2')
+    assert 1 == len(queries)
+
+
+def test_search_cache_is_invalidated_on_save(db, client, search_cache):
+    name = Name.objects.create(name='Smith, John', name_type=Name.PERSONAL)
+    url = reverse('name:search-json') + '?q=smith'
+    assert len(json.loads(client.get(url).content)) == 1
+
+    Name.objects.create(name='Smith, Jane', name_type=Name.PERSONAL)
+    assert len(json.loads(client.get(url).content)) == 2
+
+    name.variant_set.create(variant='Jones, J.', variant_type=0)
+    url = reverse('name:search-json') + '?q=jones'
+    assert len(json.loads(client.get(url).content)) == 1
+
+    name.variant_set.all().delete()
+    assert len(json.loads(client.get(url).content)) == 0
+
+    name.delete()
+    url = reverse('name:search-json') + '?q=smith'
+    assert len(json.loads(client.get(url).content)) == 1
+
+
+@pytest.fixture
+def count_fixtures(db, monkeypatch):
+    monkeypatch.setattr('name.app_settings.NAME_SEARCH_COUNT_THRESHOLD', 20)
+    for x in range(30):
+        Name.objects.create(name='Smith {0:02}'.format(x),
+                            name_type=Name.PERSONAL)
+
+
+def test_search_counts_small_result_sets_exactly(client, count_fixtures,
+                                                 monkeypatch):
+    monkeypatch.setattr('name.app_settings.NAME_SEARCH_COUNT_THRESHOLD', 30)
+    monkeypatch.setattr('name.pagination.estimate_count', lambda qs: 12000)
+    response = client.get(reverse('name:search') + '?q=smith')
+    assert response.context['paginator'].count == 30
+    assert not response.context['paginator'].is_estimate
+    assert '30 results' in response.content.decode('utf-8')
+
+
+def test_search_estimates_large_result_sets(client, count_fixtures,
+                                            monkeypatch):
+    monkeypatch.setattr('name.pagination.estimate_count', lambda qs: 12000)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse('name:search') + '?q=smith')
+    assert response.context['paginator'].count == 12000
+    assert response.context['paginator'].is_estimate
+    # The rows past the threshold are not counted.
+    assert not any('COUNT(' in query['sql'].upper() for query in queries)
+
+    content = response.content.decode('utf-8')
+    assert 'About 12,000 results' in content
+    assert '>last<' not in content
+
+
+def test_search_pages_past_an_underestimate(client, count_fixtures,
+                                            monkeypatch):
+    # 30 Names on 2 pages, estimated to fit on one.
+    monkeypatch.setattr('name.app_settings.NAME_SEARCH_COUNT_THRESHOLD', 5)
+    monkeypatch.setattr('name.pagination.estimate_count', lambda qs: 10)
+    response = client.get(reverse('name:search') + '?q=smith')
+    assert response.context['paginator'].is_estimate
+    assert response.context['page_obj'].has_next()
+    assert 'About 10 results' in response.content.decode('utf-8')
+
+    response = client.get(reverse('name:search') + '?q=smith&page=2')
+    assert 200 == response.status_code
+    page = response.context['page_obj']
+    assert 15 == len(page.object_list)
+    assert not page.has_next()
+    assert (16, 30) == (page.start_index(), page.end_index())
+
+    response = client.get(reverse('name:search') + '?q=smith&page=3')
+    assert 404 == response.status_code
+
+
+def test_search_pages_up_to_an_overestimate(client, count_fixtures,
+                                            monkeypatch):
+    monkeypatch.setattr('name.pagination.estimate_count', lambda qs: 12000)
+    response = client.get(reverse('name:search') + '?q=smith')
+    assert [1, 2] == list(response.context['paginator'].page_range)
+
+    response = client.get(reverse('name:search') + '?q=smith&page=2')
+    assert not response.context['page_obj'].has_next()
+    assert 'page=3' not in response.content.decode('utf-8')
+
+    response = client.get(reverse('name:search') + '?q=smith&page=3')
+    assert 404 == response.status_code
+
+
+def test_search_estimated_pages_are_cached(client, count_fixtures,
+                                           search_cache, monkeypatch):
+    monkeypatch.setattr('name.pagination.estimate_count', lambda qs: 12000)
+    client.get(reverse('name:search') + '?q=smith&page=2')
+    response = client.get(reverse('name:search') + '?q=smith&page=2')
+    assert 15 == len(response.context['page_obj'].object_list)
+    assert not response.context['page_obj'].has_next()
+
+
+def test_search_counts_exactly_without_an_estimate(client, count_fixtures,
+                                                   monkeypatch):
+    monkeypatch.setattr('name.pagination.estimate_count', lambda qs: None)
+    response = client.get(reverse('name:search') + '?q=smith')
+    assert response.context['paginator'].count == 30
+    assert not response.context['paginator'].is_estimate
+
+
+def test_search_count_is_cached(client, count_fixtures, search_cache):
+    client.get(reverse('name:search') + '?q=smith')
+    client.get(reverse('name:search') + '?q=smith')
+
+    # Only the Names on the page are read.
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse('name:search') + '?q=smith&page=2')
+    assert 1 == len(queries)
+    assert response.context['paginator'].count == 30
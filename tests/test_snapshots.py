@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+import gzip
+import io
+import os
+
+import pytest
+
+from django.core.urlresolvers import reverse
+
+from name import app_settings, snapshots
+from name.api.fast import base_detail_url
+from name.export import export_jsonl, export_tsv
+from name.models import Name
+
+BASE_URL = 'https://names.example.org'
+
+
+def gunzip(data):
+    return gzip.GzipFile(fileobj=io.BytesIO(data)).read()
+
+
+def read(directory, manifest, name):
+    path = os.path.join(directory, manifest['version'], name)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture
+def directory(tmpdir, monkeypatch):
+    monkeypatch.setattr(app_settings, 'NAME_EXPORT_SNAPSHOT_DIR', str(tmpdir))
+    return str(tmpdir)
+
+
+@pytest.fixture
+def names(db):
+    for x in range(5):
+        Name.objects.create(name=u'Name {0} \xe9'.format(x),
+                            name_type=Name.PERSONAL)
+    Name.objects.create(name=u'Suppressed', name_type=Name.PERSONAL,
+                        record_status=Name.SUPPRESSED)
+    return Name.objects.order_by('id')
+
+
+def write(directory, **kwargs):
+    kwargs.setdefault('shard_size', 2)
+    return snapshots.write_snapshot(directory, BASE_URL, **kwargs)
+
+
+def test_write_snapshot(directory, names):
+    manifest, written = write(directory, chunk_size=1)
+    assert 3 == written
+
+    url = base_detail_url(BASE_URL)
+    tsv = ''.join(export_tsv(Name.objects.visible(), url, 10))
+    jsonl = ''.join(export_jsonl(Name.objects.visible(), url, 10))
+    assert tsv == read(directory, manifest, 'data.tsv')
+    assert tsv == gunzip(read(directory, manifest, 'data.tsv.gz'))
+    assert jsonl == read(directory, manifest, 'data.jsonl')
+    assert jsonl == gunzip(read(directory, manifest, 'data.jsonl.gz'))
+    assert 5 == tsv.count('\n')
+    assert manifest == snapshots.latest(directory)
+
+
+def test_write_snapshot_without_names(directory, db):
+    manifest, written = write(directory)
+    assert 0 == written
+    assert '' == read(directory, manifest, 'data.tsv')
+    assert '' == gunzip(read(directory, manifest, 'data.tsv.gz'))
+
+
+def test_write_snapshot_only_writes_changed_shards(directory, names):
+    write(directory)
+    assert (None, 0) == write(directory)
+
+    name = names[2]
+    name.name = u'Renamed'
+    name.save()
+    names[5].delete()
+    manifest, written = write(directory)
+
+    # The shard of the renamed Name, and that of the deleted one.
+    assert 2 == written
+    assert 'Renamed' in read(directory, manifest, 'data.tsv')
+    assert 'Renamed' in gunzip(read(directory, manifest, 'data.jsonl.gz'))
+
+
+def test_write_snapshot_with_force(directory, names):
+    write(directory)
+    assert 3 == write(directory, force=True)[1]
+
+
+def test_write_snapshot_keeps_the_latest_snapshots(directory, names):
+    versions = []
+    for name in names[:3]:
+        name.save()
+        versions.append(write(directory, keep=2)[0]['version'])
+    assert versions[1:] == snapshots.versions(directory)
+
+
+@pytest.mark.parametrize('header,expected', [
+    ('bytes=0-9', (0, 10)),
+    ('bytes=10-', (10, 100)),
+    ('bytes=-10', (90, 100)),
+    ('bytes=90-200', (90, 100)),
+    ('bytes=100-', False),
+    ('bytes=-0', False),
+    ('bytes=9-0', None),
+    ('bytes=0-1,5-6', None),
+    ('lines=0-1', None),
+])
+def test_parse_range(header, expected):
+    assert expected == snapshots.parse_range(header, 100)
+
+
+@pytest.fixture
+def snapshot(directory, names):
+    return write(directory)[0]
+
+
+def content(response):
+    return ''.join(response.streaming_content)
+
+
+def test_export_serves_the_snapshot(client, directory, snapshot):
+    response = client.get(reverse('name:export'))
+    assert 200 == response.status_code
+    assert read(directory, snapshot, 'data.tsv') == content(response)
+    assert 'bytes' == response['Accept-Ranges']
+    assert not response.has_header('Content-Encoding')
+
+    response = client.get(reverse('name:export'), {'format': 'jsonl'})
+    assert read(directory, snapshot, 'data.jsonl') == content(response)
+
+
+def test_export_serves_the_compressed_snapshot(client, directory, snapshot):
+    response = client.get(reverse('name:export'),
+                          HTTP_ACCEPT_ENCODING='deflate, gzip;q=0.8')
+    assert 'gzip' == response['Content-Encoding']
+    assert read(directory, snapshot, 'data.tsv.gz') == content(response)
+
+    response = client.get(reverse('name:export'),
+                          HTTP_ACCEPT_ENCODING='gzip;q=0')
+    assert not response.has_header('Content-Encoding')
+
+
+def test_export_snapshot_conditional_requests(client, snapshot):
+    etag = client.get(reverse('name:export'))['ETag']
+    response = client.get(reverse('name:export'), HTTP_IF_NONE_MATCH=etag)
+    assert 304 == response.status_code
+
+    response = client.get(reverse('name:export'), HTTP_IF_NONE_MATCH='"x"')
+    assert 200 == response.status_code
+
+
+def test_export_snapshot_ranges(client, directory, snapshot):
+    data = read(directory, snapshot, 'data.tsv')
+
+    response = client.get(reverse('name:export'), HTTP_RANGE='bytes=5-14')
+    assert 206 == response.status_code
+    assert data[5:15] == content(response)
+    assert 'bytes 5-14/{0}'.format(len(data)) == response['Content-Range']
+    assert '10' == response['Content-Length']
+
+    response = client.get(reverse('name:export'), HTTP_RANGE='bytes=5-14',
+                          HTTP_IF_RANGE='"changed"')
+    assert 200 == response.status_code
+    assert data == content(response)
+
+    response = client.get(reverse('name:export'),
+                          HTTP_RANGE='bytes={0}-'.format(len(data)))
+    assert 416 == response.status_code
+
+
+def test_export_without_snapshot_streams(client, directory, names):
+    response = client.get(reverse('name:export'), {'format': 'jsonl'})
+    assert 200 == response.status_code
+    assert 5 == content(response).count('\n')
+
+
+def test_export_unknown_format(client, db):
+    response = client.get(reverse('name:export'), {'format': 'xml'})
+    assert 404 == response.status_code
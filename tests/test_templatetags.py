@@ -1,6 +1,6 @@
 import pytest
 from django.core.urlresolvers import reverse
-from django.template import Template, RequestContext
+from django.template import Context, Template, RequestContext
 
 
 @pytest.mark.parametrize('url_name,arg', [
@@ -60,3 +60,11 @@ def test_absolute_url_handles_empty_arguments(rf):
 
     expected = request.build_absolute_uri(reverse("name:landing"))
     assert expected, rendered
+
+
+def test_absolute_url_without_request():
+    template = '{% load name_extras %}{% absolute_url "name:detail" "nm1" %}'
+    rendered = Template(template).render(
+        Context({'base_url': 'https://example.org/'}))
+    expected = 'https://example.org' + reverse('name:detail', args=['nm1'])
+    assert expected == rendered
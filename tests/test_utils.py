@@ -1,5 +1,9 @@
 import pytest
+from importlib import import_module
+
+from django.db import connection
 from name import utils
+from name.models import Name, Variant
 
 
 @pytest.mark.django_db
@@ -16,6 +20,94 @@ def test_filter_names_with_query(rf, search_fixtures):
     assert names.count() == 5
 
 
+@pytest.mark.django_db
+def test_filter_names_matches_normalized_forms(rf):
+    name = Name.objects.create(name=u'M\xfcller, J\xf6rg', name_type=Name.PERSONAL)
+    name.variant_set.create(variant="O'Brien, J.", variant_type=Variant.OTHER)
+    name.variant_set.create(variant='Obrien, Jorg', variant_type=Variant.OTHER)
+
+    for q in (u'm\xfcller j\xf6rg', u'M\xfcller,', "O'BRIEN", 'obrien j'):
+        request = rf.get('/', {'q': q})
+        assert [name] == list(utils.filter_names(request))
+
+    request = rf.get('/', {'q': '!!'})
+    assert [] == list(utils.filter_names(request))
+
+
+def test_filter_names_uses_a_semi_join(rf):
+    request = rf.get('/', {'q': 'smith john'})
+    sql = str(utils.filter_names(request).query).upper()
+    assert 'DISTINCT' not in sql
+    assert 'JOIN' not in sql
+    assert 'IN (SELECT' in sql
+
+
+@pytest.fixture
+def filter_names_sql(rf, search_fixtures):
+    """The SQL and parameters of a search matching names and variants,
+    with a few variants so that the planners do not optimize away the
+    Variant table.
+    """
+    for name in search_fixtures[:3]:
+        name.variant_set.create(variant='Smith, John',
+                                variant_type=Variant.OTHER)
+    request = rf.get('/', {'q': 'smith john'})
+    return utils.filter_names(request).query.sql_with_params()
+
+
+@pytest.mark.skipif(connection.vendor != 'sqlite', reason='Requires SQLite.')
+@pytest.mark.django_db
+def test_filter_names_query_plan(filter_names_sql):
+    sql, params = filter_names_sql
+    cursor = connection.cursor()
+    cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+    plan = ' '.join(row[-1] for row in cursor.fetchall())
+    assert 'DISTINCT' not in plan
+    assert 'SUBQUERY' in plan
+
+
+@pytest.mark.skipif(connection.vendor != 'postgresql',
+                    reason='Requires PostgreSQL.')
+@pytest.mark.django_db
+def test_filter_names_query_plan_postgres(filter_names_sql):
+    sql, params = filter_names_sql
+    cursor = connection.cursor()
+    cursor.execute('EXPLAIN ' + sql, params)
+    plan = '\n'.join(row[0] for row in cursor.fetchall())
+    # A DISTINCT is planned as a Unique node or a HashAggregate over
+    # the Names.
+    assert 'Unique' not in plan
+    assert 'HashAggregate' not in plan
+    assert 'SubPlan' in plan or 'Semi Join' in plan
+    assert 'normalized_variant' in plan
+
+
+@pytest.mark.skipif(connection.vendor != 'mysql', reason='Requires MySQL.')
+@pytest.mark.django_db
+def test_filter_names_query_plan_mysql(filter_names_sql):
+    sql, params = filter_names_sql
+    cursor = connection.cursor()
+    cursor.execute('EXPLAIN ' + sql, params)
+    columns = [column[0] for column in cursor.description]
+    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    extra = ' '.join(row['Extra'] or '' for row in rows)
+    assert 'Using temporary' not in extra
+    assert 'Distinct' not in extra
+
+    # The Variant table is read by a subquery, or by one of the
+    # semi-join strategies, rather than joined.
+    variants = [row for row in rows
+                if row['table'] and
+                row['table'].startswith(Variant._meta.db_table)]
+    assert variants
+    for row in variants:
+        assert (row['select_type'] in ('SUBQUERY', 'DEPENDENT SUBQUERY',
+                                       'MATERIALIZED') or
+                'FirstMatch' in (row['Extra'] or '') or
+                'LooseScan' in (row['Extra'] or ''))
+
+
 @pytest.mark.django_db
 @pytest.mark.parametrize('q_type,expected', [
     ('Personal', 1),
@@ -44,6 +136,232 @@ def test_filter_names_with_no_query_and_name_types(rf, q_type,
     assert names.count() == expected
 
 
+@pytest.fixture
+def token_backend(monkeypatch):
+    monkeypatch.setattr('name.app_settings.NAME_SEARCH_BACKEND', 'token')
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('q,expected', [
+    ('1', 5),
+    ('Personal', 4),
+    ('pers', 4),
+    ('Personal 1', 1),
+    ('"Personal 1"', 1),
+    ('Personal Event', 0),
+    ('ersonal', 0),
+    ('&&&', 0),
+])
+def test_filter_names_with_token_backend(rf, q, expected, token_backend,
+                                         search_fixtures):
+    request = rf.get('/', {'q': q})
+    names = utils.filter_names(request)
+    assert names.count() == expected
+
+
+@pytest.mark.django_db
+def test_filter_names_with_token_backend_matches_variants(rf, token_backend):
+    name = Name.objects.create(name='Smith, John', name_type=Name.PERSONAL)
+    name.variant_set.create(variant='Smythe', variant_type=Variant.OTHER)
+
+    request = rf.get('/', {'q': 'smythe john'})
+    assert [name] == list(utils.filter_names(request))
+
+
+@pytest.fixture
+def trigram_backend(monkeypatch):
+    monkeypatch.setattr('name.app_settings.NAME_SEARCH_BACKEND', 'trigram')
+
+
+@pytest.fixture
+def misspelled_fixtures(db, trigram_backend):
+    meyer = Name.objects.create(name='Meyer, John', name_type=Name.PERSONAL)
+    meier = Name.objects.create(name='Meier, Jon', name_type=Name.PERSONAL)
+    smith = Name.objects.create(name='Smith, Mary', name_type=Name.PERSONAL)
+    smith.variant_set.create(variant='Meyers', variant_type=Variant.OTHER)
+    return meyer, meier, smith
+
+
+def test_filter_names_with_trigram_backend(rf, misspelled_fixtures):
+    meyer, meier, smith = misspelled_fixtures
+    request = rf.get('/', {'q': 'Meyr, John'})
+    assert [meyer] == list(utils.filter_names(request))
+
+
+def test_filter_names_with_trigram_backend_ranks_results(rf, monkeypatch,
+                                                         misspelled_fixtures):
+    monkeypatch.setattr('name.app_settings.NAME_SEARCH_TRIGRAM_THRESHOLD', 0.2)
+    meyer, meier, smith = misspelled_fixtures
+    request = rf.get('/', {'q': 'Meyr, John'})
+    names = list(utils.filter_names(request))
+    assert [meyer, meier, smith] == names
+    assert names[0].similarity > names[1].similarity > names[2].similarity
+
+
+def test_filter_names_with_trigram_backend_matches_variants(
+        rf, misspelled_fixtures):
+    meyer, meier, smith = misspelled_fixtures
+    request = rf.get('/', {'q': 'Meyers'})
+    assert smith in utils.filter_names(request)
+
+
+def test_filter_names_with_trigram_backend_threshold(rf, monkeypatch,
+                                                     misspelled_fixtures):
+    monkeypatch.setattr('name.app_settings.NAME_SEARCH_TRIGRAM_THRESHOLD', 1)
+    request = rf.get('/', {'q': 'Meyr, John'})
+    assert not utils.filter_names(request).exists()
+
+
+def test_filter_names_with_trigram_backend_candidates(rf, monkeypatch,
+                                                      misspelled_fixtures):
+    monkeypatch.setattr('name.app_settings.NAME_SEARCH_TRIGRAM_CANDIDATES', 1)
+    meyer, meier, smith = misspelled_fixtures
+    request = rf.get('/', {'q': 'Meyer, John'})
+    assert [meyer] == list(utils.filter_names(request))
+
+
+def test_is_ranked(rf, trigram_backend):
+    assert utils.is_ranked(rf.get('/', {'q': 'meyer'}))
+    assert not utils.is_ranked(rf.get('/', {'q_type': 'Personal'}))
+
+
+@pytest.fixture
+def postgres_backend(monkeypatch):
+    monkeypatch.setattr('name.app_settings.NAME_SEARCH_BACKEND', 'postgres')
+
+
+@pytest.fixture
+def search_vector_column(db):
+    """Create the search_vector column, which is added by a migration
+    that does not run when the tests are run with --nomigrations.
+    """
+    migration = import_module('name.migrations.0004_name_search_vector')
+    cursor = connection.cursor()
+    for sql in migration.FORWARDS_SQL:
+        cursor.execute(sql)
+
+
+def test_compose_tsquery():
+    assert u'john:* & smith:*' == utils.compose_tsquery('Smith, John')
+    assert u'' == utils.compose_tsquery('&&& !')
+
+
+@pytest.mark.skipif(connection.vendor == 'postgresql',
+                    reason='Tests the fallback on other databases.')
+def test_postgres_backend_falls_back_to_icontains(postgres_backend):
+    assert 'icontains' == utils.get_search_backend()
+
+
+@pytest.mark.skipif(connection.vendor != 'postgresql',
+                    reason='Requires PostgreSQL.')
+@pytest.mark.django_db
+def test_filter_names_with_postgres_backend(rf, postgres_backend,
+                                            search_vector_column):
+    john = Name.objects.create(name='Smith, John', name_type=Name.PERSONAL)
+    jane = Name.objects.create(name='Doe, Jane', name_type=Name.PERSONAL,
+                               disambiguation='Smith College')
+    jane.variant_set.create(variant='Smithe, J.', variant_type=Variant.OTHER)
+
+    request = rf.get('/', {'q': 'smith'})
+    names = list(utils.filter_names(request))
+    assert [john, jane] == names
+    assert names[0].rank > names[1].rank
+
+    request = rf.get('/', {'q': 'smith jo'})
+    assert [john] == list(utils.filter_names(request))
+
+    request = rf.get('/', {'q': 'college'})
+    assert [jane] == list(utils.filter_names(request))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('q,expected', [
+    ('meier', ['Mayer, John', 'Meyer, Mary']),
+    ('Meier, Marie', ['Meyer, Mary']),
+    ('smith', ['Meyer, Mary']),
+    ('john', []),
+    ('1900', []),
+])
+def test_filter_names_with_phonetic_mode(rf, q, expected):
+    mary = Name.objects.create(name='Meyer, Mary', name_type=Name.PERSONAL)
+    mary.variant_set.create(variant='Smyth, Mary', variant_type=Variant.OTHER)
+    Name.objects.create(name='Mayer, John', name_type=Name.PERSONAL)
+    Name.objects.create(name='Myers, John', name_type=Name.PERSONAL)
+
+    request = rf.get('/', {'q': q, 'q_mode': 'phonetic'})
+    names = utils.filter_names(request).order_by('name')
+    assert expected == [name.name for name in names]
+
+
+def test_get_request_backend(rf):
+    assert 'phonetic' == utils.get_request_backend(
+        rf.get('/', {'q_mode': 'phonetic'}))
+    assert 'icontains' == utils.get_request_backend(
+        rf.get('/', {'q_mode': 'unknown'}))
+
+
+def test_compose_fts_query():
+    assert u'"Smith"* "John"*' == utils.compose_fts_query('Smith, "John"')
+    assert u'' == utils.compose_fts_query('*** ^')
+
+
+@pytest.mark.skipif(connection.vendor == 'sqlite',
+                    reason='Tests the fallback on other databases.')
+def test_sqlite_backend_falls_back_to_icontains(monkeypatch):
+    monkeypatch.setattr('name.app_settings.NAME_SEARCH_BACKEND', 'sqlite')
+    assert 'icontains' == utils.get_search_backend()
+
+
+@pytest.mark.skipif(connection.vendor != 'sqlite', reason='Requires SQLite.')
+def test_filter_names_with_sqlite_backend(rf, sqlite_backend):
+    john = Name.objects.create(name='Smith, John', name_type=Name.PERSONAL)
+    jane = Name.objects.create(name='Doe, Jane', name_type=Name.PERSONAL,
+                               disambiguation='Smith College')
+    jane.variant_set.create(variant='Smithe, J.', variant_type=Variant.OTHER)
+    Name.objects.create(name=u'M\xfcller, J\xf6rg', name_type=Name.PERSONAL)
+
+    request = rf.get('/', {'q': 'smith'})
+    names = list(utils.filter_names(request))
+    assert [john, jane] == names
+    assert names[0].rank < names[1].rank
+
+    request = rf.get('/', {'q': 'smith jo'})
+    assert [john] == list(utils.filter_names(request))
+
+    request = rf.get('/', {'q': 'college'})
+    assert [jane] == list(utils.filter_names(request))
+
+    request = rf.get('/', {'q': 'muller'})
+    assert [u'M\xfcller, J\xf6rg'] == [n.name for n in utils.filter_names(request)]
+
+
+@pytest.mark.skipif(connection.vendor != 'sqlite', reason='Requires SQLite.')
+def test_sqlite_backend_is_kept_in_sync(rf, sqlite_backend):
+    name = Name.objects.create(name='Smith, John', name_type=Name.PERSONAL)
+    variant = name.variant_set.create(variant='Jones, J.',
+                                      variant_type=Variant.OTHER)
+
+    request = rf.get('/', {'q': 'jones'})
+    assert [name] == list(utils.filter_names(request))
+
+    variant.delete()
+    assert [] == list(utils.filter_names(request))
+
+    name.name = 'Jones, John'
+    name.save()
+    assert [name] == list(utils.filter_names(request))
+
+    name.delete()
+    cursor = connection.cursor()
+    cursor.execute('SELECT count(*) FROM name_name_fts')
+    assert 0 == cursor.fetchone()[0]
+
+
+def test_compose_token_query():
+    tokens = utils.compose_token_query('Smith, "John Q."')
+    assert set(['smith', 'john', 'q']) == tokens
+
+
 # rf is a pytest-django fixture
 @pytest.mark.parametrize('query,expected', [
     ('Personal', 1),
@@ -1,7 +1,10 @@
 import pytest
 
 from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
+from name import merges
 from name.models import Name
 from name.validators import validate_merged_with
 
@@ -9,6 +12,20 @@ from name.validators import validate_merged_with
 pytestmark = pytest.mark.django_db
 
 
+@pytest.fixture(autouse=True, params=['recursive query', 'python'])
+def chain_query(request, monkeypatch):
+    """Run every test with the recursive query and with the fallback
+    that follows the chain with a query per Name.
+    """
+    if (request.param == 'recursive query' and
+            not merges.supports_recursive_queries()):
+        pytest.skip('The database does not support WITH RECURSIVE.')
+    if request.param == 'python':
+        monkeypatch.setattr('name.merges.supports_recursive_queries',
+                            lambda: False)
+    return request.param
+
+
 def test_validate_merged_with_passes_without_merged_with():
     name = Name.objects.create(name='John Smith', name_type=0)
     validate_merged_with(name)
@@ -121,3 +138,18 @@ def test_validate_merged_with_fails_with_more_than_two_names():
 
     with pytest.raises(ValidationError):
         validate_merged_with(john)
+
+
+def test_validate_merged_with_uses_a_single_query(chain_query):
+    names = [Name.objects.create(name='Name {0}'.format(i), name_type=0)
+             for i in range(5)]
+    for name, target in zip(names[1:], names):
+        name.merged_with = target
+        name.save()
+
+    names[0].merged_with = names[-1]
+    queries = 1 if chain_query == 'recursive query' else len(names)
+    with CaptureQueriesContext(connection) as captured:
+        with pytest.raises(ValidationError):
+            validate_merged_with(names[0])
+    assert queries == len(captured)
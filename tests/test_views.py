@@ -1,8 +1,11 @@
 import pytest
 import json
-from name.models import Location, Name
+from name.models import (
+    Identifier, Identifier_Type, Location, Name, Note, Variant)
 
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 # Give all tests access to the database.
 pytestmark = pytest.mark.django_db
@@ -44,6 +47,21 @@ def test_merged_entry_detail_returns_redirect(client, merged_name_fixtures):
     assert 302 == response.status_code
 
 
+@pytest.mark.parametrize('view', [
+    'name:detail', 'name:detail-json', 'name:mads-serialize'])
+def test_merged_name_redirects_to_survivor(client, view):
+    names = [Name.objects.create(name='Name {0}'.format(i), name_type=0)
+             for i in range(5)]
+    for name, target in zip(names, names[1:]):
+        name.merged_with = target
+        name.save()
+
+    response = client.get(reverse(view, args=[names[0].name_id]))
+    assert 302 == response.status_code
+    assert response['Location'].endswith(
+        reverse(view, args=[names[-1].name_id]))
+
+
 def test_label_returns_redirected(client, name_fixture):
     response = client.get(
         reverse('name:label', args=[name_fixture.name]))
@@ -86,9 +104,237 @@ def test_label_returns_not_found_multiple_names_found(client):
     assert 'There are multiple Name objects with' in response.content
 
 
+def test_label_redirects_to_name_with_variant(client, name_fixture):
+    name_fixture.variant_set.create(variant='Smythe, Johnny', variant_type=0)
+    response = client.get(reverse('name:label', args=['Smythe, Johnny']))
+    assert 302 == response.status_code
+    assert response['Location'].endswith(
+        reverse('name:detail', args=[name_fixture.name_id]))
+
+
+def test_label_ignores_variants_deleted_by_queryset(client, name_fixture):
+    name_fixture.variant_set.create(variant='Smythe, Johnny', variant_type=0)
+    name_fixture.variant_set.all().delete()
+    response = client.get(reverse('name:label', args=['Smythe, Johnny']))
+    assert 404 == response.status_code
+
+
+def test_label_redirects_to_merge_survivor(client, merged_name_fixtures):
+    merged, primary = merged_name_fixtures
+    response = client.get(reverse('name:label', args=[merged.name]))
+    assert 302 == response.status_code
+    assert response['Location'].endswith(
+        reverse('name:detail', args=[primary.name_id]))
+
+
+def test_label_uses_a_single_query(client, name_fixture):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(
+            reverse('name:label', args=[name_fixture.name]))
+    assert 1 == len(queries)
+    assert 302 == response.status_code
+
+
+def make_related_name(count):
+    """Create a Building with count Identifiers, Notes, Variants and
+    Locations.
+    """
+    # Add the Locations before making the Name a Building, so saving
+    # it does not look up its location.
+    name = Name.objects.create(name='test building', name_type=Name.PERSONAL)
+    for i in range(count):
+        Location.objects.create(belong_to_name=name, latitude=33 + i,
+                                longitude=-97, status=Location.FORMER)
+        identifier_type = Identifier_Type.objects.create(
+            label='Type {0}'.format(i))
+        Identifier.objects.create(belong_to_name=name, type=identifier_type,
+                                  value='http://example.com/{0}'.format(i))
+        name.note_set.create(note='Note {0}'.format(i), note_type=Note.OTHER)
+        name.variant_set.create(variant='Variant {0}'.format(i),
+                                variant_type=Variant.OTHER)
+    name.note_set.create(note='Hidden', note_type=Note.NONPUBLIC)
+    Location.objects.create(belong_to_name=name, latitude=33, longitude=-98)
+    name.name_type = Name.BUILDING
+    name.save()
+    return name
+
+
+# One query for the last_modified date of the Name, one for the Name,
+# and one each for its Identifiers, Identifier Types, Notes, Variants
+# and Locations.
+@pytest.mark.parametrize('count', [1, 5])
+@pytest.mark.parametrize('view', [
+    'name:detail', 'name:detail-json', 'name:mads-serialize'])
+def test_name_views_use_a_fixed_number_of_queries(client, count, view):
+    name = make_related_name(count)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse(view, args=[name.name_id]))
+    assert 7 == len(queries)
+    assert 200 == response.status_code
+
+
+def test_detail_shows_public_notes_and_current_location(client):
+    name = make_related_name(2)
+    response = client.get(reverse('name:detail', args=[name.name_id]))
+    assert 'Note 1' in response.content
+    assert 'Hidden' not in response.content
+    # The decimal places of the coordinates depend on the database.
+    assert 'itemprop="longitude" content="-98' in response.content
+
+
+@pytest.fixture
+def page_cache(monkeypatch):
+    from django.core.cache import cache
+    monkeypatch.setattr('name.app_settings.NAME_PAGE_CACHE', 'default')
+    cache.clear()
+
+
+@pytest.mark.parametrize('view', [
+    'name:detail', 'name:detail-json', 'name:mads-serialize'])
+def test_name_views_are_cached(client, page_cache, view):
+    name = make_related_name(1)
+    url = reverse(view, args=[name.name_id])
+
+    # The Name was created inside the test transaction, so its version
+    # is bumped again at the end of the first request.
+    client.get(url)
+    stored = client.get(url)
+
+    # Only the last_modified date of the Name is read.
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert 1 == len(queries)
+    assert 200 == response.status_code
+    assert stored.content == response.content
+    assert sorted(stored.items()) == sorted(response.items())
+
+
+def rename(name, new_name):
+    name.name = new_name
+    name.save()
+
+
+@pytest.mark.parametrize('change', [
+    lambda name: name.variant_set.create(variant='Smythe', variant_type=0),
+    lambda name: name.note_set.create(note='Smythe', note_type=Note.OTHER),
+    lambda name: Identifier.objects.create(
+        belong_to_name=name, value='Smythe',
+        type=Identifier_Type.objects.create(label='Other')),
+    lambda name: Identifier_Type.objects.update_or_create(
+        label='Type 0', defaults={'icon_path': 'Smythe.png'}),
+    lambda name: rename(name, 'Smythe'),
+])
+def test_name_page_cache_is_invalidated_on_change(client, page_cache, change):
+    name = make_related_name(1)
+    url = reverse('name:detail', args=[name.name_id])
+    client.get(url)
+    assert 'Smythe' not in client.get(url).content
+
+    change(name)
+    assert 'Smythe' in client.get(url).content
+
+
+def test_name_page_cache_is_invalidated_on_location_change(client,
+                                                           page_cache):
+    name = make_related_name(1)
+    url = reverse('name:detail', args=[name.name_id])
+    client.get(url)
+    client.get(url)
+
+    Location.objects.create(belong_to_name=name, latitude=-10, longitude=-97)
+    assert 'itemprop="latitude" content="-10' in client.get(url).content
+
+
+def test_name_page_cache_is_invalidated_on_delete(client, page_cache):
+    name = make_related_name(1)
+    url = reverse('name:detail', args=[name.name_id])
+    client.get(url)
+    assert 'Variant 0' in client.get(url).content
+
+    name.variant_set.all().delete()
+    assert 'Variant 0' not in client.get(url).content
+
+
+def test_name_page_cache_skips_authenticated_users(client, admin_client,
+                                                   page_cache, name_fixture):
+    url = reverse('name:detail', args=[name_fixture.name_id])
+    client.get(url)
+    client.get(url)
+
+    # Updating the queryset does not bump the version of the Name.
+    Name.objects.filter(id=name_fixture.id).update(name='Smythe')
+    assert 'Smythe' not in client.get(url).content
+    assert 'Smythe' in admin_client.get(url).content
+
+
+@pytest.mark.parametrize('view', [
+    'name:detail', 'name:detail-json', 'name:mads-serialize'])
+def test_name_views_answer_conditional_requests(client, view):
+    name = make_related_name(1)
+    url = reverse(view, args=[name.name_id])
+    response = client.get(url)
+    assert response.has_header('Last-Modified')
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert 1 == len(queries)
+    assert 304 == response.status_code
+    assert '' == response.content
+
+
+@pytest.mark.parametrize('change', [
+    lambda name: name.variant_set.create(variant='Smythe', variant_type=0),
+    lambda name: name.note_set.all().delete(),
+    lambda name: Location.objects.create(
+        belong_to_name=name, latitude=-10, longitude=-97),
+    lambda name: Identifier_Type.objects.filter(label='Type 0').get().save(),
+])
+def test_name_etag_changes_with_related_objects(client, change):
+    name = make_related_name(1)
+    url = reverse('name:detail', args=[name.name_id])
+    etag = client.get(url)['ETag']
+
+    change(name)
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert 200 == response.status_code
+    assert etag != response['ETag']
+
+
+def test_name_etag_changes_with_biography_renderer(client, monkeypatch):
+    name = Name.objects.create(name='Meyer, Mary', name_type=0,
+                               biography='*Born* in Denton.')
+    url = reverse('name:detail', args=[name.name_id])
+    etag = client.get(url)['ETag']
+
+    monkeypatch.setattr('name.models.BIOGRAPHY_RENDERER', 'markdown2 99')
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert 200 == response.status_code
+    assert etag != response['ETag']
+    assert '<em>Born</em> in Denton.' in response.content
+    stored = Name.objects.get(id=name.id)
+    assert stored.biography_renderer != 'markdown2 99'
+
+
+def test_name_etag_differs_for_authenticated_users(client, admin_client,
+                                                   name_fixture):
+    url = reverse('name:detail', args=[name_fixture.name_id])
+    assert client.get(url)['ETag'] != admin_client.get(url)['ETag']
+
+
 def test_export(client, name_fixture):
     response = client.get(reverse('name:export'))
     assert 200 == response.status_code
+    assert response.streaming
+    assert ''.join(response.streaming_content) == (
+        'personal\ttest person\thttp://testserver{0}\r\n'
+        .format(name_fixture.get_absolute_url()))
+
+
+def test_export_jsonl_urls_leave_out_the_format(client, name_fixture):
+    response = client.get(reverse('name:export'), {'format': 'jsonl'})
+    name = json.loads(''.join(response.streaming_content))
+    assert name['identifier'] == (
+        'http://testserver' + name_fixture.get_absolute_url())
 
 
 def test_opensearch(client):